@@ -0,0 +1,157 @@
+"""
+ثبت last_login و last_seen کاربران بدون نوشتن هم‌زمان روی ردیف کاربر.
+
+هر worker زمان‌ها را در حافظه جمع می‌کند و هر ACTIVITY_FLUSH_INTERVAL ثانیه همه را با یک
+UPDATE ... FROM (VALUES ...) می‌نویسد؛ پس لاگین‌ها و refreshهای پرتعداد به جای قفل ردیف و save() کامل
+(با بررسی آواتار و signalها) فقط یک کوئری دوره‌ای دارند. هنگام خروج پروسه هم یک flush انجام می‌شود.
+با ACTIVITY_FLUSH_INTERVAL=0 هر رکورد بلافاصله نوشته می‌شود.
+"""
+import atexit
+import logging
+import threading
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import DatabaseError, close_old_connections, connections, router
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+FIELDS = ('last_login', 'last_seen')
+# cast پارامترهای VALUES در Postgres؛ بدون آن ستون‌های تمام NULL نوع text می‌گیرند
+PG_CASTS = ('::uuid', '::timestamptz', '::timestamptz')
+
+
+class ActivityRecorder:
+    def __init__(self, flush_interval):
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        # {user_id: [last_login, last_seen]}
+        self._pending = {}
+        self._thread = None
+        self._stopped = threading.Event()
+
+    def record_login(self, user_id, when=None):
+        self._record(user_id, 0, when)
+
+    def record_seen(self, user_id, when=None):
+        self._record(user_id, 1, when)
+
+    def _record(self, user_id, index, when):
+        when = when or timezone.now()
+        with self._lock:
+            entry = self._pending.setdefault(str(user_id), [None, None])
+            if entry[index] is None or entry[index] < when:
+                entry[index] = when
+        if not self.flush_interval:
+            self.flush()
+        else:
+            self._ensure_thread()
+
+    def pending(self, user_id):
+        """زمان‌های هنوز نوشته‌نشده‌ی این worker برای کاربر: {'last_login': ..., 'last_seen': ...}"""
+        entry = self._pending.get(str(user_id))
+        return dict(zip(FIELDS, entry)) if entry else {}
+
+    def __len__(self):
+        return len(self._pending)
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+        try:
+            write_activity(pending)
+        except DatabaseError:
+            logger.exception("Flushing activity for %d users failed; will retry.", len(pending))
+            with self._lock:
+                for user_id, entry in pending.items():
+                    current = self._pending.setdefault(user_id, [None, None])
+                    for index, value in enumerate(entry):
+                        if value is not None and (current[index] is None or current[index] < value):
+                            current[index] = value
+            return 0
+        return len(pending)
+
+    def _ensure_thread(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='activity-recorder', daemon=True)
+                self._thread.start()
+                atexit.register(self.shutdown)
+
+    def _run(self):
+        while not self._stopped.wait(self.flush_interval):
+            # هر thread اتصال دیتابیس خودش را دارد
+            close_old_connections()
+            try:
+                self.flush()
+            finally:
+                close_old_connections()
+
+    def shutdown(self):
+        self._stopped.set()
+        self.flush()
+
+
+def write_activity(pending, batch_size=1000):
+    """{user_id: [last_login, last_seen]} را با یک UPDATE برای هر batch_size کاربر می‌نویسد."""
+    using = router.db_for_write(User)
+    connection = connections[using]
+    items = list(pending.items())
+    # update() و SQL خام auto_now را اعمال نمی‌کنند؛ updated_at فقط با last_login جلو می‌رود تا خروجی افزایشی
+    # (?updated_since=) هر کاربری را که فقط یک درخواست زده دوباره نفرستد
+    now = timezone.now()
+
+    if connection.vendor not in ('postgresql', 'sqlite'):
+        # بدون UPDATE ... FROM؛ یک UPDATE برای هر کاربر
+        for user_id, entry in items:
+            values = {name: value for name, value in zip(FIELDS, entry) if value is not None}
+            if 'last_login' in values:
+                values['updated_at'] = now
+            User.objects.using(using).filter(pk=user_id).update(**values)
+        return
+
+    table = connection.ops.quote_name(User._meta.db_table)
+    pk = User._meta.pk
+    pk_column = connection.ops.quote_name(pk.column)
+    fields = [User._meta.get_field(name) for name in FIELDS]
+    columns = [connection.ops.quote_name(field.column) for field in fields]
+    assignments = ', '.join(f'{column} = COALESCE(v.{column}, {table}.{column})' for column in columns)
+    updated_at = User._meta.get_field('updated_at')
+    updated_at_column = connection.ops.quote_name(updated_at.column)
+    last_login_column = columns[FIELDS.index('last_login')]
+    assignments += (
+        f', {updated_at_column} = CASE WHEN v.{last_login_column} IS NOT NULL THEN %s ELSE {table}.{updated_at_column} END'
+    )
+    updated_at_param = updated_at.get_db_prep_value(now, connection)
+    casts = PG_CASTS if connection.vendor == 'postgresql' else ('', '', '')
+    row = '(%s)' % ', '.join('%s' + cast for cast in casts)
+
+    with connection.cursor() as cursor:
+        for start in range(0, len(items), batch_size):
+            batch = items[start:start + batch_size]
+            params = []
+            for user_id, entry in batch:
+                params.append(pk.get_db_prep_value(pk.to_python(user_id), connection))
+                params.extend(field.get_db_prep_value(value, connection) for field, value in zip(fields, entry))
+            params.append(updated_at_param)
+            cursor.execute(
+                f'WITH v(id, {", ".join(columns)}) AS (VALUES {", ".join([row] * len(batch))}) '
+                f'UPDATE {table} SET {assignments} FROM v WHERE {table}.{pk_column} = v.id',
+                params,
+            )
+
+
+activity_recorder = ActivityRecorder(flush_interval=settings.ACTIVITY_FLUSH_INTERVAL)
+
+
+def record_user_logged_in(sender, user, **kwargs):
+    """جایگزین update_last_login جنگو برای signal user_logged_in (لاگین session و پنل ادمین)"""
+    user.last_login = timezone.now()
+    activity_recorder.record_login(user.pk, user.last_login)
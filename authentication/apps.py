@@ -3,3 +3,29 @@ from django.apps import AppConfig
 
 class AuthenticationConfig(AppConfig):
     name = 'authentication'
+
+    def ready(self):
+        import authentication.signals  # noqa
+        from django.contrib.auth.signals import user_logged_in
+        from rest_framework_simplejwt import state
+        from user_service.metrics import registry
+        from .activity import record_user_logged_in
+        from .backends import KeyRingTokenBackend
+
+        # last_login به جای save() هم‌زمان، دسته‌ای نوشته می‌شود (authentication.activity)
+        user_logged_in.disconnect(dispatch_uid='update_last_login')
+        user_logged_in.connect(record_user_logged_in, dispatch_uid='record_user_logged_in')
+
+        # همه‌ی توکن‌های simplejwt از state.token_backend استفاده می‌کنند
+        state.token_backend = KeyRingTokenBackend.from_settings()
+
+        registry.register_collector(auth_metrics)
+
+
+def auth_metrics():
+    from .activity import activity_recorder
+    from .introspection import verified_tokens
+    return [
+        ('verified_token_cache_entries', 'gauge', "Tokens in the introspection verification cache.", len(verified_tokens)),
+        ('activity_pending_users', 'gauge', "Users with last_login/last_seen not yet flushed.", len(activity_recorder)),
+    ]
@@ -0,0 +1,168 @@
+"""
+نسخه‌های async ویوهای login، register و change-password برای اجرا از طریق asgi.py.
+
+هش رمز در authentication.hashing (ProcessPool محدود) انجام می‌شود و event loop آزاد می‌ماند.
+بقیه‌ی منطق (اعتبارسنجی، ساخت کاربر، صدور توکن) همان serializerهای نسخه‌ی sync است.
+با AUTH_ASYNC_VIEWS=True این ویوها جای مسیرهای فعلی را در authentication/urls.py می‌گیرند.
+"""
+import json
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.http import JsonResponse
+from django.utils.decorators import method_decorator
+from django.utils.translation import gettext_lazy as _
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions, status
+from rest_framework.settings import api_settings as drf_settings
+from rest_framework_simplejwt.settings import api_settings
+
+from users.serializers import ChangePasswordSerializer, RegisterSerializer, UserProfileSerializer
+from .authentication import ClaimsJWTAuthentication, get_full_user
+from .hashing import HashingPoolBusy, acheck_password, amake_password
+from .registration import register_user
+from .serializers import CustomTokenObtainPairSerializer
+
+User = get_user_model()
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncAPIView(View):
+    """
+    پایه‌ی ویوهای async: پارس بدنه، احراز هویت و throttle مثل APIView،
+    و برگرداندن خطاهای DRF با همان فرمت JSON.
+    """
+    http_method_names = ['post', 'options']
+    authentication_classes = []
+    throttle_classes = drf_settings.DEFAULT_THROTTLE_CLASSES
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            self.data = self.parse(request)
+            if not hasattr(request, 'user'):
+                request.user = AnonymousUser()
+            await self.perform_authentication(request)
+            await sync_to_async(self.check_throttles)(request)
+            return await super().dispatch(request, *args, **kwargs)
+        except exceptions.APIException as exc:
+            return self.handle_exception(exc)
+        except HashingPoolBusy:
+            return JsonResponse(
+                {"detail": "Server is busy, please try again shortly."},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={'Retry-After': '1'},
+            )
+
+    def parse(self, request):
+        if request.content_type == 'application/json':
+            try:
+                return json.loads(request.body or b'{}')
+            except ValueError as exc:
+                raise exceptions.ParseError(f"JSON parse error - {exc}")
+        data = request.POST.copy()
+        data.update(request.FILES)
+        return data
+
+    async def perform_authentication(self, request):
+        if not self.authentication_classes:
+            return
+        for authentication_class in self.authentication_classes:
+            authenticator = authentication_class()
+            result = await sync_to_async(authenticator.authenticate)(request)
+            if result is not None:
+                request.user, request.auth = result
+                return
+        raise exceptions.NotAuthenticated()
+
+    def check_throttles(self, request):
+        for throttle_class in self.throttle_classes:
+            throttle = throttle_class()
+            if not throttle.allow_request(request, self):
+                raise exceptions.Throttled(throttle.wait())
+
+    def handle_exception(self, exc):
+        headers = {}
+        if isinstance(exc, exceptions.Throttled) and exc.wait is not None:
+            headers['Retry-After'] = '%d' % exc.wait
+        if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+            headers['WWW-Authenticate'] = 'Bearer realm="api"'
+
+        if isinstance(exc.detail, (list, dict)):
+            data = exc.detail
+        else:
+            data = {'detail': exc.detail}
+        return JsonResponse(data, status=exc.status_code, headers=headers, safe=False)
+
+
+class AsyncLoginView(AsyncAPIView):
+    throttle_scope = 'login'
+
+    async def post(self, request, *args, **kwargs):
+        username_field = User.USERNAME_FIELD
+        errors = {
+            field: [_("This field is required.")]
+            for field in (username_field, 'password')
+            if not self.data.get(field)
+        }
+        if errors:
+            raise exceptions.ValidationError(errors)
+        password = self.data['password']
+
+        no_active_account = exceptions.AuthenticationFailed(
+            _("No active account found with the given credentials"), "no_active_account",
+        )
+        user = await User.objects.filter(**{username_field: self.data[username_field]}).afirst()
+        if user is None:
+            # مثل ModelBackend: برای کاربر ناموجود هم یک بار هش می‌کنیم تا زمان پاسخ چیزی لو ندهد
+            await amake_password(password)
+            raise no_active_account
+
+        valid, must_update = await acheck_password(password, user.password)
+        if not valid or not api_settings.USER_AUTHENTICATION_RULE(user):
+            raise no_active_account
+
+        if must_update:
+            user.password = await amake_password(password)
+            await user.asave(update_fields=['password'])
+
+        data = await sync_to_async(CustomTokenObtainPairSerializer.get_login_response)(user)
+        return JsonResponse(data)
+
+
+class AsyncRegisterView(AsyncAPIView):
+    throttle_scope = 'register'
+
+    async def post(self, request, *args, **kwargs):
+        serializer = RegisterSerializer(data=self.data, context={'request': request})
+        await sync_to_async(serializer.is_valid)(raise_exception=True)
+
+        password_hash = await amake_password(serializer.validated_data['password'])
+        data = await sync_to_async(self.create)(request, serializer, password_hash)
+        return JsonResponse(data, status=status.HTTP_201_CREATED)
+
+    def create(self, request, serializer, password_hash):
+        user, refresh = register_user(serializer, password_hash=password_hash)
+        return {
+            "user": UserProfileSerializer(user, context={'request': request}).data,
+            "refresh": str(refresh),
+            "access": str(refresh.access_token),
+        }
+
+
+class AsyncChangePasswordView(AsyncAPIView):
+    authentication_classes = [ClaimsJWTAuthentication]
+
+    async def post(self, request, *args, **kwargs):
+        serializer = ChangePasswordSerializer(data=self.data)
+        await sync_to_async(serializer.is_valid)(raise_exception=True)
+        user = await sync_to_async(get_full_user)(request.user, cached=False)
+
+        valid, must_update = await acheck_password(serializer.validated_data['old_password'], user.password)
+        if not valid:
+            return JsonResponse({"old_password": "Wrong password."}, status=status.HTTP_400_BAD_REQUEST)
+
+        user.set_password_hash(await amake_password(serializer.validated_data['new_password']))
+        await user.asave()
+        return JsonResponse({"detail": "Password changed successfully."}, status=status.HTTP_200_OK)
@@ -0,0 +1,119 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework import authentication
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+
+from .activity import activity_recorder
+
+User = get_user_model()
+
+TOKEN_VERSION_CLAIM = 'token_version'
+
+
+def _state_cache_key(user_id):
+    return f'auth:user_state:{user_id}'
+
+
+def _user_cache_key(user_id):
+    return f'auth:user:{user_id}'
+
+
+def get_user_state(user_id):
+    """
+    (token_version, is_active) کاربر را با کش کوتاه‌مدت برمی‌گرداند.
+    اگر کاربر وجود نداشته باشد None برمی‌گرداند.
+    """
+    key = _state_cache_key(user_id)
+    state = cache.get(key)
+    if state is None:
+        state = User.objects.filter(pk=user_id).values_list('token_version', 'is_active').first()
+        if state is None:
+            return None
+        cache.set(key, tuple(state), settings.JWT_CLAIMS_CACHE_TTL)
+    return state
+
+
+def forget_user(user_id):
+    """کش وضعیت و مدل کامل کاربر را پاک می‌کند (بعد از هر تغییر در ردیف کاربر)."""
+    cache.delete_many([_state_cache_key(user_id), _user_cache_key(user_id)])
+
+
+class ClaimsUser(TokenUser):
+    """
+    کاربر سبک که فقط از claimهای توکن ساخته می‌شود.
+    فیلدهایی مثل email و first_name از طریق TokenUser.__getattr__ از خود توکن خوانده می‌شوند.
+    """
+
+    def __str__(self):
+        return self.token.get('email') or self.username
+
+    def get_full_user(self, cached=True):
+        """
+        مدل کامل CustomUser را برمی‌گرداند.
+        برای خواندن از نسخه‌ی کش‌شده استفاده می‌شود؛ برای نوشتن حتماً cached=False بدهید.
+        """
+        if not cached:
+            return User.objects.get(pk=self.id)
+
+        key = _user_cache_key(self.id)
+        user = cache.get(key)
+        if user is None:
+            user = User.objects.get(pk=self.id)
+            cache.set(key, user, settings.JWT_CLAIMS_CACHE_TTL)
+        return user
+
+
+def get_full_user(user, cached=True):
+    """اگر user از نوع ClaimsUser باشد مدل کامل را بارگذاری می‌کند، در غیر این صورت همان را برمی‌گرداند."""
+    if isinstance(user, ClaimsUser):
+        return user.get_full_user(cached=cached)
+    return user
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    احراز هویت JWT بدون SELECT کامل کاربر در هر درخواست.
+    فقط نسخه‌ی توکن و وضعیت فعال بودن کاربر (با کش کوتاه‌مدت) بررسی می‌شود.
+    """
+
+    def get_user(self, validated_token):
+        if api_settings.USER_ID_CLAIM not in validated_token:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        user = ClaimsUser(validated_token)
+        state = get_user_state(user.id)
+        if state is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+
+        token_version, is_active = state
+        if api_settings.CHECK_USER_IS_ACTIVE and not is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if validated_token.get(TOKEN_VERSION_CLAIM, 0) < token_version:
+            raise AuthenticationFailed(_("Token is no longer valid"), code="token_stale")
+
+        activity_recorder.record_seen(user.id)
+        return user
+
+
+class SessionAuthentication(authentication.SessionAuthentication):
+    """
+    SessionAuthentication برای admin و browsable API.
+    در مسیرهای پشته‌ی سبک (request.jwt_only، user_service.stack) کنار می‌رود تا فقط JWT بماند و
+    درخواست بدون توکن 401 با هدر WWW-Authenticate بگیرد، نه 403.
+    """
+
+    def authenticate(self, request):
+        if getattr(request._request, 'jwt_only', False):
+            return None
+        return super().authenticate(request)
+
+    def authenticate_header(self, request):
+        if getattr(request._request, 'jwt_only', False):
+            return ClaimsJWTAuthentication().authenticate_header(request)
+        return super().authenticate_header(request)
@@ -0,0 +1,77 @@
+import jwt
+from django.utils.translation import gettext_lazy as _
+from jwt import ExpiredSignatureError, InvalidAlgorithmError, InvalidTokenError
+from rest_framework_simplejwt.backends import TokenBackend
+from rest_framework_simplejwt.exceptions import TokenBackendError, TokenBackendExpiredToken
+from rest_framework_simplejwt.settings import api_settings
+
+from user_service.metrics import timed
+
+from .keys import get_key_ring
+
+
+class KeyRingTokenBackend(TokenBackend):
+    """
+    TokenBackend که با کلید فعال KeyRing امضا می‌کند و kid را در هدر توکن می‌گذارد.
+    تأیید بر اساس kid انجام می‌شود، پس چرخش کلید توکن‌های قبلی را باطل نمی‌کند.
+    الگوریتم امضا و تأیید، الگوریتم همان کلید است (RS256، ES256 یا EdDSA).
+    """
+
+    def __init__(self, key_ring, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.key_ring = key_ring
+
+    @classmethod
+    def from_settings(cls):
+        return cls(
+            get_key_ring(),
+            api_settings.ALGORITHM,
+            audience=api_settings.AUDIENCE,
+            issuer=api_settings.ISSUER,
+            leeway=api_settings.LEEWAY,
+            json_encoder=api_settings.JSON_ENCODER,
+        )
+
+    def encode(self, payload):
+        key = self.key_ring.active
+        jwt_payload = payload.copy()
+        if self.audience is not None:
+            jwt_payload["aud"] = self.audience
+        if self.issuer is not None:
+            jwt_payload["iss"] = self.issuer
+
+        with timed('jwt_sign'):
+            return jwt.encode(
+                jwt_payload,
+                key.private_key,
+                algorithm=key.algorithm,
+                headers={'kid': key.kid},
+                json_encoder=self.json_encoder,
+            )
+
+    def get_verifying_key(self, token):
+        return self.key_ring.get_verifying_key(token)
+
+    def decode(self, token, verify=True):
+        try:
+            key = self.key_ring.get_verifying_jwt_key(token)
+            with timed('jwt_verify'):
+                return jwt.decode(
+                    token,
+                    key.public_key,
+                    # فقط الگوریتم همان کلید؛ هدر alg توکن نمی‌تواند آن را عوض کند
+                    algorithms=[key.algorithm],
+                    audience=self.audience,
+                    issuer=self.issuer,
+                    leeway=self.get_leeway(),
+                    options={
+                        "verify_aud": self.audience is not None,
+                        "verify_signature": verify,
+                    },
+                )
+        except InvalidAlgorithmError as e:
+            raise TokenBackendError(_("Invalid algorithm specified")) from e
+        except ExpiredSignatureError as e:
+            raise TokenBackendExpiredToken(_("Token is expired")) from e
+        except InvalidTokenError as e:
+            raise TokenBackendError(_("Token is invalid")) from e
@@ -0,0 +1,90 @@
+"""
+ایندکس درون‌حافظه‌ای jtiهای بلک‌لیست‌شده.
+
+هر پروسه یک مجموعه از jtiها نگه می‌دارد و هر JWT_BLACKLIST_SYNC_INTERVAL ثانیه فقط ردیف‌های جدید
+BlacklistedToken (بعد از بالاترین id دیده‌شده) را می‌خواند. بنابراین بررسی یک refresh token سالم
+هیچ کوئری‌ای به دیتابیس نمی‌زند. توکنی که در یک پروسه‌ی دیگر بلک‌لیست شود حداکثر پس از یک
+دوره‌ی همگام‌سازی در این پروسه هم رد می‌شود.
+"""
+import threading
+import time
+
+from django.conf import settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+from user_service.metrics import registry
+
+# تراکنش‌های هم‌زمان ممکن است idها را خارج از ترتیب commit کنند؛
+# برای همین هر همگام‌سازی چند id قبل از high-water mark را هم دوباره می‌خواند.
+SYNC_OVERLAP = 100
+
+
+class BlacklistIndex:
+    def __init__(self, sync_interval, rebuild_interval):
+        self.sync_interval = sync_interval
+        self.rebuild_interval = rebuild_interval
+        self._lock = threading.Lock()
+        self._jtis = set()
+        self._high_water = 0
+        self._synced_at = None
+        self._rebuilt_at = None
+
+    def _fetch(self, since_id):
+        rows = (
+            BlacklistedToken.objects
+            .filter(id__gt=since_id)
+            .order_by('id')
+            .values_list('id', 'token__jti')
+        )
+        return rows.iterator(chunk_size=2000)
+
+    def rebuild(self):
+        """ساخت کامل ایندکس؛ ردیف‌های حذف‌شده (مثلاً توکن‌های منقضی) هم از حافظه پاک می‌شوند."""
+        started = time.perf_counter()
+        jtis = set()
+        high_water = 0
+        for pk, jti in self._fetch(0):
+            jtis.add(jti)
+            high_water = pk
+        registry.observe('token_lookup_seconds', (('lookup', 'blacklist_rebuild'),), time.perf_counter() - started)
+        now = time.monotonic()
+        self._jtis, self._high_water = jtis, high_water
+        self._synced_at = self._rebuilt_at = now
+
+    def sync(self):
+        """خواندن افزایشی ردیف‌های جدید BlacklistedToken."""
+        started = time.perf_counter()
+        for pk, jti in self._fetch(max(self._high_water - SYNC_OVERLAP, 0)):
+            self._jtis.add(jti)
+            if pk > self._high_water:
+                self._high_water = pk
+        registry.observe('token_lookup_seconds', (('lookup', 'blacklist_sync'),), time.perf_counter() - started)
+        self._synced_at = time.monotonic()
+
+    def maybe_sync(self):
+        now = time.monotonic()
+        if self._synced_at is not None and now - self._synced_at < self.sync_interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            if self._rebuilt_at is None or now - self._rebuilt_at >= self.rebuild_interval:
+                self.rebuild()
+            elif now - self._synced_at >= self.sync_interval:
+                self.sync()
+
+    def add(self, jti):
+        # توکنی که در همین پروسه بلک‌لیست می‌شود بلافاصله رد می‌شود
+        self._jtis.add(jti)
+
+    def contains(self, jti):
+        self.maybe_sync()
+        return jti in self._jtis
+
+    def __len__(self):
+        return len(self._jtis)
+
+
+blacklist_index = BlacklistIndex(
+    sync_interval=settings.JWT_BLACKLIST_SYNC_INTERVAL,
+    rebuild_interval=settings.JWT_BLACKLIST_REBUILD_INTERVAL,
+)
@@ -0,0 +1,22 @@
+"""
+همان hasherهای پیش‌فرض جنگو، با ثبت زمان هش و بررسی رمز در متریک‌های درخواست (user_service.metrics).
+نام الگوریتم‌ها عوض نمی‌شود، پس هش‌های موجود بدون تغییر معتبرند.
+"""
+from django.contrib.auth import hashers
+
+from user_service.metrics import timed
+
+
+class TimedHasherMixin:
+    # verify() در PBKDF2 هم از encode() استفاده می‌کند، پس هش و بررسی هر دو همین‌جا ثبت می‌شوند
+    def encode(self, *args, **kwargs):
+        with timed('password_hash'):
+            return super().encode(*args, **kwargs)
+
+
+class PBKDF2PasswordHasher(TimedHasherMixin, hashers.PBKDF2PasswordHasher):
+    pass
+
+
+class PBKDF2SHA1PasswordHasher(TimedHasherMixin, hashers.PBKDF2SHA1PasswordHasher):
+    pass
@@ -0,0 +1,127 @@
+"""
+اجرای هش رمز عبور (PBKDF2) در یک ProcessPool محدود.
+
+هش کردن رمز CPU-bound است و روی thread درخواست، بقیه‌ی درخواست‌های همان worker را گرسنه می‌گذارد.
+ویوهای async (authentication.async_views) هش را به این pool می‌سپارند. تعداد پروسه‌ها
+PASSWORD_HASHING_WORKERS و حداکثر کارهای در صف PASSWORD_HASHING_QUEUE_DEPTH است؛ بیش از آن
+HashingPoolBusy برمی‌گردد تا درخواست با 503 رد شود، نه این‌که صف بی‌انتها بزرگ شود.
+"""
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, get_hasher, identify_hasher, make_password
+
+from user_service.metrics import timed
+
+
+class HashingPoolBusy(Exception):
+    pass
+
+
+def _init_worker():
+    # پروسه‌ها با spawn ساخته می‌شوند و باید تنظیمات جنگو را خودشان بارگذاری کنند
+    import django
+    django.setup()
+
+
+def _make_password(raw_password):
+    return make_password(raw_password)
+
+
+def _check_password(raw_password, encoded):
+    return check_password(raw_password, encoded)
+
+
+def create_process_pool(max_workers):
+    """ProcessPoolExecutor آماده برای هش رمز (پروسه‌ها با spawn و تنظیمات جنگو)"""
+    return ProcessPoolExecutor(
+        max_workers=max_workers,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=_init_worker,
+    )
+
+
+def hash_passwords(executor, raw_passwords, chunksize=16):
+    """
+    هش دسته‌ای رمزها روی executor؛ کارها بلافاصله ارسال می‌شوند و نتیجه یک iterator هم‌ترتیب با ورودی است،
+    پس فراخواننده می‌تواند تا آماده شدن هش‌ها کار دیگری (مثلاً insert دسته‌ی قبلی) انجام دهد.
+    """
+    return executor.map(_make_password, raw_passwords, chunksize=chunksize)
+
+
+class HashingPool:
+    def __init__(self, max_workers, queue_depth):
+        self.max_workers = max_workers
+        self.queue_depth = queue_depth
+        self._executor = None
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_workers + queue_depth)
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = create_process_pool(self.max_workers)
+        return self._executor
+
+    async def run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise HashingPoolBusy()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, fn, *args)
+        finally:
+            self._slots.release()
+
+    def warm_up(self):
+        """همه‌ی پروسه‌ها را از قبل بالا می‌آورد تا اولین لاگین هزینه‌ی spawn را ندهد."""
+        futures = [self.executor.submit(os.getpid) for _ in range(self.max_workers)]
+        for future in futures:
+            future.result()
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_hashing_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = HashingPool(
+                    settings.PASSWORD_HASHING_WORKERS,
+                    settings.PASSWORD_HASHING_QUEUE_DEPTH,
+                )
+    return _pool
+
+
+async def amake_password(raw_password):
+    # شامل انتظار در صف pool
+    with timed('password_hash'):
+        return await get_hashing_pool().run(_make_password, raw_password)
+
+
+async def acheck_password(raw_password, encoded):
+    """مثل check_password جنگو؛ (معتبر بودن، نیاز به هش مجدد با تنظیمات فعلی) را برمی‌گرداند."""
+    with timed('password_hash'):
+        valid = await get_hashing_pool().run(_check_password, raw_password, encoded)
+    must_update = False
+    if valid:
+        preferred = get_hasher('default')
+        must_update = (
+            identify_hasher(encoded).algorithm != preferred.algorithm
+            or preferred.must_update(encoded)
+        )
+    return valid, must_update
@@ -0,0 +1,108 @@
+"""
+بررسی دسته‌ای توکن‌ها برای gateway (TokenIntrospectView).
+
+نتیجه‌ی تأیید امضای هر توکن در یک LRU درون‌حافظه‌ای با کلید sha256 توکن نگه داشته می‌شود و هر
+ورودی دقیقاً در exp همان توکن منقضی می‌شود؛ پس تأیید دوباره‌ی یک توکن پرتکرار فقط یک lookup در dict است.
+فقط نتیجه‌ی موفق کش می‌شود. ابطال‌ها (بلک‌لیست refresh و token_version/غیرفعال شدن کاربر)
+در هر بار بررسی از منابع سبک خودشان خوانده می‌شوند، نه از کش.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from rest_framework_simplejwt import state
+from rest_framework_simplejwt.exceptions import TokenBackendError
+from rest_framework_simplejwt.settings import api_settings
+
+from .authentication import TOKEN_VERSION_CLAIM, get_user_state
+from .blacklist import blacklist_index
+
+
+class VerifiedTokenCache:
+    """LRU از (exp، claims) به ازای sha256 توکن"""
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= now:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, exp, claims):
+        with self._lock:
+            self._entries[key] = (exp, claims)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+verified_tokens = VerifiedTokenCache(settings.TOKEN_INTROSPECTION_CACHE_SIZE)
+
+
+def verify_token(token):
+    """claimهای توکن با امضای معتبر و منقضی‌نشده؛ در غیر این صورت TokenBackendError"""
+    key = hashlib.sha256(token.encode()).digest()
+    claims = verified_tokens.get(key)
+    if claims is None:
+        # state.token_backend همان KeyRingTokenBackend است (AuthenticationConfig.ready)
+        claims = state.token_backend.decode(token, verify=True)
+        if not isinstance(claims.get('exp'), (int, float)):
+            raise TokenBackendError("Token has no expiration")
+        verified_tokens.set(key, claims['exp'], claims)
+    return claims
+
+
+def check_revoked(claims, user_states):
+    """دلیل باطل بودن توکنی که امضایش معتبر است، یا None"""
+    token_type = claims.get(api_settings.TOKEN_TYPE_CLAIM)
+    if token_type == 'refresh' and blacklist_index.contains(claims.get(api_settings.JTI_CLAIM)):
+        return "Token is blacklisted"
+
+    user_id = claims.get(api_settings.USER_ID_CLAIM)
+    if user_id is None:
+        return "Token contained no recognizable user identification"
+    if user_id not in user_states:
+        user_states[user_id] = get_user_state(user_id)
+    user_state = user_states[user_id]
+    if user_state is None:
+        return "User not found"
+    token_version, is_active = user_state
+    if api_settings.CHECK_USER_IS_ACTIVE and not is_active:
+        return "User is inactive"
+    if claims.get(TOKEN_VERSION_CLAIM, 0) < token_version:
+        return "Token is no longer valid"
+    return None
+
+
+def introspect_tokens(tokens):
+    """برای هر توکن، به همان ترتیب: {"active": true, "claims": ...} یا {"active": false, "error": ...}"""
+    results = []
+    # وضعیت هر کاربر یک بار در هر دسته
+    user_states = {}
+    for token in tokens:
+        try:
+            claims = verify_token(token)
+        except TokenBackendError as exc:
+            results.append({'active': False, 'error': str(exc)})
+            continue
+        error = check_revoked(claims, user_states)
+        if error is not None:
+            results.append({'active': False, 'error': error})
+        else:
+            results.append({'active': True, 'claims': claims})
+    return results
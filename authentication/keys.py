@@ -0,0 +1,193 @@
+"""
+مدیریت کلیدهای امضای JWT.
+
+هر جفت کلید در JWT_KEYS_DIR با نام‌های ``<kid>_private.pem`` و ``<kid>_public.pem`` قرار می‌گیرد
+و نام فایل (kid) در هدر توکن‌ها نوشته می‌شود. کلیدی که فقط فایل public دارد بازنشسته است:
+هنوز در JWKS منتشر می‌شود و توکن‌های قبلی را تأیید می‌کند، ولی چیزی با آن امضا نمی‌شود.
+
+الگوریتم هر کلید از نوع آن تعیین می‌شود: RSA با SIMPLE_JWT['ALGORITHM']، EC P-256 با ES256 و
+Ed25519 با EdDSA (manage.py generate_jwt_key). کلیدها یک بار برای هر پروسه پارس می‌شوند و همان
+شیء کلید برای امضا و تأیید استفاده می‌شود.
+
+کلید فعال برای امضا از فایل ``active_kid`` در همان پوشه، سپس JWT_ACTIVE_KID و در نهایت
+prod/dev انتخاب می‌شود. تغییر فایل‌ها بدون ری‌استارت و حداکثر پس از JWT_KEYS_RELOAD_INTERVAL
+ثانیه اعمال می‌شود. خواندن و پارس اولین بار هنگام اولین استفاده انجام می‌شود، نه هنگام راه‌اندازی پروسه.
+"""
+import hashlib
+import json
+import threading
+import time
+from pathlib import Path
+
+import jwt
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa
+from cryptography.hazmat.primitives.serialization import load_pem_private_key, load_pem_public_key
+from django.conf import settings
+
+PRIVATE_SUFFIX = '_private.pem'
+PUBLIC_SUFFIX = '_public.pem'
+ACTIVE_KID_FILE = 'active_kid'
+DEFAULT_KIDS = ('prod', 'dev')
+EC_ALGORITHMS = {'secp256r1': 'ES256', 'secp384r1': 'ES384', 'secp521r1': 'ES512'}
+
+
+def algorithm_for_key(key, rsa_algorithm):
+    """الگوریتم JWT مناسب برای شیء کلید (public یا private)"""
+    if isinstance(key, (rsa.RSAPrivateKey, rsa.RSAPublicKey)):
+        return rsa_algorithm
+    if isinstance(key, (ec.EllipticCurvePrivateKey, ec.EllipticCurvePublicKey)) and key.curve.name in EC_ALGORITHMS:
+        return EC_ALGORITHMS[key.curve.name]
+    if isinstance(key, (ed25519.Ed25519PrivateKey, ed25519.Ed25519PublicKey)):
+        return 'EdDSA'
+    raise ValueError(f"Unsupported JWT key type: {type(key).__name__}")
+
+
+class JWTKey:
+    def __init__(self, kid, algorithm, public_key, private_key=None):
+        self.kid = kid
+        self.algorithm = algorithm
+        self.public_key = public_key
+        self.private_key = private_key
+
+    @property
+    def can_sign(self):
+        return self.private_key is not None
+
+    def to_jwk(self):
+        jwk = jwt.PyJWS().get_algorithm_by_name(self.algorithm).to_jwk(self.public_key, as_dict=True)
+        jwk.update({'kid': self.kid, 'alg': self.algorithm, 'use': 'sig'})
+        return jwk
+
+
+class KeyRing:
+    def __init__(self, directory, rsa_algorithm, active_kid=None, reload_interval=30):
+        self.directory = Path(directory)
+        self.rsa_algorithm = rsa_algorithm
+        self.default_active_kid = active_kid
+        self.reload_interval = reload_interval
+        self._lock = threading.Lock()
+        self._fingerprint = None
+        # None یعنی هنوز بارگذاری نشده
+        self._checked_at = None
+        self._keys = {}
+        self._active = None
+        self._jwks = None
+        self._etag = None
+
+    def _scan(self):
+        """لیست فایل‌های کلید به همراه mtime؛ برای تشخیص تغییر بدون خواندن محتوا."""
+        entries = []
+        for path in sorted(self.directory.glob('*.pem')):
+            entries.append((path.name, path.stat().st_mtime_ns))
+        active_file = self.directory / ACTIVE_KID_FILE
+        if active_file.exists():
+            entries.append((ACTIVE_KID_FILE, active_file.stat().st_mtime_ns))
+        return tuple(entries)
+
+    def _load_keys(self):
+        keys = {}
+        for path in self.directory.glob('*' + PUBLIC_SUFFIX):
+            kid = path.name[:-len(PUBLIC_SUFFIX)]
+            public_key = load_pem_public_key(path.read_bytes())
+            keys[kid] = JWTKey(kid, algorithm_for_key(public_key, self.rsa_algorithm), public_key)
+
+        for path in self.directory.glob('*' + PRIVATE_SUFFIX):
+            kid = path.name[:-len(PRIVATE_SUFFIX)]
+            private_key = load_pem_private_key(path.read_bytes(), password=None)
+            if kid in keys:
+                keys[kid].private_key = private_key
+            else:
+                algorithm = algorithm_for_key(private_key, self.rsa_algorithm)
+                keys[kid] = JWTKey(kid, algorithm, private_key.public_key(), private_key)
+        return keys
+
+    def _choose_active(self, keys):
+        candidates = []
+        active_file = self.directory / ACTIVE_KID_FILE
+        if active_file.exists():
+            candidates.append(active_file.read_text().strip())
+        if self.default_active_kid:
+            candidates.append(self.default_active_kid)
+        candidates.extend(DEFAULT_KIDS)
+
+        for kid in candidates:
+            if kid in keys and keys[kid].can_sign:
+                return keys[kid]
+        raise RuntimeError(f"No usable JWT signing key found in {self.directory}.")
+
+    def reload(self):
+        with self._lock:
+            fingerprint = self._scan()
+            self._checked_at = time.monotonic()
+            if fingerprint == self._fingerprint:
+                return False
+
+            keys = self._load_keys()
+            active = self._choose_active(keys)
+            jwks = {'keys': [keys[kid].to_jwk() for kid in sorted(keys)]}
+            body = json.dumps(jwks, sort_keys=True).encode()
+
+            self._keys, self._active, self._jwks = keys, active, jwks
+            self._etag = hashlib.sha256(body).hexdigest()[:32]
+            self._fingerprint = fingerprint
+            return True
+
+    def maybe_reload(self):
+        if self._checked_at is None or time.monotonic() - self._checked_at >= self.reload_interval:
+            self.reload()
+
+    @property
+    def etag(self):
+        self.maybe_reload()
+        return self._etag
+
+    @property
+    def active(self):
+        self.maybe_reload()
+        return self._active
+
+    def get(self, kid):
+        """کلید با kid داده‌شده؛ برای kid ناشناخته یک بار پوشه را دوباره می‌خواند."""
+        self.maybe_reload()
+        key = self._keys.get(kid)
+        # حداکثر یک بار در ثانیه، تا kid جعلی باعث اسکن پوشه در هر درخواست نشود
+        if key is None and time.monotonic() - self._checked_at >= 1 and self.reload():
+            key = self._keys.get(kid)
+        return key
+
+    def get_verifying_jwt_key(self, token):
+        """JWTKey مناسب برای تأیید توکن را بر اساس هدر kid برمی‌گرداند."""
+        kid = jwt.get_unverified_header(token).get('kid')
+        if kid is None:
+            # توکن‌های صادرشده قبل از اضافه شدن kid
+            return self.active
+        key = self.get(kid)
+        if key is None:
+            raise jwt.InvalidTokenError(f"Unknown signing key id '{kid}'")
+        return key
+
+    def get_verifying_key(self, token):
+        """کلید عمومی مناسب برای توکن را بر اساس هدر kid برمی‌گرداند."""
+        return self.get_verifying_jwt_key(token).public_key
+
+    def jwks(self):
+        self.maybe_reload()
+        return self._jwks
+
+
+_key_ring = None
+_key_ring_lock = threading.Lock()
+
+
+def get_key_ring():
+    global _key_ring
+    if _key_ring is None:
+        with _key_ring_lock:
+            if _key_ring is None:
+                _key_ring = KeyRing(
+                    settings.JWT_KEYS_DIR,
+                    settings.SIMPLE_JWT['ALGORITHM'],
+                    active_kid=settings.JWT_ACTIVE_KID,
+                    reload_interval=settings.JWT_KEYS_RELOAD_INTERVAL,
+                )
+    return _key_ring
@@ -0,0 +1,284 @@
+import http.client
+import itertools
+import json
+import math
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+from urllib.parse import urlsplit
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client
+from django.urls import reverse
+
+from authentication.activity import activity_recorder
+from authentication.serializers import CustomTokenObtainPairSerializer
+
+User = get_user_model()
+
+PASSWORD = 'benchmark-Passw0rd!'
+EMAIL_DOMAIN = 'bench.invalid'
+ENDPOINTS = ('register', 'login', 'refresh', 'profile', 'decode', 'users')
+
+
+class InProcessTransport:
+    """درخواست از مسیر کامل middleware و view جنگو، بدون شبکه؛ یک Client برای هر thread"""
+
+    def __init__(self):
+        self._local = threading.local()
+        # هر درخواست IP جدا دارد تا throttleهای هر IP (login، register، anon) نتیجه را عوض نکنند
+        self._addresses = itertools.count(1)
+
+    def request(self, method, path, body=None, token=None):
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = Client(raise_request_exception=False)
+        number = next(self._addresses)
+        extra = {'REMOTE_ADDR': f'198.18.{number >> 8 & 255}.{number & 255}'}
+        if token:
+            extra['HTTP_AUTHORIZATION'] = f'Bearer {token}'
+        response = client.generic(
+            method, path, json.dumps(body) if body is not None else '',
+            content_type='application/json', **extra,
+        )
+        return response.status_code
+
+    def close(self):
+        connections.close_all()
+
+
+class HTTPTransport:
+    """درخواست به یک سرور در حال اجرا؛ یک اتصال keep-alive برای هر thread"""
+
+    def __init__(self, url):
+        parts = urlsplit(url)
+        self.connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+        self.netloc = parts.netloc
+        self.prefix = parts.path.rstrip('/')
+        self._local = threading.local()
+
+    def request(self, method, path, body=None, token=None):
+        headers = {'Content-Type': 'application/json', 'Accept': 'application/json'}
+        if token:
+            headers['Authorization'] = f'Bearer {token}'
+        payload = json.dumps(body) if body is not None else None
+        for attempt in (1, 2):
+            connection = getattr(self._local, 'connection', None)
+            if connection is None:
+                connection = self._local.connection = self.connection_class(self.netloc, timeout=30)
+            try:
+                connection.request(method, self.prefix + path, payload, headers)
+                response = connection.getresponse()
+                response.read()
+                return response.status
+            except (http.client.HTTPException, OSError):
+                # اتصال keep-alive بسته شده؛ یک بار دوباره
+                connection.close()
+                self._local.connection = None
+                if attempt == 2:
+                    return 'error'
+
+    def close(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            connection.close()
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed users and drive register, login, token refresh, profile, token decode and the admin user list "
+        "at a given concurrency, in-process (on a throwaway test database) or against a running server "
+        "(--url, seeding the configured database). Reports throughput and p50/p95/p99 latency as JSON. "
+        "Against a server the per-IP throttles apply, so expect 429s unless the rates are raised."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200, help="Users seeded before the run.")
+        parser.add_argument('--requests', type=int, default=200, help="Measured requests per endpoint.")
+        parser.add_argument('--concurrency', type=int, default=4, help="Concurrent clients (threads).")
+        parser.add_argument('--warmup', type=int, default=10, help="Unmeasured requests per endpoint.")
+        parser.add_argument(
+            '--endpoints', nargs='+', choices=ENDPOINTS, default=list(ENDPOINTS),
+            help="Endpoints to measure, in order.",
+        )
+        parser.add_argument(
+            '--url', default='',
+            help="Base URL of a running server (e.g. http://127.0.0.1:8000); in-process when omitted.",
+        )
+
+    def handle(self, *args, **options):
+        if options['users'] < 1 or options['concurrency'] < 1:
+            raise CommandError("--users and --concurrency must be at least 1.")
+        if options['url']:
+            transport = HTTPTransport(options['url'])
+            self._run(transport, options)
+            return
+
+        # in-process روی یک دیتابیس تست جدا، تا دیتابیس اصلی دست نخورد
+        from django.test.runner import DiscoverRunner
+        from django.test.utils import setup_test_environment, teardown_test_environment
+
+        with tempfile.TemporaryDirectory() as directory:
+            default = connections['default'].settings_dict
+            if default['ENGINE'] == 'django.db.backends.sqlite3':
+                # SQLite درون‌حافظه‌ای با shared cache زیر نوشتن هم‌زمان قفل جدول می‌دهد؛ فایل موقت به جای آن
+                default.setdefault('TEST', {})['NAME'] = f'{directory}/bench.sqlite3'
+            setup_test_environment()
+            runner = DiscoverRunner(verbosity=0, interactive=False)
+            old_config = runner.setup_databases()
+            try:
+                self._run(InProcessTransport(), options)
+            finally:
+                # last_login/last_seen بافرشده قبل از حذف دیتابیس تست نوشته شوند، نه در atexit روی دیتابیس اصلی
+                activity_recorder.shutdown()
+                connections.close_all()
+                runner.teardown_databases(old_config)
+                teardown_test_environment()
+
+    def _run(self, transport, options):
+        run_id = uuid.uuid4().hex[:8]
+        users, admin = self._seed(run_id, options['users'])
+        try:
+            results = []
+            for endpoint in options['endpoints']:
+                count = options['requests'] + options['warmup']
+                requests = getattr(self, f'_{endpoint}_requests')(run_id, users, admin, count)
+                warmup, measured = requests[:options['warmup']], requests[options['warmup']:]
+                self._drive(transport, warmup, options['concurrency'])
+                results.append(self._result(endpoint, *self._drive(transport, measured, options['concurrency'])))
+        finally:
+            User.objects.filter(email__endswith=f'-{run_id}@{EMAIL_DOMAIN}').delete()
+
+        self.stdout.write(json.dumps({
+            'mode': 'http' if options['url'] else 'in-process',
+            'users': options['users'],
+            'concurrency': options['concurrency'],
+            'results': results,
+        }, indent=2))
+
+    def _seed(self, run_id, count):
+        # یک بار hash برای همه، تا seed کردن چند ثانیه طول نکشد
+        password = make_password(PASSWORD)
+        users = User.objects.bulk_create([
+            User(
+                email=f'bench{i}-{run_id}@{EMAIL_DOMAIN}',
+                username=f'bench{i}-{run_id}',
+                first_name='Bench',
+                last_name=f'User {i}',
+                password=password,
+            )
+            for i in range(count)
+        ])
+        admin = User.objects.create(
+            email=f'admin-{run_id}@{EMAIL_DOMAIN}',
+            username=f'admin-{run_id}',
+            first_name='Bench',
+            last_name='Admin',
+            password=password,
+            is_staff=True,
+        )
+        return users, admin
+
+    def _access_tokens(self, users, count):
+        return [str(CustomTokenObtainPairSerializer.get_token(user).access_token) for user in users[:count]]
+
+    def _register_requests(self, run_id, users, admin, count):
+        return [
+            ('POST', reverse('auth:register'), {
+                'email': f'new{i}-{run_id}@{EMAIL_DOMAIN}',
+                'username': f'new{i}-{run_id}',
+                'first_name': 'Bench',
+                'last_name': f'New {i}',
+                'password': PASSWORD,
+                'password_confirm': PASSWORD,
+            }, None)
+            for i in range(count)
+        ]
+
+    def _login_requests(self, run_id, users, admin, count):
+        return [
+            ('POST', reverse('auth:login'), {'email': user.email, 'password': PASSWORD}, None)
+            for user in itertools.islice(itertools.cycle(users), count)
+        ]
+
+    def _refresh_requests(self, run_id, users, admin, count):
+        # refresh بعد از rotation بلک‌لیست می‌شود، پس یک توکن جدا برای هر درخواست
+        return [
+            ('POST', reverse('auth:token_refresh'), {'refresh': str(CustomTokenObtainPairSerializer.get_token(user))}, None)
+            for user in itertools.islice(itertools.cycle(users), count)
+        ]
+
+    def _profile_requests(self, run_id, users, admin, count):
+        tokens = self._access_tokens(users, count)
+        return [('GET', reverse('auth:profile'), None, token) for token in itertools.islice(itertools.cycle(tokens), count)]
+
+    def _decode_requests(self, run_id, users, admin, count):
+        tokens = self._access_tokens(users, count)
+        return [
+            ('POST', reverse('auth:token-decode'), {'token': token}, None)
+            for token in itertools.islice(itertools.cycle(tokens), count)
+        ]
+
+    def _users_requests(self, run_id, users, admin, count):
+        token = self._access_tokens([admin], 1)[0]
+        return [('GET', reverse('users:user-list'), None, token)] * count
+
+    def _drive(self, transport, requests, concurrency):
+        """requests را با concurrency thread اجرا می‌کند: (زمان هر درخواست، وضعیت‌ها، کل زمان)"""
+        if not requests:
+            return [], Counter(), 0.0
+        latencies = []
+        statuses = Counter()
+        lock = threading.Lock()
+        queue = iter(requests)
+
+        def worker():
+            local_latencies, local_statuses = [], Counter()
+            try:
+                while True:
+                    with lock:
+                        item = next(queue, None)
+                    if item is None:
+                        break
+                    start = time.perf_counter()
+                    status = transport.request(*item)
+                    local_latencies.append(time.perf_counter() - start)
+                    local_statuses[str(status)] += 1
+            finally:
+                transport.close()
+                with lock:
+                    latencies.extend(local_latencies)
+                    statuses.update(local_statuses)
+
+        threads = [threading.Thread(target=worker) for _ in range(min(concurrency, len(requests)))]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return latencies, statuses, time.perf_counter() - start
+
+    def _result(self, endpoint, latencies, statuses, elapsed):
+        latencies = sorted(latencies)
+        return {
+            'endpoint': endpoint,
+            'requests': len(latencies),
+            'seconds': round(elapsed, 3),
+            'requests_per_second': round(len(latencies) / elapsed, 2) if elapsed else None,
+            'p50_ms': self._percentile(latencies, 50),
+            'p95_ms': self._percentile(latencies, 95),
+            'p99_ms': self._percentile(latencies, 99),
+            'statuses': dict(statuses),
+        }
+
+    def _percentile(self, latencies, percent):
+        # nearest-rank
+        if not latencies:
+            return None
+        index = max(math.ceil(percent / 100 * len(latencies)) - 1, 0)
+        return round(latencies[index] * 1000, 2)
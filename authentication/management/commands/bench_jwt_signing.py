@@ -0,0 +1,72 @@
+import json
+import time
+
+import jwt
+from cryptography.hazmat.primitives import serialization
+from django.core.management.base import BaseCommand
+
+from authentication.management.commands.generate_jwt_key import KEY_FACTORIES, generate_private_key
+
+PAYLOAD = {
+    'token_type': 'access',
+    'user_id': '00000000-0000-0000-0000-000000000000',
+    'jti': '0123456789abcdef0123456789abcdef',
+    'exp': 4102444800,
+    'iat': 1700000000,
+    'email': 'bench@example.com',
+    'is_staff': False,
+    'token_version': 0,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure JWT sign and verify operations per second for each supported key algorithm, "
+        "with keys parsed once (as authentication.keys does) and, for comparison, re-parsed from PEM per call."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--algorithms', nargs='+', choices=sorted(KEY_FACTORIES), default=sorted(KEY_FACTORIES))
+        parser.add_argument('--seconds', type=float, default=1.0, help="Time spent on each measurement.")
+
+    def handle(self, *args, **options):
+        seconds = options['seconds']
+        results = []
+        for algorithm in options['algorithms']:
+            private_key = generate_private_key(algorithm)
+            public_key = private_key.public_key()
+            private_pem = private_key.private_bytes(
+                serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption(),
+            )
+            public_pem = public_key.public_bytes(
+                serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo,
+            )
+            token = jwt.encode(PAYLOAD, private_key, algorithm=algorithm)
+
+            results.append({
+                'algorithm': algorithm,
+                'token_bytes': len(token),
+                'sign_per_second': self._rate(seconds, lambda: jwt.encode(PAYLOAD, private_key, algorithm=algorithm)),
+                'verify_per_second': self._rate(
+                    seconds, lambda: jwt.decode(token, public_key, algorithms=[algorithm]),
+                ),
+                'sign_from_pem_per_second': self._rate(
+                    seconds, lambda: jwt.encode(PAYLOAD, private_pem, algorithm=algorithm),
+                ),
+                'verify_from_pem_per_second': self._rate(
+                    seconds, lambda: jwt.decode(token, public_pem, algorithms=[algorithm]),
+                ),
+            })
+
+        self.stdout.write(json.dumps({'results': results}, indent=2))
+
+    def _rate(self, seconds, fn):
+        count = 0
+        start = time.perf_counter()
+        deadline = start + seconds
+        while True:
+            fn()
+            count += 1
+            now = time.perf_counter()
+            if now >= deadline:
+                return round(count / (now - start), 1)
@@ -0,0 +1,120 @@
+import io
+import itertools
+import json
+import math
+import sys
+import tempfile
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.urls import reverse
+
+from authentication.activity import activity_recorder
+from authentication.serializers import CustomTokenObtainPairSerializer
+from user_service.stack import LeanWSGIHandler
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare per-request cost of the full MIDDLEWARE stack with the lean API_MIDDLEWARE stack "
+        "(user_service.stack) on JWT-authenticated API requests, in-process on a throwaway test database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000, help="Requests per stack and endpoint in each round.")
+        parser.add_argument('--rounds', type=int, default=3, help="Rounds per stack; the best one is reported.")
+
+    def handle(self, *args, **options):
+        from django.test.runner import DiscoverRunner
+        from django.test.utils import setup_test_environment, teardown_test_environment
+
+        with tempfile.TemporaryDirectory() as directory:
+            default = connections['default'].settings_dict
+            if default['ENGINE'] == 'django.db.backends.sqlite3':
+                default.setdefault('TEST', {})['NAME'] = f'{directory}/bench.sqlite3'
+            setup_test_environment()
+            runner = DiscoverRunner(verbosity=0, interactive=False)
+            old_config = runner.setup_databases()
+            try:
+                results = self._run(options['requests'], options['rounds'])
+            finally:
+                activity_recorder.shutdown()
+                connections.close_all()
+                runner.teardown_databases(old_config)
+                teardown_test_environment()
+
+        self.stdout.write(json.dumps({
+            'full_middleware': settings.MIDDLEWARE,
+            'lean_middleware': settings.API_MIDDLEWARE,
+            'authentication_classes': settings.REST_FRAMEWORK['DEFAULT_AUTHENTICATION_CLASSES'],
+            'results': results,
+        }, indent=2))
+
+    def _run(self, count, rounds):
+        stacks = {'full': WSGIHandler(), 'lean': LeanWSGIHandler()}
+        endpoints = {
+            'profile': reverse('auth:profile'),
+            'users': reverse('users:user-list') + '?cursor=&page_size=5',
+        }
+        warmup = min(count, 200)
+        # throttle کاربر (user: 1000/day) روی هر دو پشته یکسان است؛ با چند ادمین هیچ درخواستی به 429 نمی‌رسد
+        total = len(endpoints) * len(stacks) * (1 + warmup + rounds * count)
+        admins = User.objects.bulk_create([
+            User(
+                email=f'bench-admin{i}@bench.invalid', username=f'bench-admin{i}',
+                first_name='Bench', last_name=f'Admin {i}', is_staff=True,
+            )
+            for i in range(math.ceil(total / 900))
+        ])
+        tokens = itertools.cycle([str(CustomTokenObtainPairSerializer.get_token(admin).access_token) for admin in admins])
+
+        results = []
+        for endpoint, path in endpoints.items():
+            timings = {}
+            for name, handler in stacks.items():
+                # کش پروفایل، وضعیت کاربر و اتصال دیتابیس گرم باشند
+                status = self._request(handler, path, next(tokens))
+                for _ in range(warmup):
+                    self._request(handler, path, next(tokens))
+                best = None
+                for _ in range(rounds):
+                    start = time.perf_counter()
+                    for _ in range(count):
+                        self._request(handler, path, next(tokens))
+                    elapsed = time.perf_counter() - start
+                    best = elapsed if best is None else min(best, elapsed)
+                timings[name] = (status, best / count * 1e6)
+            full, lean = timings['full'][1], timings['lean'][1]
+            results.append({
+                'endpoint': endpoint,
+                'status': {name: status for name, (status, _) in timings.items()},
+                'full_us_per_request': round(full, 1),
+                'lean_us_per_request': round(lean, 1),
+                'saved_us_per_request': round(full - lean, 1),
+                'speedup': round(full / lean, 3),
+            })
+        return results
+
+    def _request(self, handler, path, token):
+        path, _, query = path.partition('?')
+        environ = {
+            'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': query,
+            'SERVER_NAME': 'testserver', 'SERVER_PORT': '80', 'HTTP_HOST': 'testserver',
+            'REMOTE_ADDR': '127.0.0.1', 'SERVER_PROTOCOL': 'HTTP/1.1',
+            'HTTP_AUTHORIZATION': f'Bearer {token}', 'HTTP_ACCEPT': 'application/json',
+            # مثل مرورگری که کوکی دارد؛ پشته‌ی کامل آن را پارس می‌کند
+            'HTTP_COOKIE': f'{settings.SESSION_COOKIE_NAME}=invalid; {settings.CSRF_COOKIE_NAME}=invalid',
+            'wsgi.input': io.BytesIO(), 'wsgi.errors': sys.stderr, 'wsgi.url_scheme': 'http',
+            'wsgi.version': (1, 0), 'wsgi.multithread': True, 'wsgi.multiprocess': True, 'wsgi.run_once': False,
+        }
+        statuses = []
+        response = handler(environ, lambda status, headers, exc_info=None: statuses.append(status))
+        b''.join(response)
+        response.close()
+        return statuses[0]
@@ -0,0 +1,66 @@
+import asyncio
+import json
+import os
+import time
+
+from django.contrib.auth.hashers import check_password, make_password
+from django.core.management.base import BaseCommand
+
+from authentication.hashing import HashingPool, _check_password
+
+PASSWORD = 'benchmark-Passw0rd!'
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure login password-check throughput through the hashing process pool "
+        "for increasing worker counts, compared with hashing on the request thread."
+    )
+
+    def add_arguments(self, parser):
+        cpus = os.cpu_count() or 1
+        default_workers = sorted({1, *[2 ** i for i in range(1, cpus.bit_length()) if 2 ** i <= cpus], cpus})
+        parser.add_argument(
+            '--workers', type=int, nargs='+', default=default_workers,
+            help="Pool sizes to measure (default: powers of two up to the CPU count).",
+        )
+        parser.add_argument(
+            '--logins', type=int, default=0,
+            help="Password checks per run (default: 4 per worker of the largest pool).",
+        )
+
+    def handle(self, *args, **options):
+        workers = options['workers']
+        logins = options['logins'] or 4 * max(workers)
+        encoded = make_password(PASSWORD)
+
+        start = time.perf_counter()
+        for _ in range(logins):
+            check_password(PASSWORD, encoded)
+        inline = time.perf_counter() - start
+        results = [self._result('inline', logins, inline, inline)]
+
+        for count in workers:
+            pool = HashingPool(count, queue_depth=logins)
+            try:
+                pool.warm_up()
+                start = time.perf_counter()
+                asyncio.run(self._run(pool, logins, encoded))
+                elapsed = time.perf_counter() - start
+            finally:
+                pool.shutdown()
+            results.append(self._result(count, logins, elapsed, inline))
+
+        self.stdout.write(json.dumps({'cpu_count': os.cpu_count(), 'results': results}, indent=2))
+
+    async def _run(self, pool, logins, encoded):
+        await asyncio.gather(*(pool.run(_check_password, PASSWORD, encoded) for _ in range(logins)))
+
+    def _result(self, workers, logins, elapsed, inline):
+        return {
+            'workers': workers,
+            'logins': logins,
+            'seconds': round(elapsed, 3),
+            'logins_per_second': round(logins / elapsed, 2),
+            'speedup': round(inline / elapsed, 2),
+        }
@@ -0,0 +1,66 @@
+import os
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from authentication.keys import ACTIVE_KID_FILE, PRIVATE_SUFFIX, PUBLIC_SUFFIX
+
+KEY_FACTORIES = {
+    'RS256': lambda: rsa.generate_private_key(public_exponent=65537, key_size=2048),
+    'ES256': lambda: ec.generate_private_key(ec.SECP256R1()),
+    'EdDSA': ed25519.Ed25519PrivateKey.generate,
+}
+
+
+def generate_private_key(algorithm):
+    return KEY_FACTORIES[algorithm]()
+
+
+class Command(BaseCommand):
+    help = (
+        "Create a new <kid>_private.pem / <kid>_public.pem pair in JWT_KEYS_DIR. "
+        "The signing algorithm follows from the key type (RSA: RS256, P-256: ES256, Ed25519: EdDSA)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('kid', help="Key id, also used as the file name prefix.")
+        parser.add_argument('--algorithm', choices=sorted(KEY_FACTORIES), default='RS256')
+        parser.add_argument(
+            '--activate', action='store_true',
+            help="Write the kid to active_kid right away. Only safe if the public key has already been "
+                 "published for JWKS_CACHE_MAX_AGE seconds.",
+        )
+
+    def handle(self, *args, **options):
+        kid = options['kid']
+        if not kid or '/' in kid or kid.startswith('.'):
+            raise CommandError(f"Invalid key id '{kid}'.")
+        directory = settings.JWT_KEYS_DIR
+        private_path = directory / (kid + PRIVATE_SUFFIX)
+        public_path = directory / (kid + PUBLIC_SUFFIX)
+        if private_path.exists() or public_path.exists():
+            raise CommandError(f"Key '{kid}' already exists in {directory}.")
+
+        private_key = generate_private_key(options['algorithm'])
+        private_pem = private_key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption(),
+        )
+        public_pem = private_key.public_key().public_bytes(
+            serialization.Encoding.PEM,
+            serialization.PublicFormat.SubjectPublicKeyInfo,
+        )
+
+        directory.mkdir(parents=True, exist_ok=True)
+        # فایل public اول نوشته می‌شود تا KeyRing کلید نیمه‌کاره را به عنوان کلید امضا نبیند
+        public_path.write_bytes(public_pem)
+        fd = os.open(private_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(private_pem)
+
+        if options['activate']:
+            (directory / ACTIVE_KID_FILE).write_text(kid + '\n')
+        self.stdout.write(f"Created {options['algorithm']} key '{kid}' in {directory}.")
@@ -0,0 +1,51 @@
+import json
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from authentication.pruning import TokenPruner
+from user_service.metrics import registry, snapshot_writer
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete expired outstanding and blacklisted JWT rows in bounded batches with a pause between batches. "
+        "Prints each run as JSON: deleted rows, table sizes and jti lookup latency. "
+        "Runs once by default (cron); --loop keeps it running as a background job."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=settings.TOKEN_PRUNE_BATCH_SIZE, help="Rows per delete batch.")
+        parser.add_argument('--pause', type=float, default=settings.TOKEN_PRUNE_PAUSE, help="Seconds to sleep between batches.")
+        parser.add_argument(
+            '--grace', type=int, default=settings.TOKEN_PRUNE_GRACE,
+            help="Keep tokens for this many seconds after they expire.",
+        )
+        parser.add_argument(
+            '--loop', action='store_true',
+            help=f"Run every --interval seconds until stopped (default interval {settings.TOKEN_PRUNE_INTERVAL}).",
+        )
+        parser.add_argument('--interval', type=int, default=settings.TOKEN_PRUNE_INTERVAL)
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be at least 1.")
+        pruner = TokenPruner(
+            batch_size=options['batch_size'],
+            pause=options['pause'],
+            grace=options['grace'],
+        )
+        # اندازه‌ی جدول‌ها فقط از همین پروسه گزارش می‌شود؛ با METRICS_DIR در /metrics همه‌ی workerها دیده می‌شود
+        registry.register_collector(pruner.metrics)
+
+        while True:
+            close_old_connections()
+            result = pruner.run()
+            self.stdout.write(json.dumps(result))
+            if snapshot_writer is not None:
+                snapshot_writer.write()
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
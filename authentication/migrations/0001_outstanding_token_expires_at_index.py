@@ -0,0 +1,30 @@
+# ایندکس expires_at روی جدول OutstandingToken (اپ token_blacklist خودش ندارد)؛
+# authentication.pruning توکن‌های منقضی را با همین ایندکس دسته‌دسته پیدا می‌کند.
+
+from django.db import migrations
+
+INDEX_NAME = 'token_outstanding_expires_at_idx'
+TABLE = 'token_blacklist_outstandingtoken'
+
+
+def create_index(apps, schema_editor):
+    concurrently = 'CONCURRENTLY ' if schema_editor.connection.vendor == 'postgresql' else ''
+    schema_editor.execute(f'CREATE INDEX {concurrently}IF NOT EXISTS {INDEX_NAME} ON {TABLE} (expires_at)')
+
+
+def drop_index(apps, schema_editor):
+    concurrently = 'CONCURRENTLY ' if schema_editor.connection.vendor == 'postgresql' else ''
+    schema_editor.execute(f'DROP INDEX {concurrently}IF EXISTS {INDEX_NAME}')
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY داخل تراکنش مجاز نیست
+    atomic = False
+
+    dependencies = [
+        ('token_blacklist', '0013_alter_blacklistedtoken_options_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,141 @@
+"""
+پاک کردن توکن‌های منقضی از جدول‌های token_blacklist (OutstandingToken و BlacklistedToken).
+
+هر لاگین، ثبت‌نام و refresh چرخشی یک ردیف OutstandingToken اضافه می‌کند و simplejwt هیچ‌وقت آن‌ها را پاک نمی‌کند.
+TokenPruner ردیف‌هایی را که بیش از TOKEN_PRUNE_GRACE ثانیه از انقضایشان گذشته در دسته‌های TOKEN_PRUNE_BATCH_SIZE تایی
+حذف می‌کند؛ هر دسته یک تراکنش کوتاه است و بین دسته‌ها TOKEN_PRUNE_PAUSE ثانیه مکث می‌شود تا I/O دیسک و lag
+رپلیکاها محدود بماند. اجرا: python manage.py prune_tokens (یک بار از cron، یا با --loop به‌عنوان پروسه‌ی پس‌زمینه).
+"""
+import time
+import uuid
+from datetime import timedelta
+
+from django.db import connections, router, transaction
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+from user_service.metrics import registry
+
+OUTSTANDING_TABLE = OutstandingToken._meta.db_table
+BLACKLISTED_TABLE = BlacklistedToken._meta.db_table
+
+
+# ---------- اندازه‌ی جدول‌ها و زمان جستجو ----------
+
+def table_stats(connection):
+    """{'outstanding': {'rows', 'bytes'}, 'blacklisted': {...}}؛ در Postgres تخمین آمار planner و اندازه با ایندکس‌ها"""
+    stats = {}
+    with connection.cursor() as cursor:
+        for key, table in (('outstanding', OUTSTANDING_TABLE), ('blacklisted', BLACKLISTED_TABLE)):
+            if connection.vendor == 'postgresql':
+                cursor.execute(
+                    'SELECT GREATEST(reltuples, 0)::bigint, pg_total_relation_size(oid) FROM pg_class '
+                    'WHERE oid = to_regclass(%s)',
+                    [table],
+                )
+                rows, size = cursor.fetchone()
+            else:
+                cursor.execute(f'SELECT COUNT(*) FROM {connection.ops.quote_name(table)}')
+                rows, size = cursor.fetchone()[0], None
+            stats[key] = {'rows': rows, 'bytes': size}
+    return stats
+
+
+def probe_lookups(using):
+    """زمان یک جستجوی jti ناموجود در هر جدول (میلی‌ثانیه)؛ همان مسیر ایندکسی که logout و refresh می‌روند"""
+    jti = uuid.uuid4().hex
+    queries = (
+        ('outstanding_jti', OutstandingToken.objects.using(using).filter(jti=jti)),
+        ('blacklisted_jti', BlacklistedToken.objects.using(using).filter(token__jti=jti)),
+    )
+    timings = {}
+    for lookup, queryset in queries:
+        started = time.perf_counter()
+        queryset.exists()
+        elapsed = time.perf_counter() - started
+        registry.observe('token_lookup_seconds', (('lookup', lookup),), elapsed)
+        timings[lookup] = round(elapsed * 1000, 3)
+    return timings
+
+
+# ---------- حذف ----------
+
+class TokenPruner:
+    def __init__(self, batch_size, pause, grace):
+        self.batch_size = batch_size
+        self.pause = pause
+        self.grace = grace
+        self.last_run = None
+
+    def run(self):
+        using = router.db_for_write(OutstandingToken)
+        connection = connections[using]
+        started = time.perf_counter()
+        cutoff = timezone.now() - timedelta(seconds=self.grace)
+        result = {'database': using, 'cutoff': cutoff.isoformat()}
+        outstanding, blacklisted, result['batches'] = self.delete_expired(connection, cutoff)
+        deleted = {'outstanding': outstanding, 'blacklisted': blacklisted}
+        for table, count in deleted.items():
+            registry.inc('token_pruned_rows_total', (('table', table),), count)
+
+        result['deleted'] = deleted
+        result['lookup_ms'] = probe_lookups(using)
+        result['tables'] = table_stats(connection)
+        result['seconds'] = round(time.perf_counter() - started, 3)
+        result['finished_at'] = time.time()
+        self.last_run = result
+        return result
+
+    def delete_expired(self, connection, cutoff):
+        """(OutstandingToken حذف‌شده، BlacklistedToken حذف‌شده، تعداد دسته‌ها)"""
+        using = connection.alias
+        quote = connection.ops.quote_name
+        batch_size = min(self.batch_size, connection.features.max_query_params or self.batch_size)
+        token_column = quote(BlacklistedToken._meta.get_field('token').column)
+        outstanding = blacklisted = batches = 0
+        while True:
+            with transaction.atomic(using=using):
+                ids = list(
+                    OutstandingToken.objects.using(using)
+                    .filter(expires_at__lt=cutoff)
+                    .order_by()
+                    .values_list('id', flat=True)[:batch_size]
+                )
+                if not ids:
+                    break
+                placeholders = ', '.join(['%s'] * len(ids))
+                with connection.cursor() as cursor:
+                    # بدون Collector جنگو، که قبل از حذف همه‌ی ستون‌ها (از جمله خود توکن) را می‌خواند
+                    cursor.execute(f'DELETE FROM {quote(BLACKLISTED_TABLE)} WHERE {token_column} IN ({placeholders})', ids)
+                    blacklisted += cursor.rowcount
+                    cursor.execute(f'DELETE FROM {quote(OUTSTANDING_TABLE)} WHERE id IN ({placeholders})', ids)
+                    outstanding += cursor.rowcount
+            batches += 1
+            if len(ids) < batch_size:
+                break
+            time.sleep(self.pause)
+        return outstanding, blacklisted, batches
+
+    def metrics(self):
+        """collector رجیستری متریک‌ها؛ فقط در پروسه‌ای که pruning را اجرا می‌کند ثبت می‌شود"""
+        run = self.last_run
+        if run is None:
+            return []
+        tables = run['tables']
+        metrics = [
+            ('token_outstanding_rows', 'gauge', "Rows in the outstanding token table (estimate on Postgres).",
+             tables['outstanding']['rows']),
+            ('token_blacklisted_rows', 'gauge', "Rows in the blacklisted token table (estimate on Postgres).",
+             tables['blacklisted']['rows']),
+            ('token_prune_last_success_timestamp_seconds', 'gauge', "Unix time the last token pruning run finished.",
+             run['finished_at']),
+            ('token_prune_last_duration_seconds', 'gauge', "Duration of the last token pruning run.", run['seconds']),
+        ]
+        if tables['outstanding']['bytes'] is not None:
+            metrics += [
+                ('token_outstanding_bytes', 'gauge', "Size of the outstanding token table with indexes.",
+                 tables['outstanding']['bytes']),
+                ('token_blacklisted_bytes', 'gauge', "Size of the blacklisted token table with indexes.",
+                 tables['blacklisted']['bytes']),
+            ]
+        return metrics
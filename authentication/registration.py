@@ -0,0 +1,99 @@
+"""
+ثبت‌نام در یک تراکنش: یک INSERT برای هر کاربر و صدور refresh (ردیف OutstandingToken) در همان تراکنش.
+
+یکتایی email و username از قبل با SELECT بررسی نمی‌شود و به unique constraint دیتابیس سپرده شده است.
+فقط اگر INSERT با IntegrityError رد شود، یک کوئری IN برای همه‌ی ورودی‌ها مشخص می‌کند کدام مقدار
+تکراری است و همان خطاهای UniqueValidator برگردانده می‌شوند.
+"""
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from rest_framework import serializers
+
+from .hashing import get_hashing_pool, hash_passwords
+from .serializers import CustomTokenObtainPairSerializer
+
+User = get_user_model()
+
+UNIQUE_FIELDS = ('email', 'username')
+
+
+def _unique_message(name):
+    # همان متن UniqueValidator در ModelSerializer
+    field = User._meta.get_field(name)
+    return field.error_messages['unique'] % {
+        'model_name': User._meta.verbose_name,
+        'field_label': field.verbose_name,
+    }
+
+
+def duplicate_errors(entries):
+    """
+    برای هر ورودی (dict با email و username) خطاهای تکراری بودن را برمی‌گرداند، هم‌ترتیب با entries.
+    مقدار تکراری یعنی در دیتابیس هست یا در ورودی‌های قبلی همین لیست آمده است.
+    """
+    values = {name: {entry[name] for entry in entries} for name in UNIQUE_FIELDS}
+    existing = {name: set() for name in UNIQUE_FIELDS}
+    rows = User.objects.filter(Q(email__in=values['email']) | Q(username__in=values['username']))
+    for email, username in rows.values_list(*UNIQUE_FIELDS):
+        existing['email'].add(email)
+        existing['username'].add(username)
+
+    errors = []
+    for entry in entries:
+        entry_errors = {}
+        for name in UNIQUE_FIELDS:
+            if entry[name] in existing[name]:
+                entry_errors[name] = [_unique_message(name)]
+            existing[name].add(entry[name])
+        errors.append(entry_errors)
+    return errors
+
+
+def register_user(serializer, **save_kwargs):
+    """serializer اعتبارسنجی‌شده‌ی RegisterSerializer -> (کاربر، refresh)"""
+    # هش PBKDF2 (بیش از یک ثانیه) قبل از باز شدن تراکنش، تا قفل نوشتن فقط برای دو INSERT گرفته شود
+    if not save_kwargs.get('password_hash'):
+        save_kwargs['password_hash'] = make_password(serializer.validated_data['password'])
+    try:
+        with transaction.atomic():
+            user = serializer.save(**save_kwargs)
+            # همان claimهای لاگین، تا ClaimsJWTAuthentication روی این توکن هم کار کند
+            refresh = CustomTokenObtainPairSerializer.get_token(user)
+    except IntegrityError:
+        # تراکنش rollback شده و این کوئری روی اتصال سالم اجرا می‌شود
+        errors = duplicate_errors([serializer.validated_data])[0]
+        if not errors:
+            raise
+        raise serializers.ValidationError(errors)
+    return user, refresh
+
+
+def register_users(serializer):
+    """
+    serializer اعتبارسنجی‌شده‌ی BulkRegisterSerializer -> کاربرهای ساخته‌شده؛ همه یا هیچ‌کدام.
+    رمزها در ProcessPool هش می‌شوند و همه‌ی کاربرها با یک bulk_create درج می‌شوند (بدون سیگنال post_save؛
+    کاربر تازه چیزی در کش پروفایل یا lookup ندارد).
+    """
+    entries = serializer.validated_data['users']
+    # تکرار داخل خود درخواست بدون رفتن به دیتابیس هم معلوم است
+    seen = {name: set() for name in UNIQUE_FIELDS}
+    for entry in entries:
+        if any(entry[name] in seen[name] for name in UNIQUE_FIELDS):
+            raise serializers.ValidationError({'users': duplicate_errors(entries)})
+        for name in UNIQUE_FIELDS:
+            seen[name].add(entry[name])
+
+    builder = serializer.fields['users'].child
+    hashes = hash_passwords(get_hashing_pool().executor, [entry['password'] for entry in entries])
+    users = [builder.build(entry, password_hash) for entry, password_hash in zip(entries, hashes)]
+    try:
+        with transaction.atomic():
+            User.objects.bulk_create(users)
+    except IntegrityError:
+        errors = duplicate_errors(entries)
+        if not any(errors):
+            raise
+        raise serializers.ValidationError({'users': errors})
+    return users
@@ -1,10 +1,17 @@
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
 from rest_framework import serializers
 import jwt
 from django.conf import settings
+from .activity import activity_recorder
+from .authentication import TOKEN_VERSION_CLAIM, get_user_state
+from .tokens import RefreshToken
 
 
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
+    token_class = RefreshToken
+
     @classmethod
     def get_token(cls, user):
         token = super().get_token(user)
@@ -16,23 +23,76 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
         token['first_name'] = user.first_name
         token['last_name'] = user.last_name
         token['phone_number'] = user.phone_number
-        # token['is_staff'] = user.is_staff  # مثال
+        token['is_staff'] = user.is_staff
+        token['token_version'] = user.token_version
 
         return token
 
+    @classmethod
+    def get_user_data(cls, user):
+        # اطلاعات اضافی که می‌خوای کنار توکن‌ها توی JSON برگرده
+        return {
+            'id': user.id,
+            'username': user.username,
+            'email': user.email,
+            # هر فیلد دیگه‌ای که لازم داری
+        }
+
     def validate(self, attrs):
         data = super().validate(attrs)  # اینجا {'refresh': ..., 'access': ...} برمی‌گرده
+        data['user'] = self.get_user_data(self.user)
+        activity_recorder.record_login(self.user.pk)
+        return data
 
-        # اطلاعات اضافی که می‌خوای کنار توکن‌ها توی JSON برگرده
-        data['user'] = {
-            'id': self.user.id,
-            'username': self.user.username,
-            'email': self.user.email,
-            # هر فیلد دیگه‌ای که لازم داری
+    @classmethod
+    def get_login_response(cls, user):
+        """همان پاسخ validate برای کاربری که بیرون از serializer احراز شده (AsyncLoginView)"""
+        refresh = cls.get_token(user)
+        data = {
+            'refresh': str(refresh),
+            'access': str(refresh.access_token),
+            'user': cls.get_user_data(user),
         }
+        activity_recorder.record_login(user.pk)
+        return data
+
+
+class CustomTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    refresh بدون کوئری: بلک‌لیست از ایندکس حافظه و وضعیت کاربر از کش کوتاه‌مدت خوانده می‌شود.
+    """
+    token_class = RefreshToken
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs["refresh"])
+
+        user_id = refresh.payload.get(api_settings.USER_ID_CLAIM, None)
+        if user_id:
+            state = get_user_state(user_id)
+            # کاربر حذف‌شده، غیرفعال یا توکنِ قبل از تغییر رمز
+            if state is None or not state[1] or refresh.get(TOKEN_VERSION_CLAIM, 0) < state[0]:
+                raise AuthenticationFailed(
+                    self.error_messages["no_active_account"],
+                    "no_active_account",
+                )
+            activity_recorder.record_seen(user_id)
+
+        data = {"access": str(refresh.access_token)}
+
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            if api_settings.BLACKLIST_AFTER_ROTATION:
+                refresh.blacklist()
+
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            refresh.outstand()
+
+            data["refresh"] = str(refresh)
 
         return data
 
+
 class TokenDecodeSerializer(serializers.Serializer):
     token = serializers.CharField(
         required=True,
@@ -62,3 +122,11 @@ class TokenDecodeSerializer(serializers.Serializer):
         label="Verify Issuer",
         help_text="Validate token issuer"
     )
+
+
+class TokenIntrospectSerializer(serializers.Serializer):
+    tokens = serializers.ListField(
+        child=serializers.CharField(max_length=4096, trim_whitespace=True),
+        allow_empty=False,
+        max_length=settings.TOKEN_INTROSPECTION_MAX_TOKENS,
+    )
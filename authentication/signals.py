@@ -0,0 +1,12 @@
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .authentication import forget_user
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def invalidate_cached_user(sender, instance, **kwargs):
+    # هر تغییری در ردیف کاربر، کش احراز هویت مبتنی بر claim را باطل می‌کند
+    forget_user(instance.pk)
@@ -1,3 +1,701 @@
-from django.test import TestCase
+import base64
+import hashlib
+import hmac
+import json
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+import jwt
+from cryptography.hazmat.primitives import serialization
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connection
+from django.test import AsyncRequestFactory, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt import state
+from rest_framework_simplejwt.exceptions import TokenBackendError
+
+from . import registration
+from .async_views import AsyncLoginView
+from .activity import activity_recorder, write_activity
+from .backends import KeyRingTokenBackend
+from .blacklist import BlacklistIndex
+from .hashing import HashingPool, HashingPoolBusy
+from .introspection import VerifiedTokenCache
+from .keys import ACTIVE_KID_FILE, PRIVATE_SUFFIX, PUBLIC_SUFFIX, KeyRing
+from .management.commands.generate_jwt_key import generate_private_key
+from .pruning import TokenPruner
+from .serializers import CustomTokenObtainPairSerializer
+from .throttling import SlidingWindowStore
+
+User = get_user_model()
+
+# PBKDF2 واقعی هر تست را چند ثانیه کند می‌کند
+FAST_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+
+class APITestMixin:
+    """
+    کلاینت API با شمارنده‌های throttle تازه (SQLite در حافظه به جای THROTTLE_DB_PATH) برای هر تست؛
+    last_login/last_seen هم بلافاصله و روی اتصال خود تست نوشته می‌شوند، نه در thread پس‌زمینه.
+    """
+
+    def setUp(self):
+        super().setUp()
+        for patcher in (
+            mock.patch('authentication.throttling._store', SlidingWindowStore(':memory:')),
+            mock.patch.object(activity_recorder, 'flush_interval', 0),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.client = APIClient()
+
+    def register_payload(self, name, **extra):
+        return {
+            'email': f'{name}@example.com',
+            'username': name,
+            'first_name': name.title(),
+            'last_name': 'Test',
+            'password': 'Str0ng-pass-phrase',
+            'password_confirm': 'Str0ng-pass-phrase',
+            **extra,
+        }
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class RegistrationTests(APITestMixin, TestCase):
+
+    def test_register_returns_tokens(self):
+        response = self.client.post(reverse('auth:register'), self.register_payload('alice'), format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertIn('access', response.data)
+        self.assertTrue(User.objects.get(username='alice').check_password('Str0ng-pass-phrase'))
+
+    def test_duplicate_email_and_username(self):
+        self.client.post(reverse('auth:register'), self.register_payload('alice'), format='json')
+
+        response = self.client.post(
+            reverse('auth:register'), self.register_payload('alice', email='ALICE@EXAMPLE.COM'), format='json',
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(response.data), {'username'})
+
+        response = self.client.post(
+            reverse('auth:register'), self.register_payload('bob', email='alice@example.com'), format='json',
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(response.data), {'email'})
+        self.assertEqual(User.objects.count(), 1)
+
+    def test_bulk_register_is_all_or_nothing(self):
+        admin = User.objects.create_user(email='admin@example.com', username='admin', password='x', is_staff=True)
+        self.client.force_authenticate(admin)
+        response = self.client.post(reverse('auth:register-bulk'), {'users': [
+            self.register_payload('carol'),
+            self.register_payload('dave'),
+            self.register_payload('erin', username='carol'),
+        ]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['users'][2].keys(), {'username'})
+        self.assertFalse(User.objects.filter(username__in=['carol', 'dave', 'erin']).exists())
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class RegistrationTransactionTests(APITestMixin, TransactionTestCase):
+
+    def test_password_is_hashed_outside_the_transaction(self):
+        # هش طولانی داخل atomic قفل نوشتن SQLite را نگه می‌داشت و ثبت‌نام‌های هم‌زمان database is locked می‌گرفتند
+        in_atomic = []
+
+        def spy(password):
+            in_atomic.append(connection.in_atomic_block)
+            return make_password(password)
+
+        with mock.patch.object(registration, 'make_password', spy), \
+                mock.patch('users.serializers.make_password', spy):
+            for index, name in enumerate(['alice', 'bob', 'carol']):
+                response = self.client.post(
+                    reverse('auth:register'), self.register_payload(name), format='json',
+                    REMOTE_ADDR=f'10.0.0.{index + 1}',
+                )
+                self.assertEqual(response.status_code, 201)
+        self.assertEqual(in_atomic, [False, False, False])
+
+    def test_duplicate_insert_rolls_back_token(self):
+        from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
+
+        self.client.post(reverse('auth:register'), self.register_payload('alice'), format='json')
+        response = self.client.post(
+            reverse('auth:register'), self.register_payload('alice', email='other@example.com'), format='json',
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(User.objects.count(), 1)
+        self.assertEqual(OutstandingToken.objects.count(), 1)
+
+
+@override_settings(PASSWORD_HASHERS=[*FAST_HASHERS, 'django.contrib.auth.hashers.PBKDF2PasswordHasher'])
+class TokenRevocationTests(APITestMixin, TestCase):
+    password = 'Str0ng-pass-phrase'
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(
+            email='alice@example.com', username='alice', password=self.password, first_name='Alice', last_name='Test',
+        )
+
+    def login(self):
+        response = self.client.post(
+            reverse('auth:login'), {'email': 'alice@example.com', 'password': self.password}, format='json',
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.data['access']
+
+    def profile_status(self, access):
+        response = self.client.get(reverse('auth:profile'), HTTP_AUTHORIZATION=f'Bearer {access}')
+        if response.status_code != 200:
+            # در پشته‌ی کامل SessionAuthentication اول در لیست است و احراز ناموفق 403 است؛ علت از code خطا معلوم می‌شود
+            return response.data['code']
+        return response.status_code
+
+    def change_password(self, access, new_password):
+        response = self.client.post(reverse('auth:change_password'), {
+            'old_password': self.password, 'new_password': new_password, 'new_password_confirm': new_password,
+        }, format='json', HTTP_AUTHORIZATION=f'Bearer {access}')
+        self.assertEqual(response.status_code, 200)
+        self.password = new_password
+
+    def test_password_change_revokes_earlier_tokens(self):
+        access = self.login()
+        self.assertEqual(self.profile_status(access), 200)
+
+        self.change_password(access, 'An0ther-pass-phrase')
+        self.assertEqual(self.profile_status(access), 'token_stale')
+        self.assertEqual(self.profile_status(self.login()), 200)
+
+    def test_hash_upgrade_on_login_keeps_version_in_sync(self):
+        # هش قدیمی (PBKDF2 با یک iteration) هنگام لاگین به هشر پیش‌فرض ارتقا پیدا می‌کند
+        from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+        hasher = PBKDF2PasswordHasher()
+        User.objects.filter(pk=self.user.pk).update(
+            password=hasher.encode(self.password, hasher.salt(), iterations=1),
+        )
+        version = User.objects.get(pk=self.user.pk).token_version
+
+        access = self.login()
+        user = User.objects.get(pk=self.user.pk)
+        self.assertTrue(user.password.startswith('md5$'))
+        self.assertEqual(user.token_version, version)
+
+        self.change_password(access, 'An0ther-pass-phrase')
+        self.assertEqual(self.profile_status(access), 'token_stale')
+
+    def test_demoted_admin_loses_access_and_refresh(self):
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.post(
+            reverse('auth:login'), {'email': 'alice@example.com', 'password': self.password}, format='json',
+        )
+        access, refresh = response.data['access'], response.data['refresh']
+        users_url = reverse('users:user-list')
+        self.assertEqual(self.client.get(users_url, HTTP_AUTHORIZATION=f'Bearer {access}').status_code, 200)
+
+        # مثل ادمین یا shell که فقط همین فیلد را ذخیره می‌کند
+        user = User.objects.get(pk=self.user.pk)
+        user.is_staff = False
+        user.save(update_fields=['is_staff'])
+
+        response = self.client.get(users_url, HTTP_AUTHORIZATION=f'Bearer {access}')
+        self.assertEqual(response.data['code'], 'token_stale')
+        # refresh، claim is_staff قدیمی را در توکن تازه کپی می‌کرد
+        response = self.client.post(reverse('auth:token_refresh'), {'refresh': refresh}, format='json')
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(self.profile_status(self.login()), 200)
+
+    def test_unrelated_save_keeps_tokens(self):
+        access = self.login()
+        user = User.objects.get(pk=self.user.pk)
+        user.first_name = 'Alicia'
+        user.save()
+        user.refresh_from_db()
+        user.save()
+        self.assertEqual(self.profile_status(access), 200)
+
+    def test_save_with_update_fields_persists_revocation(self):
+        self.user.set_password('An0ther-pass-phrase')
+        self.user.save(update_fields=['password'])
+        self.assertEqual(User.objects.get(pk=self.user.pk).token_version, self.user.token_version)
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class BlacklistTests(APITestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(email='alice@example.com', username='alice', password='Str0ng-pass-phrase')
+        response = self.client.post(
+            reverse('auth:login'), {'email': 'alice@example.com', 'password': 'Str0ng-pass-phrase'}, format='json',
+        )
+        self.access, self.refresh = response.data['access'], response.data['refresh']
+
+    def refresh_status(self, refresh):
+        return self.client.post(reverse('auth:token_refresh'), {'refresh': refresh}, format='json').status_code
+
+    def blacklist_row(self, jti, **extra):
+        from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+        token = OutstandingToken.objects.create(
+            user=self.user, jti=jti, token=f'token-{jti}', expires_at=timezone.now() + timedelta(days=1),
+        )
+        return BlacklistedToken.objects.create(token=token, **extra)
+
+    def test_logout_blacklists_refresh_token(self):
+        response = self.client.post(
+            reverse('auth:logout'), {'refresh': self.refresh}, format='json',
+            HTTP_AUTHORIZATION=f'Bearer {self.access}',
+        )
+        self.assertEqual(response.status_code, 205)
+        self.assertEqual(self.refresh_status(self.refresh), 401)
+
+    def test_rotated_refresh_token_cannot_be_reused(self):
+        from rest_framework_simplejwt.settings import api_settings
+
+        # چرخش در SIMPLE_JWT خاموش است؛ override_settings شیء api_settingsی را که serializerها import کرده‌اند عوض نمی‌کند
+        for name in ('ROTATE_REFRESH_TOKENS', 'BLACKLIST_AFTER_ROTATION'):
+            patcher = mock.patch.object(api_settings, name, True)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        response = self.client.post(reverse('auth:token_refresh'), {'refresh': self.refresh}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.refresh_status(self.refresh), 401)
+        self.assertEqual(self.refresh_status(response.data['refresh']), 200)
+
+    def test_sync_picks_up_rows_from_other_processes(self):
+        index = BlacklistIndex(sync_interval=0, rebuild_interval=3600)
+        self.assertFalse(index.contains('other-worker'))
+        self.blacklist_row('other-worker', id=500)
+        self.assertTrue(index.contains('other-worker'))
+
+        # id کوچک‌تر از high-water mark که دیرتر commit شده
+        self.blacklist_row('late-commit', id=499)
+        self.assertTrue(index.contains('late-commit'))
+
+    def test_rebuild_forgets_deleted_rows(self):
+        self.blacklist_row('pruned').delete()
+        index = BlacklistIndex(sync_interval=0, rebuild_interval=3600)
+        self.assertFalse(index.contains('pruned'))
+
+        row = self.blacklist_row('pruned-later')
+        self.assertTrue(index.contains('pruned-later'))
+        row.delete()
+        # همگام‌سازی افزایشی فقط اضافه می‌کند؛ پاک شدن با rebuild دوره‌ای دیده می‌شود
+        self.assertTrue(index.contains('pruned-later'))
+        index.rebuild_interval = 0
+        self.assertFalse(index.contains('pruned-later'))
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class HashingPoolTests(APITestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        User.objects.create_user(email='alice@example.com', username='alice', password='Str0ng-pass-phrase')
+        # thread به جای پروسه‌های spawn؛ محدودیت صف همان semaphore است
+        self.pool = HashingPool(max_workers=1, queue_depth=1)
+        self.pool._executor = ThreadPoolExecutor(max_workers=1)
+        self.addCleanup(self.pool.shutdown)
+        patcher = mock.patch('authentication.hashing.get_hashing_pool', return_value=self.pool)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def login(self):
+        request = AsyncRequestFactory().post(
+            '/accounts/auth/login/', {'email': 'alice@example.com', 'password': 'Str0ng-pass-phrase'},
+            content_type='application/json',
+        )
+        return await AsyncLoginView.as_view()(request)
+
+    async def test_login_hashes_on_the_pool(self):
+        response = await self.login()
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('access', json.loads(response.content))
+
+    async def test_full_queue_is_503(self):
+        # یک کار در حال اجرا و یک کار در صف
+        for _ in range(2):
+            self.pool._slots.acquire()
+        with self.assertRaises(HashingPoolBusy):
+            await self.pool.run(len, 'x')
+        response = await self.login()
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '1')
+
+        self.pool._slots.release()
+        self.assertEqual((await self.login()).status_code, 200)
+
+
+class SlidingWindowTests(TestCase):
+    limit, duration = 3, 60
+    # شروع یک پنجره
+    start = 1_000_020.0
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        path = Path(directory) / 'throttle.sqlite3'
+        # دو worker روی یک فایل
+        self.workers = [SlidingWindowStore(path), SlidingWindowStore(path)]
+        for store in self.workers:
+            self.addCleanup(store.connection.close)
+
+    def hit(self, worker, at, key='ip:10.0.0.1'):
+        return self.workers[worker].hit(key, self.limit, self.duration, now=self.start + at)
+
+    def test_limit_is_shared_between_workers(self):
+        self.assertEqual([self.hit(index % 2, at=index)[0] for index in range(3)], [True, True, True])
+        allowed, wait = self.hit(1, at=3)
+        self.assertFalse(allowed)
+        self.assertGreater(wait, 0)
+        self.assertFalse(self.hit(0, at=4)[0])
+        # کلید دیگر شمارنده‌ی خودش را دارد
+        self.assertTrue(self.hit(0, at=4, key='ip:10.0.0.2')[0])
+
+    def test_previous_window_counts_by_its_remaining_share(self):
+        for index in range(3):
+            self.hit(index % 2, at=0)
+        # نیمه‌ی پنجره‌ی بعد: 3 × 0.5 + فعلی
+        at = self.duration * 1.5
+        self.assertEqual([self.hit(index % 2, at=at)[0] for index in range(3)], [True, True, False])
+
+    def test_request_is_allowed_after_the_reported_wait(self):
+        for index in range(3):
+            self.hit(0, at=index)
+        allowed, wait = self.hit(1, at=10)
+        self.assertFalse(allowed)
+        self.assertFalse(self.hit(1, at=10 + wait - 1)[0])
+        self.assertTrue(self.hit(0, at=10 + wait + 0.01)[0])
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class LoginThrottleTests(APITestMixin, TestCase):
+
+    def test_login_scope_is_per_ip(self):
+        # ساعت ثابت، تا مرز دقیقه وسط تست شمارنده را جابه‌جا نکند
+        clock = mock.patch('authentication.throttling.time', mock.Mock(time=lambda: SlidingWindowTests.start))
+        clock.start()
+        self.addCleanup(clock.stop)
+        payload = {'email': 'alice@example.com', 'password': 'wrong'}
+        statuses = [
+            self.client.post(reverse('auth:login'), payload, format='json', REMOTE_ADDR='10.0.0.1').status_code
+            for _ in range(11)
+        ]
+        self.assertEqual(statuses, [401] * 10 + [429])
+        response = self.client.post(reverse('auth:login'), payload, format='json', REMOTE_ADDR='10.0.0.1')
+        self.assertIn('Retry-After', response)
+        self.assertEqual(
+            self.client.post(reverse('auth:login'), payload, format='json', REMOTE_ADDR='10.0.0.2').status_code, 401,
+        )
+
+
+class IntrospectionTests(APITestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch('authentication.introspection.verified_tokens', VerifiedTokenCache(100))
+        self.cache = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.user = User.objects.create(email='alice@example.com', username='alice')
+
+    def tokens(self, user=None):
+        refresh = CustomTokenObtainPairSerializer.get_token(user or self.user)
+        return refresh, refresh.access_token
+
+    def introspect(self, *tokens):
+        response = self.client.post(reverse('auth:token-introspect'), {'tokens': [str(t) for t in tokens]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        return [result if result['active'] else result['error'] for result in response.data['results']]
+
+    def test_results_keep_the_request_order(self):
+        refresh, access = self.tokens()
+        expired = self.tokens()[1]
+        expired.set_exp(lifetime=-timedelta(minutes=1))
+        results = self.introspect(access, 'not-a-token', expired, refresh)
+        self.assertEqual(results[0]['claims']['user_id'], str(self.user.pk))
+        self.assertEqual(results[1:3], ['Token is invalid', 'Token is expired'])
+        self.assertEqual(results[3]['claims']['token_type'], 'refresh')
+
+    def test_revocation_is_checked_on_cached_tokens(self):
+        refresh, access = self.tokens()
+        bob = User.objects.create(email='bob@example.com', username='bob')
+        bob_access = self.tokens(bob)[1]
+        self.assertTrue(all(result['active'] for result in self.introspect(refresh, access, bob_access)))
+        self.assertEqual(len(self.cache), 3)
+
+        refresh.blacklist()
+        self.user.revoke_tokens()
+        self.user.save()
+        bob.is_active = False
+        bob.save()
+        with mock.patch.object(state.token_backend, 'decode', side_effect=AssertionError("not cached")):
+            self.assertEqual(
+                self.introspect(refresh, access, bob_access),
+                ['Token is blacklisted', 'Token is no longer valid', 'User is inactive'],
+            )
+
+    def test_deleted_user(self):
+        access = self.tokens()[1]
+        self.user.delete()
+        self.assertEqual(self.introspect(access), ['User not found'])
+
+
+class VerifiedTokenCacheTests(TestCase):
+
+    def test_entries_expire_at_token_exp(self):
+        cache = VerifiedTokenCache(max_size=10)
+        cache.set(b'token', 100, {'exp': 100})
+        self.assertEqual(cache.get(b'token', now=99), {'exp': 100})
+        self.assertIsNone(cache.get(b'token', now=100))
+        self.assertEqual(len(cache), 0)
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = VerifiedTokenCache(max_size=2)
+        cache.set(b'a', 100, 'a')
+        cache.set(b'b', 100, 'b')
+        cache.get(b'a', now=0)
+        cache.set(b'c', 100, 'c')
+        self.assertEqual([cache.get(key, now=0) for key in (b'a', b'b', b'c')], ['a', None, 'c'])
+
+
+class ActivityTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create(email='alice@example.com', username='alice')
+        self.old = timezone.now() - timedelta(days=1)
+        User.objects.filter(pk=self.user.pk).update(updated_at=self.old)
+
+    def assert_written(self):
+        seen = timezone.now()
+        write_activity({str(self.user.pk): [None, seen]})
+        user = User.objects.get(pk=self.user.pk)
+        self.assertEqual(user.last_seen, seen)
+        self.assertIsNone(user.last_login)
+        # دیدن کاربر در خروجی افزایشی (?updated_since=) تغییر حساب نمی‌شود
+        self.assertEqual(user.updated_at, self.old)
+
+        write_activity({str(self.user.pk): [seen, None]})
+        user = User.objects.get(pk=self.user.pk)
+        self.assertEqual((user.last_login, user.last_seen), (seen, seen))
+        self.assertGreater(user.updated_at, self.old)
+
+    def test_bulk_update_touches_updated_at_only_on_login(self):
+        self.assert_written()
+
+    def test_per_user_update_touches_updated_at_only_on_login(self):
+        # دیتابیس‌های بدون UPDATE ... FROM
+        with mock.patch.object(connection, 'vendor', 'mysql'):
+            self.assert_written()
+
+
+class MetricsAccessTests(TestCase):
+    url = '/metrics'
+
+    @override_settings(METRICS_TOKEN='', DEBUG=False)
+    def test_no_token_is_closed_in_production(self):
+        # پشت reverse proxy همه‌ی درخواست‌ها از 127.0.0.1 هستند
+        self.assertEqual(self.client.get(self.url, REMOTE_ADDR='127.0.0.1').status_code, 403)
+
+    @override_settings(METRICS_TOKEN='', DEBUG=True)
+    def test_allowed_ips_in_debug(self):
+        self.assertEqual(self.client.get(self.url, REMOTE_ADDR='127.0.0.1').status_code, 200)
+        self.assertEqual(self.client.get(self.url, REMOTE_ADDR='10.0.0.1').status_code, 403)
+
+    @override_settings(METRICS_TOKEN='s3cret', DEBUG=False)
+    def test_token(self):
+        self.assertEqual(self.client.get(self.url, HTTP_AUTHORIZATION='Bearer s3cret').status_code, 200)
+        self.assertEqual(self.client.get(self.url, HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+        self.assertEqual(self.client.get(self.url, REMOTE_ADDR='127.0.0.1').status_code, 403)
+
+
+class TokenPruningTests(TestCase):
+
+    def setUp(self):
+        from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+        self.user = User.objects.create(email='alice@example.com', username='alice')
+        now = timezone.now()
+        self.tokens = {}
+        for name, expires_at in (
+            ('old1', now - timedelta(days=3)),
+            ('old2', now - timedelta(days=2)),
+            ('old3', now - timedelta(hours=2)),
+            ('in_grace', now - timedelta(minutes=30)),
+            ('valid', now + timedelta(days=1)),
+        ):
+            self.tokens[name] = OutstandingToken.objects.create(
+                user=self.user, jti=name, token=f'token-{name}', created_at=now - timedelta(days=7),
+                expires_at=expires_at,
+            )
+        BlacklistedToken.objects.create(token=self.tokens['old1'])
+        BlacklistedToken.objects.create(token=self.tokens['valid'])
+
+    def test_expired_rows_are_deleted_in_batches(self):
+        from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+        pruner = TokenPruner(batch_size=2, pause=0, grace=3600)
+        result = pruner.run()
+        self.assertEqual(result['deleted'], {'outstanding': 3, 'blacklisted': 1})
+        self.assertEqual(result['batches'], 2)
+        self.assertEqual(set(OutstandingToken.objects.values_list('jti', flat=True)), {'in_grace', 'valid'})
+        self.assertEqual(list(BlacklistedToken.objects.values_list('token__jti', flat=True)), ['valid'])
+
+        self.assertEqual(pruner.run()['deleted'], {'outstanding': 0, 'blacklisted': 0})
+
+
+class KeyRingMixin:
+    """پوشه‌ی کلید موقت؛ KeyRing با reload_interval صفر تغییر فایل‌ها را در همان فراخوانی بعدی می‌بیند."""
+
+    def setUp(self):
+        super().setUp()
+        self.keys_dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.keys_dir, ignore_errors=True)
+        self.key_ring = KeyRing(self.keys_dir, 'RS256', reload_interval=0)
+        self.backend = KeyRingTokenBackend(self.key_ring, 'RS256')
+
+    def write_key(self, kid, algorithm='RS256'):
+        private_key = generate_private_key(algorithm)
+        (self.keys_dir / (kid + PUBLIC_SUFFIX)).write_bytes(private_key.public_key().public_bytes(
+            serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo,
+        ))
+        (self.keys_dir / (kid + PRIVATE_SUFFIX)).write_bytes(private_key.private_bytes(
+            serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption(),
+        ))
+        return private_key
+
+    def activate(self, kid):
+        (self.keys_dir / ACTIVE_KID_FILE).write_text(kid)
+
+    def kid_of(self, token):
+        return jwt.get_unverified_header(token)['kid']
+
+
+class KeyRotationTests(KeyRingMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.write_key('2025')
+        self.write_key('2026')
+        self.activate('2025')
+
+    def test_rotation_keeps_earlier_tokens_valid(self):
+        old_token = self.backend.encode({'user_id': '1'})
+        self.assertEqual(self.kid_of(old_token), '2025')
+
+        self.activate('2026')
+        new_token = self.backend.encode({'user_id': '1'})
+        self.assertEqual(self.kid_of(new_token), '2026')
+        for token in (old_token, new_token):
+            self.assertEqual(self.backend.decode(token)['user_id'], '1')
+
+        # کلید بازنشسته: فقط public؛ در JWKS می‌ماند و توکن‌های قبلی را تأیید می‌کند
+        (self.keys_dir / ('2025' + PRIVATE_SUFFIX)).unlink()
+        self.assertEqual(self.backend.decode(old_token)['user_id'], '1')
+        self.assertEqual([key['kid'] for key in self.key_ring.jwks()['keys']], ['2025', '2026'])
+
+        (self.keys_dir / ('2025' + PUBLIC_SUFFIX)).unlink()
+        with self.assertRaises(TokenBackendError):
+            self.backend.decode(old_token)
+
+    def test_retired_key_is_never_active(self):
+        # active_kid به کلید بدون private اشاره می‌کند؛ JWT_ACTIVE_KID جایگزین است
+        (self.keys_dir / ('2025' + PRIVATE_SUFFIX)).unlink()
+        backend = KeyRingTokenBackend(KeyRing(self.keys_dir, 'RS256', active_kid='2026', reload_interval=0), 'RS256')
+        self.assertEqual(self.kid_of(backend.encode({'user_id': '1'})), '2026')
+
+    def test_unknown_kid_is_rejected(self):
+        private_key = generate_private_key('RS256')
+        token = jwt.encode({'user_id': '1'}, private_key, algorithm='RS256', headers={'kid': 'forged'})
+        with self.assertRaises(TokenBackendError):
+            self.backend.decode(token)
+
+    def test_token_signed_with_another_key_under_a_known_kid_is_rejected(self):
+        private_key = generate_private_key('RS256')
+        token = jwt.encode({'user_id': '1'}, private_key, algorithm='RS256', headers={'kid': '2025'})
+        with self.assertRaises(TokenBackendError):
+            self.backend.decode(token)
+
+    def test_jwks_etag(self):
+        url = reverse('jwks')
+        with mock.patch('authentication.views.get_key_ring', return_value=self.key_ring):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual({key['kid'] for key in response.json()['keys']}, {'2025', '2026'})
+            self.assertIn('max-age=', response['Cache-Control'])
+            etag = response['ETag']
+
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response['ETag'], etag)
+
+            # کلید جدید قبل از فعال شدن منتشر می‌شود و ETag عوض می‌شود
+            self.write_key('2027')
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotEqual(response['ETag'], etag)
+            self.assertIn('2027', {key['kid'] for key in response.json()['keys']})
+
+
+class SigningAlgorithmTests(KeyRingMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.write_key('rsa', 'RS256')
+        self.write_key('ec', 'ES256')
+        self.write_key('ed', 'EdDSA')
+        self.activate('rsa')
+
+    def forge(self, header, signature=lambda signing_input: b''):
+        def encode(data):
+            return base64.urlsafe_b64encode(data).rstrip(b'=')
+
+        signing_input = b'.'.join(
+            encode(json.dumps(part).encode()) for part in (header, {'user_id': '1', 'token_type': 'access'})
+        )
+        return (signing_input + b'.' + encode(signature(signing_input))).decode()
+
+    def test_each_key_signs_with_its_own_algorithm(self):
+        jwks = {key['kid']: key for key in self.key_ring.jwks()['keys']}
+        for kid, algorithm, key_type in (('rsa', 'RS256', 'RSA'), ('ec', 'ES256', 'EC'), ('ed', 'EdDSA', 'OKP')):
+            self.activate(kid)
+            token = self.backend.encode({'user_id': '1'})
+            self.assertEqual(jwt.get_unverified_header(token), {'alg': algorithm, 'kid': kid, 'typ': 'JWT'})
+            self.assertEqual(self.backend.decode(token)['user_id'], '1')
+            self.assertEqual((jwks[kid]['alg'], jwks[kid]['kty']), (algorithm, key_type))
+
+    def test_alg_header_cannot_pick_hmac_with_the_public_key(self):
+        public_pem = (self.keys_dir / ('rsa' + PUBLIC_SUFFIX)).read_bytes()
+        token = self.forge(
+            {'alg': 'HS256', 'kid': 'rsa', 'typ': 'JWT'},
+            lambda signing_input: hmac.new(public_pem, signing_input, hashlib.sha256).digest(),
+        )
+        with self.assertRaises(TokenBackendError):
+            self.backend.decode(token)
+
+    def test_alg_none_is_rejected(self):
+        for kid in ('rsa', 'ec', 'ed'):
+            with self.assertRaises(TokenBackendError):
+                self.backend.decode(self.forge({'alg': 'none', 'kid': kid, 'typ': 'JWT'}))
+
+    def test_alg_header_must_match_the_key(self):
+        # توکن RS256 با کلید مهاجم، با kid کلید EC
+        token = jwt.encode(
+            {'user_id': '1'}, generate_private_key('RS256'), algorithm='RS256', headers={'kid': 'ec'},
+        )
+        with self.assertRaises(TokenBackendError):
+            self.backend.decode(token)
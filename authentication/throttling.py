@@ -0,0 +1,137 @@
+"""
+Throttle با شمارنده‌ی sliding window که بین همه‌ی workerهای یک میزبان مشترک است.
+
+throttleهای پیش‌فرض DRF لیست زمان درخواست‌ها را در cache پیش‌فرض نگه می‌دارند؛ بدون CACHES این یعنی
+LocMem جدا برای هر پروسه (محدودیت عملاً ضرب در تعداد workerها) و کپی و بازنویسی کل لیست در هر بررسی.
+اینجا برای هر کلید فقط دو شمارنده (پنجره‌ی فعلی و قبلی) در یک فایل SQLite با WAL (THROTTLE_DB_PATH)
+نگه داشته می‌شود و تعداد تخمینی درخواست‌ها در بازه‌ی اخیر برابر است با:
+    قبلی × (بخش باقی‌مانده از پنجره‌ی قبلی) + فعلی
+"""
+import logging
+import sqlite3
+import threading
+import time
+
+from django.conf import settings
+from rest_framework import throttling
+
+logger = logging.getLogger(__name__)
+
+# هر چند ثانیه یک بار ردیف‌های پنجره‌های تمام‌شده پاک می‌شوند
+CLEANUP_INTERVAL = 60
+
+
+class SlidingWindowStore:
+    def __init__(self, path):
+        self.path = str(path)
+        self._local = threading.local()
+        self._cleaned_at = 0.0
+
+    @property
+    def connection(self):
+        # اتصال sqlite3 بین threadها مشترک نمی‌شود
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=1.0, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            # شمارنده‌ی throttle به دوام بعد از crash نیاز ندارد
+            connection.execute('PRAGMA synchronous=OFF')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS throttle ('
+                ' key TEXT NOT NULL, window INTEGER NOT NULL, count INTEGER NOT NULL, expires REAL NOT NULL,'
+                ' PRIMARY KEY (key, window)) WITHOUT ROWID'
+            )
+            self._local.connection = connection
+        return connection
+
+    def hit(self, key, limit, duration, now=None):
+        """
+        یک درخواست برای key ثبت می‌کند، مگر این‌که به limit رسیده باشد.
+        (مجاز بودن، ثانیه‌های انتظار تا درخواست بعدی) را برمی‌گرداند.
+        """
+        now = time.time() if now is None else now
+        window = int(now // duration)
+        elapsed = now - window * duration
+        connection = self.connection
+
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            counts = dict(connection.execute(
+                'SELECT window, count FROM throttle WHERE key = ? AND window IN (?, ?)',
+                (key, window - 1, window),
+            ).fetchall())
+            previous, current = counts.get(window - 1, 0), counts.get(window, 0)
+            estimate = previous * (1 - elapsed / duration) + current
+            allowed = estimate < limit
+            if allowed:
+                connection.execute(
+                    'INSERT INTO throttle (key, window, count, expires) VALUES (?, ?, 1, ?) '
+                    'ON CONFLICT (key, window) DO UPDATE SET count = count + 1',
+                    (key, window, (window + 2) * duration),
+                )
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+
+        if now - self._cleaned_at > CLEANUP_INTERVAL:
+            self._cleaned_at = now
+            connection.execute('DELETE FROM throttle WHERE expires < ?', (now,))
+
+        if allowed:
+            return True, None
+        return False, self._wait(previous, current, limit, duration, elapsed)
+
+    def _wait(self, previous, current, limit, duration, elapsed):
+        if current >= limit:
+            # تا پنجره‌ی بعدی، و بعد تا وقتی که سهم پنجره‌ی فعلی (که قبلی می‌شود) کمتر از limit شود
+            return (duration - elapsed) + duration * (1 - limit / current)
+        return max(duration * (1 - (limit - current) / previous) - elapsed, 0.0)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = SlidingWindowStore(settings.THROTTLE_DB_PATH)
+    return _store
+
+
+class SlidingWindowRateThrottle(throttling.SimpleRateThrottle):
+    """SimpleRateThrottle با SlidingWindowStore به جای لیست زمان‌ها در cache"""
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        try:
+            allowed, self._wait = get_store().hit(self.key, self.num_requests, self.duration)
+        except sqlite3.Error:
+            # خرابی فایل throttle نباید سرویس را از کار بیندازد
+            logger.exception("Throttle store unavailable; allowing request.")
+            return True
+        return allowed
+
+    def wait(self):
+        return getattr(self, '_wait', None)
+
+
+class AnonRateThrottle(throttling.AnonRateThrottle, SlidingWindowRateThrottle):
+    pass
+
+
+class UserRateThrottle(throttling.UserRateThrottle, SlidingWindowRateThrottle):
+    pass
+
+
+class ScopedRateThrottle(throttling.ScopedRateThrottle, SlidingWindowRateThrottle):
+    """محدودیت جدا برای ویوهایی که throttle_scope دارند (مثلاً login و register)"""
@@ -0,0 +1,23 @@
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken as BaseRefreshToken
+
+from .blacklist import blacklist_index
+
+
+class RefreshToken(BaseRefreshToken):
+    """
+    RefreshToken که بلک‌لیست را از ایندکس درون‌حافظه‌ای بررسی می‌کند، نه با کوئری برای هر refresh.
+    """
+
+    def check_blacklist(self):
+        jti = self.payload[api_settings.JTI_CLAIM]
+
+        if blacklist_index.contains(jti):
+            raise TokenError(_("Token is blacklisted"))
+
+    def blacklist(self):
+        result = super().blacklist()
+        blacklist_index.add(self.payload[api_settings.JTI_CLAIM])
+        return result
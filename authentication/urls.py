@@ -1,22 +1,38 @@
+from django.conf import settings
 from django.urls import path
 from .views import (
     RegisterView,
+    BulkRegisterView,
     CustomTokenObtainPairView,
     LogoutView,
     ProfileView,
     ChangePasswordView,
     TokenDecodeView,
+    TokenIntrospectView,
 )
+from .async_views import AsyncChangePasswordView, AsyncLoginView, AsyncRegisterView
 from rest_framework_simplejwt.views import TokenRefreshView
 
 app_name = 'auth'
 
+# زیر ASGI نسخه‌های async هش رمز را به ProcessPool می‌سپارند (authentication.hashing)
+if settings.AUTH_ASYNC_VIEWS:
+    register_view = AsyncRegisterView.as_view()
+    login_view = AsyncLoginView.as_view()
+    change_password_view = AsyncChangePasswordView.as_view()
+else:
+    register_view = RegisterView.as_view()
+    login_view = CustomTokenObtainPairView.as_view()
+    change_password_view = ChangePasswordView.as_view()
+
 urlpatterns = [
-    path('register/', RegisterView.as_view(), name='register'),
-    path('login/', CustomTokenObtainPairView.as_view(), name='login'),
+    path('register/', register_view, name='register'),
+    path('register/bulk/', BulkRegisterView.as_view(), name='register-bulk'),
+    path('login/', login_view, name='login'),
     path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('logout/', LogoutView.as_view(), name='logout'),
     path('profile/', ProfileView.as_view(), name='profile'),
-    path('change-password/', ChangePasswordView.as_view(), name='change_password'),
+    path('change-password/', change_password_view, name='change_password'),
     path('token/decode/', TokenDecodeView.as_view(), name='token-decode'),
+    path('token/introspect/', TokenIntrospectView.as_view(), name='token-introspect'),
 ]
@@ -1,11 +1,21 @@
 from rest_framework import status, permissions, generics, serializers
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from django.contrib.auth import get_user_model
-from .serializers import CustomTokenObtainPairSerializer, TokenDecodeSerializer
+from .authentication import get_full_user
+from .introspection import introspect_tokens
+from .keys import get_key_ring
+from .registration import register_user, register_users
+from .tokens import RefreshToken
+from .serializers import CustomTokenObtainPairSerializer, TokenDecodeSerializer, TokenIntrospectSerializer
+from .throttling import ScopedRateThrottle
+from users.fast_serializers import FastUserProfileSerializer
+from users.profile_cache import profile_cache
+from user_service.db_router import ReplicaReadMixin
+from user_service.metrics import timed
 from users.serializers import (
+    BulkRegisterSerializer,
     RegisterSerializer,
     UserProfileSerializer,
     UserAdminSerializer,
@@ -18,12 +28,13 @@ User = get_user_model()
 class RegisterView(generics.CreateAPIView):
     serializer_class = RegisterSerializer
     permission_classes = [permissions.AllowAny]
+    throttle_scope = 'register'
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        user = serializer.save()
-        refresh = RefreshToken.for_user(user)
+        # کاربر و refresh در یک تراکنش (authentication.registration)
+        user, refresh = register_user(serializer)
         return Response({
             "user": UserProfileSerializer(user, context=self.get_serializer_context()).data,
             "refresh": str(refresh),
@@ -31,8 +42,27 @@ class RegisterView(generics.CreateAPIView):
         }, status=status.HTTP_201_CREATED)
 
 
+class BulkRegisterView(APIView):
+    """
+    ثبت‌نام دسته‌ای برای سرویس‌های داخلی - فقط برای ادمین
+    POST {"users": [{email, username, first_name, last_name, password, password_confirm, ...}, ...]}
+    همه در یک تراکنش ساخته می‌شوند یا هیچ‌کدام؛ خطاها به تفکیک هر ورودی برمی‌گردند. توکنی صادر نمی‌شود.
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def post(self, request):
+        serializer = BulkRegisterSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        users = register_users(serializer)
+        return Response(
+            {"users": UserProfileSerializer(users, many=True, context={'request': request}).data},
+            status=status.HTTP_201_CREATED,
+        )
+
+
 class CustomTokenObtainPairView(TokenObtainPairView):
     serializer_class = CustomTokenObtainPairSerializer
+    throttle_scope = 'login'
 
 
 class LogoutView(APIView):
@@ -48,12 +78,21 @@ class LogoutView(APIView):
             return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
 
-class ProfileView(generics.RetrieveUpdateAPIView):
+class ProfileView(ReplicaReadMixin, generics.RetrieveUpdateAPIView):
     serializer_class = UserProfileSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_object(self):
-        return self.request.user
+        # GET از مدل کش‌شده، ویرایش همیشه از دیتابیس
+        cached = self.request.method in permissions.SAFE_METHODS
+        return get_full_user(self.request.user, cached=cached)
+
+    def retrieve(self, request, *args, **kwargs):
+        def build():
+            serializer = FastUserProfileSerializer(context=self.get_serializer_context())
+            return serializer.from_instance(self.get_object())
+        # پروفایل سریال‌شده از کش نسخه‌دار (users.profile_cache)
+        return Response(profile_cache.get(request.user.pk, request, build))
 
 
 class ChangePasswordView(APIView):
@@ -62,7 +101,7 @@ class ChangePasswordView(APIView):
     def post(self, request):
         serializer = ChangePasswordSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        user = request.user
+        user = get_full_user(request.user, cached=False)
 
         if not user.check_password(serializer.validated_data['old_password']):
             return Response({"old_password": "Wrong password."}, status=status.HTTP_400_BAD_REQUEST)
@@ -171,15 +210,17 @@ class TokenDecodeView(GenericAPIView):
                 'verify_iss': verify_iss,
             }
             
-            # Decode the token
-            decoded_payload = jwt.decode(
-                token,
-                settings.SIMPLE_JWT["VERIFYING_KEY"],
-                algorithms=[settings.SIMPLE_JWT["ALGORITHM"]],
-                audience=settings.SIMPLE_JWT["AUDIENCE"] if verify_aud else None,
-                issuer=settings.SIMPLE_JWT["ISSUER"] if verify_iss else None,
-                options=options
-            )
+            # Decode the token (کلید پارس‌شده و الگوریتم آن از KeyRing)
+            key = get_key_ring().get_verifying_jwt_key(token)
+            with timed('jwt_verify'):
+                decoded_payload = jwt.decode(
+                    token,
+                    key.public_key,
+                    algorithms=[key.algorithm],
+                    audience=settings.SIMPLE_JWT["AUDIENCE"] if verify_aud else None,
+                    issuer=settings.SIMPLE_JWT["ISSUER"] if verify_iss else None,
+                    options=options
+                )
             
             # Prepare response
             response_data = {
@@ -204,3 +245,43 @@ class TokenDecodeView(GenericAPIView):
                 },
                 status=status.HTTP_400_BAD_REQUEST
             )
+
+
+class JWKSView(APIView):
+    """
+    کلیدهای عمومی فعال و بازنشسته برای تأیید محلی توکن‌ها (api-gateway و سرویس‌های دیگر)
+    """
+    authentication_classes = []
+    permission_classes = [AllowAny]
+    throttle_classes = []
+    renderer_classes = [JSONRenderer]
+
+    def get(self, request, *args, **kwargs):
+        key_ring = get_key_ring()
+        jwks = key_ring.jwks()
+        etag = f'"{key_ring.etag}"'
+        headers = {
+            'ETag': etag,
+            'Cache-Control': f'public, max-age={settings.JWKS_CACHE_MAX_AGE}',
+        }
+        if request.headers.get('If-None-Match') == etag:
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return Response(jwks, headers=headers)
+
+
+class TokenIntrospectView(APIView):
+    """
+    بررسی دسته‌ای توکن‌ها برای gateway: POST {"tokens": [...]} -> {"results": [...]} به همان ترتیب
+    نتیجه‌ی تأیید امضا تا exp هر توکن کش می‌شود (authentication.introspection)
+    """
+    authentication_classes = []
+    permission_classes = [AllowAny]
+    # gateway با یک IP همه‌ی درخواست‌ها را می‌فرستد؛ فقط محدودیت scope مخصوص خودش
+    throttle_classes = [ScopedRateThrottle]
+    throttle_scope = 'introspect'
+    renderer_classes = [JSONRenderer]
+
+    def post(self, request, *args, **kwargs):
+        serializer = TokenIntrospectSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return Response({'results': introspect_tokens(serializer.validated_data['tokens'])})
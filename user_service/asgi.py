@@ -9,7 +9,7 @@ https://docs.djangoproject.com/en/6.0/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
+from user_service.stack import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'user_service.settings.dev')
 
@@ -0,0 +1,117 @@
+"""
+فرستادن خواندن‌های امن به read replicaها (REPLICA_* در settings).
+
+همه‌ی کوئری‌ها به صورت پیش‌فرض به default می‌روند؛ فقط خواندن‌های داخل read_replica() (GET لیست و جزئیات
+کاربران، پروفایل، خروجی و changelist ادمین) به یک replica تصادفی فرستاده می‌شوند. احراز هویت و بررسی
+ابطال توکن بیرون از این بلوک و همیشه از primary انجام می‌شوند.
+
+برای read-your-writes، کاربری که ردیفش تغییر کرده (ثبت‌نام، ویرایش پروفایل، تغییر رمز) یا خودش یک درخواست
+نوشتنی فرستاده (مثلاً ویرایش کاربر در ادمین) تا REPLICA_PIN_SECONDS ثانیه به primary سنجاق می‌شود.
+سنجاق‌ها در cache پیش‌فرض هستند؛ در prod بدون cache مشترک (REDIS_URL) replica فعال نمی‌شود.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+
+PRIMARY = 'default'
+
+_read_alias = ContextVar('read_alias', default=None)
+
+
+def _pin_key(user_id):
+    return f'db:pin_primary:{user_id}'
+
+
+def pin_primary(user_id):
+    if settings.REPLICA_DATABASES and user_id is not None:
+        cache.set(_pin_key(user_id), True, settings.REPLICA_PIN_SECONDS)
+
+
+def is_pinned(user_id):
+    return user_id is not None and cache.get(_pin_key(user_id)) is not None
+
+
+def choose_read_database(user=None):
+    """alias دیتابیس برای خواندن‌های امن این کاربر: یک replica، یا primary اگر replica نداریم یا کاربر سنجاق شده"""
+    if not settings.REPLICA_DATABASES:
+        return PRIMARY
+    if user is not None and is_pinned(getattr(user, 'pk', None)):
+        return PRIMARY
+    return random.choice(settings.REPLICA_DATABASES)
+
+
+@contextmanager
+def read_replica(user=None):
+    """خواندن‌های داخل این بلوک از choose_read_database(user) انجام می‌شوند."""
+    token = _read_alias.set(choose_read_database(user))
+    try:
+        yield _read_alias.get()
+    finally:
+        _read_alias.reset(token)
+
+
+class ReplicaReadMixin:
+    """GET ویوهای DRF از replica خوانده می‌شود؛ احراز هویت قبل از آن و از primary انجام شده است."""
+
+    def get(self, request, *args, **kwargs):
+        with read_replica(request.user):
+            return super().get(request, *args, **kwargs)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        # نمونه‌ای که از replica خوانده شده هم در primary ذخیره می‌شود
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {PRIMARY, *settings.REPLICA_DATABASES}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # replicaها از primary تکثیر می‌شوند
+        if db in settings.REPLICA_DATABASES:
+            return False
+        return None
+
+
+class PinPrimaryMiddleware:
+    """بعد از هر درخواست نوشتنی موفق، کاربر فعلی را به primary سنجاق می‌کند."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        response = self.get_response(request)
+        self.pin(request, response)
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        self.pin(request, response)
+        return response
+
+    def pin(self, request, response):
+        if (
+            settings.REPLICA_DATABASES
+            and request.method not in ('GET', 'HEAD', 'OPTIONS')
+            and response.status_code < 400
+        ):
+            # کاربر JWT هم اینجا در دسترس است (DRF آن را روی request جنگو هم قرار می‌دهد)
+            user = getattr(request, 'user', None)
+            if user is not None and user.is_authenticated:
+                pin_primary(user.pk)
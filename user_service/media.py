@@ -0,0 +1,67 @@
+"""
+سرو فایل‌های media بدون این‌که worker پایتون بدنه‌ی فایل را بفرستد.
+
+با MEDIA_ACCEL=nginx پاسخ فقط هدر X-Accel-Redirect به MEDIA_ACCEL_PREFIX (یک location از نوع internal روی MEDIA_ROOT)
+است و با MEDIA_ACCEL=sendfile هدر X-Sendfile با مسیر فایل (Apache mod_xsendfile، lighttpd)؛ فایل را خود وب‌سرور
+می‌فرستد. بدون آن‌ها FileResponse از wsgi.file_wrapper (sendfile در gunicorn) استفاده می‌کند.
+نام‌های آدرس‌دهی‌شده با محتوا (user_service.storage) ETag برابر hash و Cache-Control: immutable دارند؛ مرورگر و CDN
+بعد از اولین دریافت دیگر درخواستی نمی‌فرستند و If-None-Match بدون دسترسی به دیسک 304 می‌گیرد.
+"""
+import mimetypes
+import os
+import stat
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified
+from django.utils.http import http_date, parse_etags
+from django.views.decorators.http import require_safe
+
+from .storage import content_digest
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+
+def _not_modified(request, etag):
+    etags = parse_etags(request.headers.get('If-None-Match', ''))
+    # مقایسه‌ی ضعیف، مثل ConditionalGetMiddleware
+    return '*' in etags or etag in (value.removeprefix('W/') for value in etags)
+
+
+@require_safe
+def media_view(request, name):
+    digest = content_digest(name)
+    if digest:
+        etag, cache_control = f'"{digest}"', IMMUTABLE
+        if _not_modified(request, etag):
+            return HttpResponseNotModified(headers={'ETag': etag, 'Cache-Control': cache_control})
+
+    try:
+        path = default_storage.path(name)
+        info = os.stat(path)
+    except (SuspiciousFileOperation, NotImplementedError, OSError):
+        raise Http404
+    if not stat.S_ISREG(info.st_mode):
+        raise Http404
+
+    if not digest:
+        # آپلودهای قبل از ContentAddressedStorage
+        etag, cache_control = f'"{info.st_size:x}-{int(info.st_mtime):x}"', f'public, max-age={settings.MEDIA_CACHE_MAX_AGE}'
+        if _not_modified(request, etag):
+            return HttpResponseNotModified(headers={'ETag': etag, 'Cache-Control': cache_control})
+
+    content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+    if settings.MEDIA_ACCEL == 'nginx':
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_PREFIX + quote(name)
+    elif settings.MEDIA_ACCEL == 'sendfile':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = path
+    else:
+        response = FileResponse(open(path, 'rb'), content_type=content_type)
+    response['ETag'] = etag
+    response['Cache-Control'] = cache_control
+    response['Last-Modified'] = http_date(info.st_mtime)
+    return response
@@ -0,0 +1,372 @@
+"""
+متریک‌های درخواست در قالب متنی Prometheus (GET /metrics).
+
+MetricsMiddleware برای هر درخواست شمارش و زمان کل را به تفکیک view ثبت می‌کند. در درخواست‌های
+نمونه‌برداری‌شده (METRICS_SAMPLE_RATE) تعداد و زمان کوئری‌ها (execute_wrapper روی هر اتصال) و زمان
+مراحل پرهزینه‌ای که با timed() علامت خورده‌اند (هش رمز، امضا و تأیید JWT) هم ثبت و در صورت
+METRICS_SERVER_TIMING در هدر Server-Timing برگردانده می‌شوند.
+
+متریک‌ها در حافظه‌ی هر پروسه‌اند. با METRICS_DIR هر worker هر METRICS_FLUSH_INTERVAL ثانیه یک snapshot
+در آن پوشه می‌نویسد و /metrics مجموع همه‌ی workerها را برمی‌گرداند.
+"""
+import atexit
+import bisect
+import glob
+import hmac
+import json
+import logging
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse, HttpResponseForbidden
+
+logger = logging.getLogger(__name__)
+
+TIME_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# نام: (نوع، توضیح، bucketها)
+METRICS = {
+    'http_requests_total': (
+        'counter', "Requests by view, method and status class.", None),
+    'http_request_duration_seconds': (
+        'histogram', "Time from the first middleware to the response, by view.", TIME_BUCKETS),
+    'http_request_db_queries': (
+        'histogram', "Database queries per sampled request.", COUNT_BUCKETS),
+    'http_request_db_seconds': (
+        'histogram', "Time spent in database queries per sampled request.", TIME_BUCKETS),
+    'http_request_phase_seconds': (
+        'histogram', "Time per password hashing, JWT signing or verification call in sampled requests.", TIME_BUCKETS),
+    'token_lookup_seconds': (
+        'histogram', "Token table reads: blacklist index sync/rebuild and jti lookup probes after pruning.", TIME_BUCKETS),
+    'token_pruned_rows_total': (
+        'counter', "Expired outstanding and blacklisted token rows deleted by the pruning job, by table.", None),
+}
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        # {(name, labels): value}
+        self.counters = {}
+        # {(name, labels): [count برای هر bucket و +Inf, sum]}
+        self.histograms = {}
+        self._collectors = []
+
+    def inc(self, name, labels, value=1):
+        key = (name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, labels, value):
+        buckets = METRICS[name][2]
+        key = (name, labels)
+        with self._lock:
+            entry = self.histograms.get(key)
+            if entry is None:
+                entry = self.histograms[key] = [0] * (len(buckets) + 1) + [0.0]
+            entry[bisect.bisect_left(buckets, value)] += 1
+            entry[-1] += value
+
+    def register_collector(self, collector):
+        """collector() لیست (نام، نوع، توضیح، مقدار) برمی‌گرداند و در هر snapshot صدا زده می‌شود."""
+        self._collectors.append(collector)
+
+    def snapshot(self):
+        with self._lock:
+            counters = [[name, list(labels), value] for (name, labels), value in self.counters.items()]
+            histograms = [[name, list(labels), list(entry)] for (name, labels), entry in self.histograms.items()]
+        collected = []
+        for collector in self._collectors:
+            collected.extend(list(item) for item in collector())
+        return {'pid': os.getpid(), 'counters': counters, 'histograms': histograms, 'collected': collected}
+
+
+registry = Registry()
+
+
+def merge(snapshots):
+    """مجموع snapshotها؛ gaugeهای پروسه‌هایی که دیگر زنده نیستند کنار گذاشته می‌شوند."""
+    counters, histograms, collected = {}, {}, {}
+    for snapshot in snapshots:
+        for name, labels, value in snapshot['counters']:
+            key = (name, tuple(map(tuple, labels)))
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, entry in snapshot['histograms']:
+            key = (name, tuple(map(tuple, labels)))
+            current = histograms.get(key)
+            histograms[key] = entry if current is None else [a + b for a, b in zip(current, entry)]
+        alive = _alive(snapshot['pid'])
+        for name, kind, help_text, value in snapshot['collected']:
+            if kind == 'gauge' and not alive:
+                continue
+            previous = collected.get(name, (kind, help_text, 0))
+            collected[name] = (kind, help_text, previous[2] + value)
+    return counters, histograms, collected
+
+
+def _alive(pid):
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in pairs) + '}'
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render(snapshots):
+    counters, histograms, collected = merge(snapshots)
+    lines = []
+    for name, (kind, help_text, buckets) in METRICS.items():
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}']
+        if kind == 'counter':
+            for (metric, labels), value in sorted(counters.items()):
+                if metric == name:
+                    lines.append(f'{name}{_labels(labels)} {_number(value)}')
+            continue
+        for (metric, labels), entry in sorted(histograms.items()):
+            if metric != name:
+                continue
+            cumulative = 0
+            for bound, count in zip(buckets + (float('inf'),), entry[:-1]):
+                cumulative += count
+                lines.append(f'{name}_bucket{_labels(labels, [("le", _number(bound))])} {cumulative}')
+            lines.append(f'{name}_sum{_labels(labels)} {_number(entry[-1])}')
+            lines.append(f'{name}_count{_labels(labels)} {cumulative}')
+    for name, (kind, help_text, value) in sorted(collected.items()):
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}', f'{name} {_number(value)}']
+    return '\n'.join(lines) + '\n'
+
+
+class SnapshotWriter:
+    """snapshot این پروسه را هر METRICS_FLUSH_INTERVAL ثانیه در METRICS_DIR می‌نویسد."""
+
+    def __init__(self, directory, interval):
+        self.directory = directory
+        self.interval = interval
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+
+    def path(self):
+        return os.path.join(self.directory, f'{os.getpid()}.json')
+
+    def write(self):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path()
+        temporary = f'{path}.tmp'
+        with open(temporary, 'w') as file:
+            json.dump(registry.snapshot(), file)
+        os.replace(temporary, path)
+
+    def read_all(self):
+        """snapshot همه‌ی workerها؛ snapshot این پروسه تازه ساخته می‌شود."""
+        own = self.path()
+        snapshots = [registry.snapshot()]
+        for path in glob.glob(os.path.join(self.directory, '*.json')):
+            if path == own:
+                continue
+            try:
+                with open(path) as file:
+                    snapshots.append(json.load(file))
+            except (OSError, ValueError):
+                # فایلی که همین حالا جایگزین یا حذف شده
+                continue
+        return snapshots
+
+    def ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='metrics-writer', daemon=True)
+                self._thread.start()
+                atexit.register(self.shutdown)
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                self.write()
+            except OSError:
+                logger.exception("Writing metrics snapshot to %s failed.", self.directory)
+
+    def shutdown(self):
+        self._stopped.set()
+        try:
+            self.write()
+        except OSError:
+            pass
+
+
+snapshot_writer = SnapshotWriter(settings.METRICS_DIR, settings.METRICS_FLUSH_INTERVAL) if settings.METRICS_DIR else None
+
+
+class RequestTimings:
+    """تفکیک زمان یک درخواست نمونه‌برداری‌شده"""
+    __slots__ = ('queries', 'db_seconds', 'phases')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        # [(مرحله، ثانیه)]
+        self.phases = []
+
+
+_timings = ContextVar('request_timings', default=None)
+
+
+@contextmanager
+def timed(phase):
+    """زمان این بلوک را به‌عنوان phase در درخواست نمونه‌برداری‌شده‌ی فعلی ثبت می‌کند (بیرون از آن کاری نمی‌کند)."""
+    timings = _timings.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.phases.append((phase, time.perf_counter() - start))
+
+
+def _time_query(execute, sql, params, many, context):
+    timings = _timings.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.queries += 1
+        timings.db_seconds += time.perf_counter() - start
+
+
+def install_query_timer(sender, connection, **kwargs):
+    # هر اتصال جدید در هر thread (از جمله threadهای sync_to_async)
+    if _time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_time_query)
+
+
+connection_created.connect(install_query_timer, dispatch_uid='user_service.metrics.install_query_timer')
+
+
+class MetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if snapshot_writer is not None:
+            snapshot_writer.ensure_started()
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        start, token = self.begin()
+        try:
+            response = self.get_response(request)
+        finally:
+            timings = self.end(token)
+        self.record(request, response, start, timings)
+        return response
+
+    async def __acall__(self, request):
+        start, token = self.begin()
+        try:
+            response = await self.get_response(request)
+        finally:
+            timings = self.end(token)
+        self.record(request, response, start, timings)
+        return response
+
+    def begin(self):
+        token = None
+        if settings.METRICS_SAMPLE_RATE >= 1 or random.random() < settings.METRICS_SAMPLE_RATE:
+            token = _timings.set(RequestTimings())
+        return time.perf_counter(), token
+
+    def end(self, token):
+        if token is None:
+            return None
+        timings = _timings.get()
+        _timings.reset(token)
+        return timings
+
+    def record(self, request, response, start, timings):
+        duration = time.perf_counter() - start
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match is not None else '<unmatched>'
+        labels = (('view', view),)
+
+        registry.inc('http_requests_total', labels + (
+            ('method', request.method), ('status', f'{response.status_code // 100}xx'),
+        ))
+        registry.observe('http_request_duration_seconds', labels, duration)
+
+        phases = {}
+        if timings is not None:
+            registry.observe('http_request_db_queries', labels, timings.queries)
+            registry.observe('http_request_db_seconds', labels, timings.db_seconds)
+            for phase, seconds in timings.phases:
+                registry.observe('http_request_phase_seconds', labels + (('phase', phase),), seconds)
+                phases[phase] = phases.get(phase, 0.0) + seconds
+
+            if settings.METRICS_SERVER_TIMING:
+                entries = [f'total;dur={duration * 1000:.2f}', f'db;dur={timings.db_seconds * 1000:.2f};desc="{timings.queries} queries"']
+                entries += [f'{phase};dur={seconds * 1000:.2f}' for phase, seconds in phases.items()]
+                response['Server-Timing'] = ', '.join(entries)
+
+        if settings.METRICS_SLOW_REQUEST_MS and duration * 1000 >= settings.METRICS_SLOW_REQUEST_MS:
+            breakdown = ''
+            if timings is not None:
+                breakdown = ' db=%.1fms/%d queries' % (timings.db_seconds * 1000, timings.queries)
+                breakdown += ''.join(f' {phase}={seconds * 1000:.1f}ms' for phase, seconds in phases.items())
+            logger.warning("Slow request %s %s (%s): %.1fms%s", request.method, request.path, view, duration * 1000, breakdown)
+
+
+def metrics_view(request):
+    """
+    GET /metrics برای Prometheus؛ با METRICS_TOKEN، یا بدون آن فقط در DEBUG و از METRICS_ALLOWED_IPS.
+    پشت reverse proxy روی همان میزبان همه‌ی درخواست‌ها از 127.0.0.1 می‌آیند، پس IP در production کافی نیست.
+    """
+    if settings.METRICS_TOKEN:
+        allowed = hmac.compare_digest(
+            request.headers.get('Authorization', '').encode(), f'Bearer {settings.METRICS_TOKEN}'.encode(),
+        )
+    else:
+        allowed = settings.DEBUG and request.META.get('REMOTE_ADDR') in settings.METRICS_ALLOWED_IPS
+    if not allowed:
+        return HttpResponseForbidden()
+    snapshots = snapshot_writer.read_all() if snapshot_writer is not None else [registry.snapshot()]
+    return HttpResponse(render(snapshots), content_type=CONTENT_TYPE)
@@ -1,4 +1,6 @@
+import copy
 import os
+import tempfile
 from pathlib import Path
 from datetime import timedelta
 from dotenv import load_dotenv
@@ -42,6 +44,8 @@ INSTALLED_APPS = [
 
 # میدلورها
 MIDDLEWARE = [
+    # بیرونی‌ترین لایه تا زمان کل درخواست را اندازه بگیرد
+    'user_service.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -49,6 +53,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'user_service.db_router.PinPrimaryMiddleware',
 ]
 
 # URL اصلی
@@ -86,6 +91,127 @@ DATABASES = {
     }
 }
 
+# مدیریت اتصال‌ها (DB_POOL_MODE):
+# - persistent: هر thread اتصالش را تا DB_CONN_MAX_AGE ثانیه نگه می‌دارد (WSGI، با psycopg2 هم کار می‌کند)
+# - pool: pool داخلی جنگو روی psycopg 3 (psycopg[binary,pool] در requirements.txt)؛ برای ASGI و WSGI،
+#   حداکثر DB_POOL_MAX_SIZE اتصال برای هر پروسه‌ی worker
+# - none: اتصال جدید برای هر درخواست
+# مقایسه: python manage.py bench_db_connections
+DB_POOL_MODE = os.getenv('DB_POOL_MODE', 'persistent')
+DB_CONN_MAX_AGE = int(os.getenv('DB_CONN_MAX_AGE', '60'))
+DB_POOL_MIN_SIZE = int(os.getenv('DB_POOL_MIN_SIZE', '2'))
+DB_POOL_MAX_SIZE = int(os.getenv('DB_POOL_MAX_SIZE', '10'))
+# حداکثر انتظار برای گرفتن اتصال از pool (ثانیه)
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '10'))
+DB_CONNECT_TIMEOUT = int(os.getenv('DB_CONNECT_TIMEOUT', '5'))
+# statement_timeout در Postgres (میلی‌ثانیه)؛ 0 یعنی بدون محدودیت. روی هر اتصالی اعمال می‌شود، از جمله migrate و
+# دستورهای مدیریتی طولانی، پس فقط در env پروسه‌های وب تنظیم شود
+DB_STATEMENT_TIMEOUT = int(os.getenv('DB_STATEMENT_TIMEOUT', '0'))
+
+
+# کلیدهای OPTIONS که فقط یک backend می‌شناسد؛ بعد از عوض شدن ENGINE کلیدهای backend دیگر حذف می‌شوند
+BACKEND_OPTIONS = {
+    'django.db.backends.postgresql': ('pool', 'connect_timeout', 'options'),
+    'django.db.backends.sqlite3': ('transaction_mode', 'init_command'),
+}
+
+
+def configure_connections(database):
+    """
+    تنظیمات اتصال را بر اساس DB_POOL_MODE و ENGINE روی database اعمال می‌کند (بعد از تغییر ENGINE دوباره صدا بزنید).
+    OPTIONSی که اپراتور خودش گذاشته حفظ می‌شوند و مقادیر این تابع فقط پیش‌فرض‌اند.
+    """
+    options = database.setdefault('OPTIONS', {})
+    for engine, names in BACKEND_OPTIONS.items():
+        if engine != database['ENGINE']:
+            for name in names:
+                options.pop(name, None)
+    postgres = database['ENGINE'] == 'django.db.backends.postgresql'
+    sqlite = database['ENGINE'] == 'django.db.backends.sqlite3'
+    pool = DB_POOL_MODE == 'pool' and postgres
+
+    # pool اتصال ماندگار جنگو را نمی‌پذیرد
+    database['CONN_MAX_AGE'] = DB_CONN_MAX_AGE if DB_POOL_MODE == 'persistent' else 0
+    # اتصال ماندگار قبل از استفاده‌ی دوباره، و اتصال pool قبل از تحویل بررسی می‌شود
+    database['CONN_HEALTH_CHECKS'] = DB_POOL_MODE in ('persistent', 'pool')
+    if postgres:
+        options.setdefault('connect_timeout', DB_CONNECT_TIMEOUT)
+        libpq_options = options.get('options', '')
+        if DB_STATEMENT_TIMEOUT and 'statement_timeout' not in libpq_options:
+            options['options'] = f'{libpq_options} -c statement_timeout={DB_STATEMENT_TIMEOUT}'.strip()
+    if sqlite:
+        # BEGIN IMMEDIATE قفل نوشتن را اول تراکنش و با انتظار (timeout) می‌گیرد؛ در حالت deferred ارتقای قفل وسط
+        # تراکنش با نوشتن هم‌زمان دیگری بدون انتظار database is locked می‌دهد. WAL در فایل دیتابیس می‌ماند و یک بار
+        # بعد از migrate روشن می‌شود (users.apps.enable_sqlite_wal)، نه با init_command روی هر اتصال
+        options.setdefault('transaction_mode', 'IMMEDIATE')
+    if pool:
+        options.setdefault('pool', {
+            'min_size': DB_POOL_MIN_SIZE,
+            'max_size': DB_POOL_MAX_SIZE,
+            'timeout': DB_POOL_TIMEOUT,
+        })
+    return database
+
+
+configure_connections(DATABASES['default'])
+
+# read replicaها برای خواندن‌های امن (user_service.db_router):
+# REPLICA_HOSTS با کاما (host یا host:port) با همان DB_NAME/DB_USER/DB_PASSWORD،
+# و/یا REPLICA_NAMES با کاما برای نام دیتابیس جدا (مثلاً دو فایل SQLite در توسعه)؛ به ترتیب جفت می‌شوند
+REPLICA_HOSTS = [host for host in os.getenv('REPLICA_HOSTS', '').split(',') if host]
+REPLICA_NAMES = [name for name in os.getenv('REPLICA_NAMES', '').split(',') if name]
+# کاربر فقط‌خواندنی replica؛ خالی یعنی همان DB_USER/DB_PASSWORD
+REPLICA_USER = os.getenv('REPLICA_USER', '')
+REPLICA_PASSWORD = os.getenv('REPLICA_PASSWORD', '')
+# بعد از نوشتن یک کاربر، خواندن‌های او تا این چند ثانیه از primary انجام می‌شود (read-your-writes)
+REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', '5'))
+
+
+def configure_replicas(databases):
+    """aliasهای replica1، replica2، ... را از روی default می‌سازد (بعد از configure_connections صدا بزنید)."""
+    for alias in [alias for alias in databases if alias.startswith('replica')]:
+        del databases[alias]
+    aliases = []
+    for index in range(max(len(REPLICA_HOSTS), len(REPLICA_NAMES))):
+        replica = copy.deepcopy(databases['default'])
+        if index < len(REPLICA_HOSTS):
+            host, _, port = REPLICA_HOSTS[index].partition(':')
+            replica['HOST'] = host
+            if port:
+                replica['PORT'] = port
+        if index < len(REPLICA_NAMES):
+            replica['NAME'] = REPLICA_NAMES[index]
+        if REPLICA_USER:
+            replica['USER'] = REPLICA_USER
+            replica['PASSWORD'] = REPLICA_PASSWORD
+        # در تست‌ها replica همان دیتابیس تست default است
+        replica['TEST'] = {'MIRROR': 'default'}
+        alias = f'replica{index + 1}'
+        databases[alias] = replica
+        aliases.append(alias)
+    return aliases
+
+
+REPLICA_DATABASES = configure_replicas(DATABASES)
+DATABASE_ROUTERS = ['user_service.db_router.ReplicaRouter']
+
+# cache پیش‌فرض: سنجاق‌های replica، نسخه‌ی کش پروفایل، کش lookup و وضعیت توکن‌ها؛ با چند worker باید مشترک باشد.
+# REDIS_URL مثلاً redis://localhost:6379/0؛ خالی یعنی LocMemCache جدا در هر پروسه (فقط برای توسعه)
+REDIS_URL = os.getenv('REDIS_URL', '')
+if REDIS_URL:
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': REDIS_URL}}
+else:
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+# hasherهای پیش‌فرض جنگو؛ دو نسخه‌ی PBKDF2 زمان هش را در متریک‌ها ثبت می‌کنند (authentication.hashers)
+PASSWORD_HASHERS = [
+    'authentication.hashers.PBKDF2PasswordHasher',
+    'authentication.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+
 # اعتبارسنجی رمز عبور
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -121,30 +247,97 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# فایل‌های media با نام SHA-256 محتوا و بدون نسخه‌ی تکراری (user_service.storage)
+STORAGES = {
+    'default': {'BACKEND': 'user_service.storage.ContentAddressedStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+# ارسال فایل‌های media توسط وب‌سرور (user_service.media): '' (FileResponse)، 'nginx' (X-Accel-Redirect) یا 'sendfile' (X-Sendfile)
+MEDIA_ACCEL = os.getenv('MEDIA_ACCEL', '')
+# location داخلی nginx که به MEDIA_ROOT اشاره می‌کند
+MEDIA_ACCEL_PREFIX = os.getenv('MEDIA_ACCEL_PREFIX', '/protected-media/')
+# max-age فایل‌هایی که نامشان از محتوا نیست (آپلودهای قدیمی)؛ بقیه immutable و یک‌ساله‌اند
+MEDIA_CACHE_MAX_AGE = int(os.getenv('MEDIA_CACHE_MAX_AGE', '3600'))
+
+# پردازش آواتار در پس‌زمینه (users.avatars)
+AVATAR_RENDITION_SIZES = (64, 128, 300)
+AVATAR_WORKERS = int(os.getenv('AVATAR_WORKERS', '2'))
+# با False پردازش بعد از commit و روی همان thread درخواست انجام می‌شود (مناسب تست)
+AVATAR_ASYNC = os.getenv('AVATAR_ASYNC', 'True') == 'True'
+
+# تعداد ردیف‌هایی که خروجی stream کاربران (users.export) در هر رفت‌وبرگشت از دیتابیس می‌خواند
+USER_EXPORT_CHUNK_SIZE = int(os.getenv('USER_EXPORT_CHUNK_SIZE', '2000'))
+
+# جستجوی دسته‌ای کاربران (users.lookup): حداکثر شناسه/ایمیل در هر درخواست و مدت کش هر کاربر (ثانیه)
+USER_LOOKUP_MAX_KEYS = int(os.getenv('USER_LOOKUP_MAX_KEYS', '100'))
+USER_LOOKUP_CACHE_TTL = int(os.getenv('USER_LOOKUP_CACHE_TTL', '300'))
+
+# ثبت‌نام دسته‌ای برای سرویس‌های داخلی (BulkRegisterView): حداکثر کاربر در هر درخواست
+REGISTER_BULK_MAX_USERS = int(os.getenv('REGISTER_BULK_MAX_USERS', '100'))
+
+# مدت کش پروفایل سریال‌شده در ProfileView (ثانیه)؛ با هر تغییر کاربر نسخه‌ی کش عوض می‌شود. 0 یعنی بدون کش
+PROFILE_CACHE_TTL = int(os.getenv('PROFILE_CACHE_TTL', '300'))
+
 # مقدار پیش‌فرض فیلدهای auto
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # تنظیمات Django REST Framework
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.SessionAuthentication',
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'authentication.authentication.SessionAuthentication',
+        'authentication.authentication.ClaimsJWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
+    # شمارنده‌های sliding window مشترک بین workerها (authentication.throttling)
     'DEFAULT_THROTTLE_CLASSES': [
-        'rest_framework.throttling.AnonRateThrottle',
-        'rest_framework.throttling.UserRateThrottle',
+        'authentication.throttling.AnonRateThrottle',
+        'authentication.throttling.UserRateThrottle',
+        'authentication.throttling.ScopedRateThrottle',
     ],
     'DEFAULT_THROTTLE_RATES': {
         'anon': '100/day',
         'user': '1000/day',
+        # محدودیت جدا برای هر IP روی ویوهایی که throttle_scope دارند
+        'login': '10/min',
+        'register': '20/hour',
+        'introspect': '6000/min',
     },
 }
 
+# پروفایل فقط API برای podهای autoscale (API_ONLY=True): بدون admin، session، messages و staticfiles
+# و middlewareهای آن‌ها، و فقط احراز هویت JWT. مقایسه‌ی زمان راه‌اندازی: python manage.py bench_startup
+API_ONLY = os.getenv('API_ONLY', 'False') == 'True'
+API_ONLY_EXCLUDED_APPS = (
+    'django.contrib.admin',
+    'django.contrib.sessions',
+    'django.contrib.messages',
+    'django.contrib.staticfiles',
+)
+API_ONLY_EXCLUDED_MIDDLEWARE = (
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+)
+if API_ONLY:
+    INSTALLED_APPS = [app for app in INSTALLED_APPS if app not in API_ONLY_EXCLUDED_APPS]
+    MIDDLEWARE = [name for name in MIDDLEWARE if name not in API_ONLY_EXCLUDED_MIDDLEWARE]
+    REST_FRAMEWORK['DEFAULT_AUTHENTICATION_CLASSES'] = ['authentication.authentication.ClaimsJWTAuthentication']
+
+# پشته‌ی سبک برای ترافیک JWT در پروفایل کامل (user_service.stack): مسیرهای API_LEAN_PREFIXES از API_MIDDLEWARE
+# عبور می‌کنند و بقیه (مثل /admin/) از MIDDLEWARE کامل. مقایسه: python manage.py bench_middleware_stack
+API_LEAN_STACK = os.getenv('API_LEAN_STACK', 'False') == 'True'
+API_LEAN_PREFIXES = os.getenv('API_LEAN_PREFIXES', '/accounts/auth/,/accounts/users/').split(',')
+API_MIDDLEWARE = [name for name in MIDDLEWARE if name not in API_ONLY_EXCLUDED_MIDDLEWARE]
+
+# فایل SQLite (WAL) شمارنده‌های throttle؛ همه‌ی workerهای یک میزبان باید به همین فایل اشاره کنند
+THROTTLE_DB_PATH = os.getenv('THROTTLE_DB_PATH', os.path.join(tempfile.gettempdir(), 'user_service_throttle.sqlite3'))
+
 # تنظیمات Simple JWT
 """SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=15),
@@ -173,7 +366,14 @@ REST_FRAMEWORK = {
 
 #BASE_DIR = Path(__file__).resolve().parent.parent
 
-JWT_KEYS_DIR = BASE_DIR / "user_service" / "jwt_keys"
+JWT_KEYS_DIR = Path(os.getenv('JWT_KEYS_DIR', BASE_DIR / "user_service" / "jwt_keys"))
+
+# کلید فعال برای امضا (نام فایل بدون _private.pem)؛ فایل active_kid داخل JWT_KEYS_DIR بر این مقدار مقدم است
+JWT_ACTIVE_KID = os.getenv('JWT_ACTIVE_KID')
+# هر چند ثانیه پوشه‌ی کلیدها برای چرخش کلید بررسی شود
+JWT_KEYS_RELOAD_INTERVAL = int(os.getenv('JWT_KEYS_RELOAD_INTERVAL', '30'))
+# مدت کش /.well-known/jwks.json؛ کلید جدید باید حداقل این مدت قبل از فعال شدن منتشر شده باشد
+JWKS_CACHE_MAX_AGE = int(os.getenv('JWKS_CACHE_MAX_AGE', '3600'))
 
 # مسیر کلیدهای production
 PROD_PRIVATE_KEY = JWT_KEYS_DIR / "prod_private.pem"
@@ -184,21 +384,18 @@ DEV_PRIVATE_KEY = JWT_KEYS_DIR / "dev_private.pem"
 DEV_PUBLIC_KEY = JWT_KEYS_DIR / "dev_public.pem"
 
 
-def read_key(path: Path) -> str | None:
-    if path.exists():
-        return path.read_text()
-    return None
-
+# امضا و تأیید توکن‌ها از طریق authentication.keys و با همه‌ی کلیدهای JWT_KEYS_DIR انجام می‌شود
+# (پارس کلیدها در اولین استفاده). simplejwt کلید جداگانه لازم ندارد، پس PEM هنگام بارگذاری settings
+# خوانده و پارس نمی‌شود.
+SIGNING_KEY = None
+VERIFYING_KEY = None
 
-# انتخاب کلیدها
-SIGNING_KEY = read_key(PROD_PRIVATE_KEY) or read_key(DEV_PRIVATE_KEY)
-VERIFYING_KEY = read_key(PROD_PUBLIC_KEY) or read_key(DEV_PUBLIC_KEY)
-
-if not SIGNING_KEY or not VERIFYING_KEY:
+if not any(JWT_KEYS_DIR.glob('*_private.pem')):
     raise RuntimeError("JWT keys are missing. No valid key pair found.")
 
 
 SIMPLE_JWT = {
+    # الگوریتم کلیدهای RSA؛ کلیدهای EC (ES256) و Ed25519 (EdDSA) الگوریتم خودشان را دارند (authentication.keys)
     "ALGORITHM": "RS256",
     "SIGNING_KEY": SIGNING_KEY,
     "VERIFYING_KEY": VERIFYING_KEY,
@@ -209,8 +406,53 @@ SIMPLE_JWT = {
 
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=15),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=7),
+
+    # بررسی بلک‌لیست از ایندکس درون‌حافظه‌ای (authentication.blacklist)
+    "TOKEN_REFRESH_SERIALIZER": "authentication.serializers.CustomTokenRefreshSerializer",
 }
 
+# همگام‌سازی افزایشی ایندکس بلک‌لیست و بازسازی کامل آن (ثانیه)
+JWT_BLACKLIST_SYNC_INTERVAL = int(os.getenv('JWT_BLACKLIST_SYNC_INTERVAL', '5'))
+JWT_BLACKLIST_REBUILD_INTERVAL = int(os.getenv('JWT_BLACKLIST_REBUILD_INTERVAL', '3600'))
+
+# پاک کردن توکن‌های منقضی (authentication.pruning، python manage.py prune_tokens): ردیف در هر دسته،
+# مکث بین دسته‌ها (ثانیه) تا I/O و lag رپلیکاها محدود بماند، مدتی که بعد از انقضا نگه داشته می‌شوند (ثانیه)
+# و فاصله‌ی اجراها با --loop (ثانیه)
+TOKEN_PRUNE_BATCH_SIZE = int(os.getenv('TOKEN_PRUNE_BATCH_SIZE', '500'))
+TOKEN_PRUNE_PAUSE = float(os.getenv('TOKEN_PRUNE_PAUSE', '0.1'))
+TOKEN_PRUNE_GRACE = int(os.getenv('TOKEN_PRUNE_GRACE', '3600'))
+TOKEN_PRUNE_INTERVAL = int(os.getenv('TOKEN_PRUNE_INTERVAL', '3600'))
+
+# ویوهای async برای login/register/change-password (فقط زیر ASGI معنی دارد)
+AUTH_ASYNC_VIEWS = os.getenv('AUTH_ASYNC_VIEWS', 'False') == 'True'
+# ProcessPool هش رمز عبور: تعداد پروسه‌ها و حداکثر کارهای منتظر قبل از پاسخ 503
+PASSWORD_HASHING_WORKERS = int(os.getenv('PASSWORD_HASHING_WORKERS', os.cpu_count() or 1))
+PASSWORD_HASHING_QUEUE_DEPTH = int(os.getenv('PASSWORD_HASHING_QUEUE_DEPTH', '64'))
+
+# مدت کش وضعیت کاربر برای احراز هویت مبتنی بر claim (ثانیه)
+JWT_CLAIMS_CACHE_TTL = int(os.getenv('JWT_CLAIMS_CACHE_TTL', '60'))
+
+# هر چند ثانیه last_login/last_seen جمع‌شده در حافظه نوشته شود (authentication.activity)؛ 0 یعنی بلافاصله
+ACTIVITY_FLUSH_INTERVAL = float(os.getenv('ACTIVITY_FLUSH_INTERVAL', '10'))
+
+# بررسی دسته‌ای توکن‌ها (authentication.introspection): حداکثر توکن در هر درخواست و اندازه‌ی LRU
+TOKEN_INTROSPECTION_MAX_TOKENS = int(os.getenv('TOKEN_INTROSPECTION_MAX_TOKENS', '100'))
+TOKEN_INTROSPECTION_CACHE_SIZE = int(os.getenv('TOKEN_INTROSPECTION_CACHE_SIZE', '10000'))
+
+# متریک‌های درخواست (user_service.metrics) در قالب Prometheus روی /metrics
+# سهم درخواست‌هایی که تفکیک زمان (کوئری‌ها، هش رمز، امضا و تأیید JWT) برایشان ثبت می‌شود؛ شمارش و زمان کل همیشه ثبت می‌شود
+METRICS_SAMPLE_RATE = float(os.getenv('METRICS_SAMPLE_RATE', '1.0'))
+# هدر Server-Timing روی پاسخ درخواست‌های نمونه‌برداری‌شده
+METRICS_SERVER_TIMING = os.getenv('METRICS_SERVER_TIMING', 'False') == 'True'
+# دسترسی به /metrics: با METRICS_TOKEN هدر "Authorization: Bearer <token>"؛ بدون آن فقط در DEBUG و از این IPها
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+METRICS_ALLOWED_IPS = os.getenv('METRICS_ALLOWED_IPS', '127.0.0.1,::1').split(',')
+# پوشه‌ی مشترک workerها؛ هر worker هر METRICS_FLUSH_INTERVAL ثانیه متریک‌هایش را آنجا می‌نویسد و /metrics جمع همه را برمی‌گرداند
+METRICS_DIR = os.getenv('METRICS_DIR', '')
+METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', '15'))
+# درخواست‌های کندتر از این (میلی‌ثانیه) با تفکیک زمان در لاگ user_service.metrics ثبت می‌شوند؛ 0 یعنی خاموش
+METRICS_SLOW_REQUEST_MS = int(os.getenv('METRICS_SLOW_REQUEST_MS', '0'))
+
 # امنیت اضافی (در prod مهم‌تره)
 SECURE_BROWSER_XSS_FILTER = True
 SECURE_CONTENT_TYPE_NOSNIFF = True
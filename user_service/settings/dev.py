@@ -3,4 +3,6 @@ from .base import *
 DEBUG = True
 ALLOWED_HOSTS = ['localhost', '127.0.0.1']
 DATABASES['default']['ENGINE'] = 'django.db.backends.sqlite3'
-DATABASES['default']['NAME'] = BASE_DIR / 'db.sqlite3'
+DATABASES['default']['NAME'] = os.getenv('DB_NAME', BASE_DIR / 'db.sqlite3')
+configure_connections(DATABASES['default'])
+REPLICA_DATABASES = configure_replicas(DATABASES)
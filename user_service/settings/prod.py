@@ -1,6 +1,16 @@
+from django.core.exceptions import ImproperlyConfigured
+
 from .base import *
 
 DEBUG = False
 ALLOWED_HOSTS = os.getenv('ALLOWED_HOSTS', '').split(',')
 DATABASES['default']['ENGINE'] = 'django.db.backends.postgresql'
+configure_connections(DATABASES['default'])
+REPLICA_DATABASES = configure_replicas(DATABASES)
+# سنجاقی که فقط در cache همان worker است بقیه‌ی workerها را به replica می‌فرستد و read-your-writes می‌شکند
+if REPLICA_DATABASES and not REDIS_URL:
+    raise ImproperlyConfigured("Read replicas need a shared cache for primary pins; set REDIS_URL.")
+# نسخه‌ی پروفایل در LocMem هر worker جداست و ویرایش در یک worker کش بقیه را باطل نمی‌کند (users.profile_cache)
+if not REDIS_URL:
+    PROFILE_CACHE_TTL = 0
 # بقیه از env لود می‌شن
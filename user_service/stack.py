@@ -0,0 +1,138 @@
+"""
+پشته‌ی middleware سبک برای ترافیک JWT (API_LEAN_STACK=True).
+
+درخواست‌هایی که مسیرشان با API_LEAN_PREFIXES شروع می‌شود از handlerی با API_MIDDLEWARE عبور می‌کنند
+(بدون session، CSRF، AuthenticationMiddleware و messages)؛ بقیه، از جمله /admin/، همان MIDDLEWARE کامل را دارند.
+handler سبک روی درخواست request.jwt_only می‌گذارد تا DRF فقط با JWT احراز هویت کند
+(authentication.authentication.SessionAuthentication). مقایسه‌ی هزینه‌ی هر درخواست: python manage.py bench_middleware_stack
+"""
+import logging
+
+import django
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.exception import convert_exception_to_response
+from django.core.handlers.wsgi import WSGIHandler
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger('django.request')
+
+
+class LeanStackMixin:
+    """handler جنگو با API_MIDDLEWARE به جای MIDDLEWARE"""
+
+    def load_middleware(self, is_async=False):
+        # همان BaseHandler.load_middleware، ولی زنجیره از settings.API_MIDDLEWARE ساخته می‌شود؛
+        # settings.MIDDLEWARE دست نمی‌خورد، چون handler کامل و سبک در یک پروسه کنار هم ساخته می‌شوند
+        self._view_middleware = []
+        self._template_response_middleware = []
+        self._exception_middleware = []
+
+        get_response = self._get_response_async if is_async else self._get_response
+        handler = convert_exception_to_response(get_response)
+        handler_is_async = is_async
+        for middleware_path in reversed(settings.API_MIDDLEWARE):
+            middleware = import_string(middleware_path)
+            middleware_can_sync = getattr(middleware, 'sync_capable', True)
+            middleware_can_async = getattr(middleware, 'async_capable', False)
+            if not middleware_can_sync and not middleware_can_async:
+                raise RuntimeError(
+                    f"Middleware {middleware_path} must have at least one of sync_capable/async_capable set to True."
+                )
+            elif not handler_is_async and middleware_can_sync:
+                middleware_is_async = False
+            else:
+                middleware_is_async = middleware_can_async
+            try:
+                adapted_handler = self.adapt_method_mode(
+                    middleware_is_async, handler, handler_is_async,
+                    debug=settings.DEBUG, name=f'middleware {middleware_path}',
+                )
+                mw_instance = middleware(adapted_handler)
+            except MiddlewareNotUsed as exc:
+                if settings.DEBUG:
+                    logger.debug("MiddlewareNotUsed(%r): %s", middleware_path, exc)
+                continue
+            handler = adapted_handler
+
+            if mw_instance is None:
+                raise ImproperlyConfigured(f"Middleware factory {middleware_path} returned None.")
+            if hasattr(mw_instance, 'process_view'):
+                self._view_middleware.insert(0, self.adapt_method_mode(is_async, mw_instance.process_view))
+            if hasattr(mw_instance, 'process_template_response'):
+                self._template_response_middleware.append(
+                    self.adapt_method_mode(is_async, mw_instance.process_template_response),
+                )
+            if hasattr(mw_instance, 'process_exception'):
+                self._exception_middleware.append(self.adapt_method_mode(False, mw_instance.process_exception))
+
+            handler = convert_exception_to_response(mw_instance)
+            handler_is_async = middleware_is_async
+
+        handler = self.adapt_method_mode(is_async, handler, handler_is_async)
+        self._middleware_chain = handler
+
+    def get_response(self, request):
+        request.jwt_only = True
+        return super().get_response(request)
+
+    async def get_response_async(self, request):
+        request.jwt_only = True
+        return await super().get_response_async(request)
+
+
+class LeanWSGIHandler(LeanStackMixin, WSGIHandler):
+    pass
+
+
+class LeanASGIHandler(LeanStackMixin, ASGIHandler):
+    pass
+
+
+class WSGIStackDispatcher:
+    def __init__(self, full, lean, prefixes):
+        self.full = full
+        self.lean = lean
+        self.prefixes = tuple(prefixes)
+
+    def __call__(self, environ, start_response):
+        handler = self.lean if environ.get('PATH_INFO', '').startswith(self.prefixes) else self.full
+        return handler(environ, start_response)
+
+
+class ASGIStackDispatcher:
+    def __init__(self, full, lean, prefixes):
+        self.full = full
+        self.lean = lean
+        self.prefixes = tuple(prefixes)
+
+    async def __call__(self, scope, receive, send):
+        handler = self.full
+        if scope['type'] == 'http':
+            path = scope['path']
+            root_path = scope.get('root_path', '')
+            if root_path and path.startswith(root_path):
+                path = path[len(root_path):]
+            if path.startswith(self.prefixes):
+                handler = self.lean
+        return await handler(scope, receive, send)
+
+
+def _lean_stack_enabled():
+    # در پروفایل API_ONLY خود MIDDLEWARE از قبل سبک است
+    return settings.API_LEAN_STACK and not settings.API_ONLY
+
+
+def get_wsgi_application():
+    django.setup(set_prefix=False)
+    if not _lean_stack_enabled():
+        return WSGIHandler()
+    return WSGIStackDispatcher(WSGIHandler(), LeanWSGIHandler(), settings.API_LEAN_PREFIXES)
+
+
+def get_asgi_application():
+    django.setup(set_prefix=False)
+    if not _lean_stack_enabled():
+        return ASGIHandler()
+    return ASGIStackDispatcher(ASGIHandler(), LeanASGIHandler(), settings.API_LEAN_PREFIXES)
@@ -0,0 +1,132 @@
+"""
+storage پیش‌فرض media (آواتار و نسخه‌های WebP آن) با نام‌گذاری بر اساس محتوا.
+
+فایل هنگام ذخیره chunk‌به‌chunk در یک فایل موقت کنار مقصد نوشته می‌شود و هم‌زمان SHA-256 آن حساب می‌شود؛ نام نهایی
+<پوشه>/<دو حرف اول hash>/<hash><پسوند> است. اگر همین محتوا قبلاً ذخیره شده باشد فایل موقت حذف و همان نام برگردانده
+می‌شود. محتوای یک نام هرگز عوض نمی‌شود، پس hash همان ETag است و پاسخ‌ها Cache-Control: immutable دارند
+(user_service.media). یک فایل ممکن است بین چند کاربر مشترک باشد، پس delete() این نام‌ها را پاک نمی‌کند و
+فایل‌های بی‌ارجاع را python manage.py prune_avatar_files حذف می‌کند.
+"""
+import hashlib
+import os
+import posixpath
+import re
+import uuid
+
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+CHUNK_SIZE = 64 * 1024
+CONTENT_NAME = re.compile(r'(?:^|/)(?P<prefix>[0-9a-f]{2})/(?P<digest>[0-9a-f]{64})(?:\.[A-Za-z0-9]+)?$')
+
+
+def content_digest(name):
+    """SHA-256 محتوای یک نام آدرس‌دهی‌شده با محتوا، یا None برای نام‌های دیگر"""
+    match = CONTENT_NAME.search(name or '')
+    if match is None or not match['digest'].startswith(match['prefix']):
+        return None
+    return match['digest']
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+
+    def get_available_name(self, name, max_length=None):
+        # نام واقعی در _save از روی محتوا ساخته می‌شود و تکراری بودنش یعنی همان فایل
+        return name
+
+    def _save(self, name, content):
+        directory = posixpath.dirname(name)
+        extension = posixpath.splitext(name)[1].lower()
+        full_directory = self.path(directory) if directory else self.location
+        self._makedirs(full_directory)
+
+        digest = hashlib.sha256()
+        if hasattr(content, 'temporary_file_path'):
+            # آپلود بزرگی که جنگو روی دیسک نگه داشته: فقط برای hash خوانده و بعد بدون کپی دوباره منتقل می‌شود
+            temporary = content.temporary_file_path()
+            with open(temporary, 'rb') as file:
+                for chunk in iter(lambda: file.read(CHUNK_SIZE), b''):
+                    digest.update(chunk)
+            uploaded = True
+        else:
+            temporary = os.path.join(full_directory, f'.upload-{uuid.uuid4().hex}')
+            # مثل FileSystemStorage با 0o666 و umask، تا وب‌سرور (X-Accel-Redirect) بتواند فایل را بخواند
+            fd = os.open(temporary, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_BINARY', 0), 0o666)
+            try:
+                with os.fdopen(fd, 'wb') as file:
+                    for chunk in content.chunks(CHUNK_SIZE):
+                        if isinstance(chunk, str):
+                            chunk = chunk.encode()
+                        digest.update(chunk)
+                        file.write(chunk)
+            except BaseException:
+                os.remove(temporary)
+                raise
+            uploaded = False
+
+        hexdigest = digest.hexdigest()
+        final_name = posixpath.join(directory, hexdigest[:2], hexdigest + extension)
+        full_path = self.path(final_name)
+        if os.path.exists(full_path):
+            try:
+                # mtime تازه تا prune_avatar_files فایلی را که ردیفش هنوز commit نشده با --min-age نگه دارد
+                os.utime(full_path)
+            except FileNotFoundError:
+                # همین حالا purge شد؛ مثل فایل جدید نوشته می‌شود
+                pass
+            else:
+                # فایل تکراری؛ فایل موقت آپلود را خود جنگو بعد از درخواست پاک می‌کند
+                if not uploaded:
+                    os.remove(temporary)
+                return final_name
+
+        self._makedirs(os.path.dirname(full_path))
+        if uploaded:
+            file_move_safe(temporary, full_path)
+        else:
+            # جایگزینی اتمیک؛ دو آپلود هم‌زمان با یک محتوا به همان فایل می‌رسند
+            os.replace(temporary, full_path)
+        if self.file_permissions_mode is not None:
+            os.chmod(full_path, self.file_permissions_mode)
+        return final_name
+
+    def _makedirs(self, directory):
+        if self.directory_permissions_mode is not None:
+            # مثل FileSystemStorage: umask نباید روی حالت پوشه‌ها اثر بگذارد
+            old_umask = os.umask(0o777 & ~self.directory_permissions_mode)
+            try:
+                os.makedirs(directory, self.directory_permissions_mode, exist_ok=True)
+            finally:
+                os.umask(old_umask)
+        else:
+            os.makedirs(directory, exist_ok=True)
+
+    def delete(self, name):
+        # ممکن است کاربر دیگری به همین محتوا ارجاع داشته باشد
+        if content_digest(name):
+            return
+        super().delete(name)
+
+    def purge(self, name, older_than=None):
+        """
+        حذف واقعی فایل، فقط برای prune_avatar_files که بی‌ارجاع بودن را بررسی کرده است.
+        با older_than فایلی که بعد از آن زمان دوباره ذخیره شده (os.utime در _save) حذف نمی‌شود؛ True یعنی حذف شد.
+        """
+        if older_than is None:
+            super().delete(name)
+            return True
+        path = self.path(name)
+        trash = os.path.join(os.path.dirname(path), f'.purge-{uuid.uuid4().hex}')
+        try:
+            # از این لحظه _save فایل را پیدا نمی‌کند و آن را از نو می‌نویسد
+            os.rename(path, trash)
+        except FileNotFoundError:
+            return False
+        if os.stat(trash).st_mtime > older_than:
+            # بین بررسی و rename دوباره ذخیره شد؛ محتوا با هر نسخه‌ی تازه‌نوشته‌شده یکی است
+            os.replace(trash, path)
+            return False
+        os.remove(trash)
+        return True
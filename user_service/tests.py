@@ -0,0 +1,204 @@
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.conf import LazySettings, settings
+from django.contrib.auth import get_user_model
+from django.core.handlers.wsgi import WSGIHandler
+from django.test import RequestFactory, SimpleTestCase, TestCase
+from django.urls import reverse
+
+from authentication.serializers import CustomTokenObtainPairSerializer
+from authentication.tests import APITestMixin
+
+from .settings.base import configure_connections
+from .stack import ASGIStackDispatcher, LeanWSGIHandler, WSGIStackDispatcher
+
+User = get_user_model()
+
+# پروفایل API_ONLY هنگام بارگذاری settings اعمال می‌شود، پس در یک پروسه‌ی تازه بررسی می‌شود
+API_ONLY_CHILD = r'''
+import json, sys
+import django
+from django.conf import settings
+django.setup()
+from django.test import Client
+from django.urls import get_resolver
+
+client = Client(HTTP_HOST='localhost')
+profile = client.get('/accounts/auth/profile/')
+print(json.dumps({
+    'apps': settings.INSTALLED_APPS,
+    'middleware': settings.MIDDLEWARE,
+    'authentication': settings.REST_FRAMEWORK['DEFAULT_AUTHENTICATION_CLASSES'],
+    'routes': [str(pattern.pattern) for pattern in get_resolver().url_patterns],
+    'admin_modules': [name for name in ('users.admin', 'authentication.admin') if name in sys.modules],
+    'admin_status': client.get('/admin/').status_code,
+    'jwks_status': client.get('/.well-known/jwks.json').status_code,
+    'profile_status': profile.status_code,
+    'profile_www_authenticate': profile.headers.get('WWW-Authenticate'),
+}))
+'''
+
+
+class ApiOnlyProfileTests(SimpleTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        with tempfile.TemporaryDirectory() as directory:
+            env = {
+                **os.environ,
+                'API_ONLY': 'True',
+                'DJANGO_SETTINGS_MODULE': settings.SETTINGS_MODULE,
+                'THROTTLE_DB_PATH': os.path.join(directory, 'throttle.sqlite3'),
+            }
+            completed = subprocess.run(
+                [sys.executable, '-c', API_ONLY_CHILD], cwd=settings.BASE_DIR, env=env,
+                capture_output=True, text=True, timeout=120,
+            )
+        if completed.returncode:
+            raise AssertionError(completed.stderr)
+        cls.profile = json.loads(completed.stdout.strip().splitlines()[-1])
+
+    def test_admin_session_and_messages_are_not_installed(self):
+        for app in settings.API_ONLY_EXCLUDED_APPS:
+            self.assertNotIn(app, self.profile['apps'])
+        for name in settings.API_ONLY_EXCLUDED_MIDDLEWARE:
+            self.assertNotIn(name, self.profile['middleware'])
+        self.assertIn('authentication', self.profile['apps'])
+
+    def test_admin_urls_are_not_loaded(self):
+        self.assertNotIn('admin/', self.profile['routes'])
+        self.assertEqual(self.profile['admin_modules'], [])
+        self.assertEqual(self.profile['admin_status'], 404)
+        self.assertEqual(self.profile['jwks_status'], 200)
+
+    def test_only_jwt_authentication(self):
+        self.assertEqual(self.profile['authentication'], ['authentication.authentication.ClaimsJWTAuthentication'])
+        self.assertEqual(self.profile['profile_status'], 401)
+        self.assertTrue(self.profile['profile_www_authenticate'].startswith('Bearer'))
+
+
+def wsgi_app(name):
+    def application(environ, start_response):
+        start_response('200 OK', [])
+        return [name.encode()]
+    return application
+
+
+def asgi_app(name):
+    async def application(scope, receive, send):
+        return name
+    return application
+
+
+class StackDispatcherTests(SimpleTestCase):
+    prefixes = ['/accounts/auth/', '/accounts/users/']
+
+    def test_wsgi_routes_by_path_prefix(self):
+        dispatcher = WSGIStackDispatcher(wsgi_app('full'), wsgi_app('lean'), self.prefixes)
+        for path, expected in (
+            ('/accounts/auth/login/', b'lean'),
+            ('/accounts/users/', b'lean'),
+            ('/accounts/users', b'full'),
+            ('/admin/accounts/auth/', b'full'),
+            ('/metrics', b'full'),
+        ):
+            self.assertEqual(dispatcher({'PATH_INFO': path}, lambda *args: None), [expected], path)
+        self.assertEqual(dispatcher({}, lambda *args: None), [b'full'])
+
+    def test_asgi_routes_by_path_without_root_path(self):
+        dispatcher = ASGIStackDispatcher(asgi_app('full'), asgi_app('lean'), self.prefixes)
+        for scope, expected in (
+            ({'type': 'http', 'path': '/accounts/auth/login/'}, 'lean'),
+            ({'type': 'http', 'path': '/api/accounts/users/', 'root_path': '/api'}, 'lean'),
+            ({'type': 'http', 'path': '/api/admin/', 'root_path': '/api'}, 'full'),
+            ({'type': 'http', 'path': '/metrics'}, 'full'),
+            ({'type': 'lifespan'}, 'full'),
+        ):
+            self.assertEqual(async_to_sync(dispatcher)(scope, None, None), expected, scope)
+
+
+class LeanStackTests(APITestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        # ساخت handler نباید هیچ تنظیمی را عوض کند، حتی موقت
+        with mock.patch.object(LazySettings, '__setattr__', side_effect=AssertionError("settings mutated")):
+            self.lean = LeanWSGIHandler()
+        self.full = WSGIHandler()
+        user = User.objects.create(email='alice@example.com', username='alice')
+        self.access = str(CustomTokenObtainPairSerializer.get_token(user).access_token)
+
+    def get(self, handler, **headers):
+        request = RequestFactory(headers=headers).get(reverse('auth:profile'), HTTP_HOST='localhost')
+        return handler.get_response(request)
+
+    def test_lean_chain_is_built_from_api_middleware(self):
+        self.assertIsNot(settings.MIDDLEWARE, settings.API_MIDDLEWARE)
+        response = self.get(self.lean, Authorization=f'Bearer {self.access}')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('X-Frame-Options', response.headers)
+        self.assertIn('X-Frame-Options', self.get(self.full, Authorization=f'Bearer {self.access}').headers)
+
+    def test_lean_paths_authenticate_with_jwt_only(self):
+        response = self.get(self.lean)
+        self.assertEqual(response.status_code, 401)
+        self.assertTrue(response.headers['WWW-Authenticate'].startswith('Bearer'))
+
+        response = self.get(self.lean, Authorization='Bearer not-a-token')
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(json.loads(response.content)['code'], 'token_not_valid')
+
+    def test_full_stack_keeps_session_authentication(self):
+        self.assertEqual(self.get(self.full).status_code, 403)
+
+
+class ConfigureConnectionsTests(SimpleTestCase):
+
+    def test_operator_options_are_kept(self):
+        database = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'OPTIONS': {'init_command': 'PRAGMA synchronous=NORMAL', 'transaction_mode': 'EXCLUSIVE'},
+        }
+        configure_connections(database)
+        self.assertEqual(
+            database['OPTIONS'], {'init_command': 'PRAGMA synchronous=NORMAL', 'transaction_mode': 'EXCLUSIVE'},
+        )
+        self.assertEqual(configure_connections({'ENGINE': 'django.db.backends.sqlite3'})['OPTIONS'], {
+            'transaction_mode': 'IMMEDIATE',
+        })
+
+    @mock.patch('user_service.settings.base.DB_STATEMENT_TIMEOUT', 5000)
+    def test_engine_change_drops_options_of_the_other_backend(self):
+        database = configure_connections({'ENGINE': 'django.db.backends.sqlite3'})
+        database['ENGINE'] = 'django.db.backends.postgresql'
+        database['OPTIONS']['options'] = '-c search_path=users'
+        configure_connections(database)
+        self.assertEqual(database['OPTIONS'], {
+            'connect_timeout': settings.DB_CONNECT_TIMEOUT,
+            'options': '-c search_path=users -c statement_timeout=5000',
+        })
+        # صدا زدن دوباره چیزی را تکرار نمی‌کند
+        self.assertEqual(configure_connections(database)['OPTIONS']['options'], '-c search_path=users -c statement_timeout=5000')
+
+    def test_migrate_switches_sqlite_file_to_wal(self):
+        with tempfile.TemporaryDirectory() as directory:
+            name = os.path.join(directory, 'db.sqlite3')
+            env = {**os.environ, 'DB_NAME': name, 'DJANGO_SETTINGS_MODULE': 'user_service.settings.dev'}
+            completed = subprocess.run(
+                [sys.executable, 'manage.py', 'migrate', '--verbosity=0'], cwd=settings.BASE_DIR, env=env,
+                capture_output=True, text=True, timeout=300,
+            )
+            self.assertEqual(completed.returncode, 0, completed.stderr)
+            connection = sqlite3.connect(name)
+            try:
+                self.assertEqual(connection.execute('PRAGMA journal_mode').fetchone()[0], 'wal')
+            finally:
+                connection.close()
@@ -1,13 +1,21 @@
-from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
-from django.conf.urls.static import static
+from authentication.views import JWKSView
+from .media import media_view
+from .metrics import metrics_view
 
 urlpatterns = [
-    path('admin/', admin.site.urls),
+    path('.well-known/jwks.json', JWKSView.as_view(), name='jwks'),
+    path('metrics', metrics_view, name='metrics'),
     path('accounts/auth/', include('authentication.urls')),
     path('accounts/users/', include('users.urls')),
 ]
 
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+# در پروفایل API_ONLY ادمین نصب نیست و admin.py اپ‌ها هم import نمی‌شوند
+if 'django.contrib.admin' in settings.INSTALLED_APPS:
+    from django.contrib import admin
+    urlpatterns.insert(0, path('admin/', admin.site.urls))
+
+# در production همین مسیر فقط هدر X-Accel-Redirect/X-Sendfile برمی‌گرداند (user_service.media)
+if settings.MEDIA_URL.startswith('/'):
+    urlpatterns.append(path(f"{settings.MEDIA_URL.lstrip('/')}<path:name>", media_view, name='media'))
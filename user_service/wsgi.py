@@ -9,7 +9,7 @@ https://docs.djangoproject.com/en/6.0/howto/deployment/wsgi/
 
 import os
 
-from django.core.wsgi import get_wsgi_application
+from user_service.stack import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'user_service.settings.dev')
 
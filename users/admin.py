@@ -1,12 +1,15 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
+from authentication.activity import activity_recorder
+from user_service.db_router import read_replica
 from .models import CustomUser
+from .search import search_users
 
 
 @admin.register(CustomUser)
 class CustomUserAdmin(UserAdmin):
     # فیلدهای فقط خواندنی (non-editable)
-    readonly_fields = ('date_joined', 'last_login')
+    readonly_fields = ('date_joined', 'last_login', 'last_seen')
 
     # fieldsets اصلی UserAdmin را گسترش می‌دهیم
     fieldsets = UserAdmin.fieldsets + (
@@ -20,7 +23,7 @@ class CustomUserAdmin(UserAdmin):
     fieldsets = (
         *UserAdmin.fieldsets,  # همه بخش‌های پیش‌فرض
         ('Additional Info', {
-            'fields': ('phone_number', 'address', 'avatar')
+            'fields': ('phone_number', 'address', 'avatar', 'last_seen')
         }),
     )
 
@@ -37,3 +40,26 @@ class CustomUserAdmin(UserAdmin):
     list_display = ['email', 'username', 'first_name', 'last_name', 'is_staff', 'is_active', 'date_joined']
     search_fields = ['email', 'username', 'first_name', 'last_name']
     ordering = ['-date_joined']
+
+    def changelist_view(self, request, extra_context=None):
+        if request.method != 'GET':
+            return super().changelist_view(request, extra_context)
+        # لیست از replica؛ رندر هم داخل همین بلوک تا queryset صفحه همان‌جا اجرا شود
+        with read_replica(request.user):
+            response = super().changelist_view(request, extra_context)
+            if hasattr(response, 'render'):
+                response.render()
+        return response
+
+    def get_object(self, request, object_id, from_field=None):
+        # زمان‌هایی که این worker هنوز در دیتابیس ننوشته (authentication.activity)
+        obj = super().get_object(request, object_id, from_field)
+        if obj is not None:
+            for name, value in activity_recorder.pending(obj.pk).items():
+                if value is not None and (getattr(obj, name) is None or getattr(obj, name) < value):
+                    setattr(obj, name, value)
+        return obj
+
+    def get_search_results(self, request, queryset, search_term):
+        # به جای OR چهار LIKE '%q%' از ایندکس‌های جستجو استفاده می‌کنیم (users.search)
+        return search_users(queryset, search_term), False
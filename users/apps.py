@@ -1,4 +1,31 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+
+def install_search_index(sender, using, **kwargs):
+    from django.contrib.auth import get_user_model
+    from django.db import router
+    from .search import install_sqlite_fts
+    # replicaها schema و triggerها را از primary می‌گیرند
+    if router.allow_migrate_model(using, get_user_model()):
+        install_sqlite_fts(using)
+
+
+def enable_sqlite_wal(sender, using, **kwargs):
+    from django.db import connections
+    # journal_mode=WAL در خود فایل ذخیره می‌شود؛ WAL خواننده‌ها را پشت نویسنده نگه نمی‌دارد
+    connection = connections[using]
+    if connection.vendor == 'sqlite' and not connection.is_in_memory_db():
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode=WAL')
+
+
+def profile_cache_metrics():
+    from .profile_cache import profile_cache
+    return [
+        ('profile_cache_hits_total', 'counter', "Profile GETs served from the cache.", profile_cache.hits),
+        ('profile_cache_misses_total', 'counter', "Profile GETs that rebuilt the cached profile.", profile_cache.misses),
+    ]
 
 
 class UsersConfig(AppConfig):
@@ -8,3 +35,8 @@ class UsersConfig(AppConfig):
 
     def ready(self):
         import users.signals  # noqa: اگر بعداً signal بخوای اضافه کنی
+        post_migrate.connect(install_search_index, sender=self)
+        post_migrate.connect(enable_sqlite_wal, sender=self)
+
+        from user_service.metrics import registry
+        registry.register_collector(profile_cache_metrics)
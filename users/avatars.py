@@ -0,0 +1,139 @@
+"""
+پردازش آواتار در پس‌زمینه.
+
+بعد از commit شدن تغییر آواتار، یک job در ThreadPool محلی نسخه‌های WebP با اندازه‌های
+AVATAR_RENDITION_SIZES می‌سازد و مسیر آن‌ها را در CustomUser.avatar_renditions ذخیره می‌کند.
+به این ترتیب ثبت‌نام و ویرایش پروفایل منتظر decode تصویر نمی‌مانند.
+"""
+import logging
+import posixpath
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+
+from user_service.storage import content_digest
+
+logger = logging.getLogger(__name__)
+
+RENDITIONS_DIR = 'avatars/renditions'
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.AVATAR_WORKERS,
+                    thread_name_prefix='avatar',
+                )
+    return _executor
+
+
+def rendition_name(avatar_name, size):
+    stem = posixpath.splitext(posixpath.basename(avatar_name))[0]
+    return f'{RENDITIONS_DIR}/{stem}_{size}.webp'
+
+
+def build_renditions(avatar_file):
+    """از فایل اصلی برای هر اندازه یک WebP می‌سازد و {size: name} برمی‌گرداند."""
+    from PIL import Image, ImageOps
+
+    with avatar_file.open('rb') as f:
+        img = Image.open(f)
+        img = ImageOps.exif_transpose(img)
+        img.load()
+
+    if img.mode not in ('RGB', 'RGBA'):
+        img = img.convert('RGBA' if 'A' in img.getbands() else 'RGB')
+
+    renditions = {}
+    for size in sorted(settings.AVATAR_RENDITION_SIZES, reverse=True):
+        # از بزرگ به کوچک، تا هر thumbnail از نسخه‌ی کوچک‌تر قبلی ساخته شود
+        img.thumbnail((size, size), Image.Resampling.LANCZOS)
+        buffer = BytesIO()
+        img.save(buffer, format='WEBP', quality=85, method=4)
+        name = rendition_name(avatar_file.name, size)
+        if default_storage.exists(name):
+            default_storage.delete(name)
+        renditions[str(size)] = default_storage.save(name, ContentFile(buffer.getvalue()))
+    return dict(sorted(renditions.items(), key=lambda item: int(item[0])))
+
+
+def shared_renditions(user_pk, avatar_name):
+    """نسخه‌های کاربر دیگری با همین آواتار؛ در ContentAddressedStorage همان نام یعنی همان محتوا"""
+    from .models import CustomUser
+
+    if not content_digest(avatar_name):
+        return None
+    sizes = {str(size) for size in settings.AVATAR_RENDITION_SIZES}
+    for renditions in (
+        CustomUser.objects.filter(avatar=avatar_name).exclude(pk=user_pk).exclude(avatar_renditions={})
+        .values_list('avatar_renditions', flat=True)[:5]
+    ):
+        if set(renditions) == sizes:
+            return renditions
+    return None
+
+
+def delete_renditions(renditions):
+    for name in (renditions or {}).values():
+        try:
+            default_storage.delete(name)
+        except OSError:
+            logger.warning("Could not delete avatar rendition %s", name)
+
+
+def process_avatar(user_pk, avatar_name, stale_renditions=None):
+    """اگر آواتار در این فاصله عوض شده باشد کاری انجام نمی‌دهد."""
+    from .models import CustomUser
+
+    delete_renditions(stale_renditions)
+    if not avatar_name:
+        return
+
+    user = CustomUser.objects.filter(pk=user_pk).only('avatar').first()
+    if user is None or user.avatar.name != avatar_name:
+        return
+
+    renditions = shared_renditions(user_pk, avatar_name) or build_renditions(user.avatar)
+
+    with transaction.atomic():
+        user = CustomUser.objects.select_for_update().get(pk=user_pk)
+        if user.avatar.name != avatar_name:
+            delete_renditions(renditions)
+            return
+        user.avatar_renditions = renditions
+        user.save(update_fields=['avatar_renditions'])
+
+
+def _run_job(*args):
+    # هر thread اتصال دیتابیس خودش را دارد و باید آن را ببندد
+    close_old_connections()
+    try:
+        process_avatar(*args)
+    except Exception:
+        logger.exception("Avatar processing failed for user %s", args[0])
+    finally:
+        close_old_connections()
+
+
+def schedule_avatar_processing(user, stale_renditions=None):
+    """بعد از commit تراکنش فعلی، پردازش آواتار را در صف پس‌زمینه قرار می‌دهد."""
+    args = (user.pk, user.avatar.name if user.avatar else None, stale_renditions)
+
+    def submit():
+        if settings.AVATAR_ASYNC:
+            get_executor().submit(_run_job, *args)
+        else:
+            process_avatar(*args)
+
+    transaction.on_commit(submit)
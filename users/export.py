@@ -0,0 +1,59 @@
+"""
+خروجی کامل جدول کاربران به صورت stream (NDJSON یا CSV) برای UserExportView.
+
+ردیف‌ها با values() و iterator(chunk_size) خوانده می‌شوند (در Postgres با cursor سمت سرور)،
+پس نه کل جدول و نه نمونه‌های مدل در حافظه ساخته نمی‌شوند. تبدیل ردیف‌ها با مسیر سریع
+users.fast_serializers و خروجی همان فیلدهای UserAdminSerializer به‌علاوه‌ی updated_at است.
+"""
+import csv
+import json
+
+from .fast_serializers import FastUserAdminSerializer
+
+EXPORT_FIELDS = (
+    'id',
+    'email',
+    'username',
+    'first_name',
+    'last_name',
+    'phone_number',
+    'address',
+    'avatar',
+    'avatar_renditions',
+    'date_joined',
+    'updated_at',
+    'last_login',
+    'last_seen',
+    'is_staff',
+    'is_active',
+)
+
+
+class UserExportSerializer(FastUserAdminSerializer):
+    fields = EXPORT_FIELDS
+
+
+class Echo:
+    """فایل نمایشی برای csv.writer که هر ردیف را به جای نوشتن برمی‌گرداند"""
+
+    def write(self, value):
+        return value
+
+
+def export_rows(queryset, request, chunk_size):
+    serializer = UserExportSerializer(context={'request': request})
+    for row in queryset.values(*EXPORT_FIELDS).iterator(chunk_size=chunk_size):
+        yield serializer.to_representation(row)
+
+
+def stream_ndjson(rows):
+    for row in rows:
+        yield json.dumps(row, ensure_ascii=False) + '\n'
+
+
+def stream_csv(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for row in rows:
+        row['avatar_renditions'] = json.dumps(row['avatar_renditions']) if row['avatar_renditions'] else ''
+        yield writer.writerow([row[name] for name in EXPORT_FIELDS])
@@ -0,0 +1,136 @@
+"""
+مسیر سریع فقط‌خواندنی برای UserAdminSerializer و UserProfileSerializer.
+
+ساختن ModelSerializer و to_representation فیلد به فیلد (به‌خصوص build_absolute_uri برای هر ImageField)
+بیشتر CPU پاسخ‌های GET را می‌گیرد. اینجا برای هر فیلد یک بار تابع تبدیل انتخاب می‌شود و ردیف‌های
+values() (یا نمونه‌ی مدل) مستقیم به dict تبدیل می‌شوند؛ پیشوند آدرس فایل‌ها هم برای هر درخواست یک بار
+ساخته می‌شود. خروجی JSON دقیقاً همان خروجی serializer اصلی است (manage.py bench_user_serializers).
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.db import models
+from django.utils import timezone
+from django.utils.encoding import filepath_to_uri
+
+from .serializers import AvatarRenditionsField, UserAdminSerializer, UserProfileSerializer
+
+User = get_user_model()
+
+
+def _identity(value, urls):
+    return value
+
+
+def _string(value, urls):
+    return None if value is None else str(value)
+
+
+def _datetime(value, urls):
+    # مثل DateTimeField در DRF: تبدیل به منطقه‌ی زمانی فعلی و ISO 8601 با Z
+    if value is None:
+        return None
+    if settings.USE_TZ and timezone.is_aware(value):
+        value = timezone.localtime(value)
+    value = value.isoformat()
+    if value.endswith('+00:00'):
+        value = value[:-6] + 'Z'
+    return value
+
+
+def _file_url(value, urls):
+    return urls.url(getattr(value, 'name', value))
+
+
+def _renditions(value, urls):
+    return {size: urls.url(name) for size, name in (value or {}).items()}
+
+
+class URLBuilder:
+    """آدرس کامل فایل‌های storage با پیشوندی که یک بار برای هر درخواست ساخته می‌شود"""
+
+    def __init__(self, request=None, storage=default_storage):
+        self.storage = storage
+        # build_absolute_uri برای مسیرهای / فقط scheme://host را اضافه می‌کند
+        self.host = request.build_absolute_uri('/')[:-1] if request is not None else ''
+        self.prefix = None
+        if isinstance(storage, FileSystemStorage):
+            self.prefix = self._absolute(storage.base_url)
+
+    def _absolute(self, url):
+        if self.host and url.startswith('/') and not url.startswith('//'):
+            return self.host + url
+        return url
+
+    def url(self, name):
+        if not name:
+            return None
+        if self.prefix is not None:
+            return self.prefix + filepath_to_uri(name).lstrip('/')
+        return self._absolute(self.storage.url(name))
+
+
+class FastReadSerializer:
+    """
+    نسخه‌ی فقط‌خواندنی serializer_class برای ردیف‌های values(*fields) یا نمونه‌های مدل.
+    fields پیش‌فرض همان Meta.fields است.
+    """
+    serializer_class = None
+    fields = None
+
+    _compiled = None
+
+    @classmethod
+    def compile(cls):
+        if cls.__dict__.get('_compiled') is None:
+            fields = tuple(cls.fields or cls.serializer_class.Meta.fields)
+            declared = cls.serializer_class._declared_fields
+            converters = []
+            for name in fields:
+                model_field = User._meta.get_field(name)
+                converters.append((name, model_field, cls._converter(declared.get(name), model_field)))
+            cls.fields = fields
+            cls._compiled = converters
+        return cls._compiled
+
+    @staticmethod
+    def _converter(declared, model_field):
+        if isinstance(declared, AvatarRenditionsField):
+            return _renditions
+        if isinstance(model_field, models.FileField):
+            return _file_url
+        if isinstance(model_field, models.DateTimeField):
+            return _datetime
+        if isinstance(model_field, models.UUIDField):
+            return _string
+        return _identity
+
+    def __init__(self, context=None, fields=None):
+        self.converters = self.compile()
+        if fields is not None:
+            # زیرمجموعه‌ای از فیلدها، به همان ترتیب serializer اصلی
+            self.converters = [converter for converter in self.converters if converter[0] in fields]
+            self.fields = tuple(name for name, _, _ in self.converters)
+        self.urls = URLBuilder((context or {}).get('request'))
+
+    def to_representation(self, row):
+        urls = self.urls
+        return {name: convert(row[name], urls) for name, _, convert in self.converters}
+
+    def from_instance(self, instance):
+        urls = self.urls
+        return {
+            name: convert(field.value_from_object(instance), urls)
+            for name, field, convert in self.converters
+        }
+
+    def many(self, rows):
+        return [self.to_representation(row) for row in rows]
+
+
+class FastUserAdminSerializer(FastReadSerializer):
+    serializer_class = UserAdminSerializer
+
+
+class FastUserProfileSerializer(FastReadSerializer):
+    serializer_class = UserProfileSerializer
@@ -0,0 +1,92 @@
+"""
+تبدیل دسته‌ای شناسه یا ایمیل کاربران به داده‌ی نمایشی برای سرویس‌های داخلی (UserLookupView).
+
+هر کاربر یک ورودی کش users:lookup:<id> دارد که فقط فیلدهایی را نگه می‌دارد که تا حالا خواسته شده‌اند.
+کلیدهایی که در کش نیستند (یا فیلد خواسته‌شده را ندارند) با یک کوئری IN و فقط با همان فیلدها
+از دیتابیس خوانده می‌شوند. با هر save/delete کاربر ورودی کش پاک می‌شود (users.signals).
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+
+User = get_user_model()
+
+LOOKUP_FIELDS = (
+    'id',
+    'email',
+    'username',
+    'first_name',
+    'last_name',
+    'avatar',
+    'avatar_renditions',
+    'date_joined',
+    'is_active',
+)
+DEFAULT_LOOKUP_FIELDS = ('id', 'username', 'first_name', 'last_name', 'avatar', 'avatar_renditions')
+# برای کلید کردن نتیجه همیشه خوانده می‌شوند
+KEY_FIELDS = ('id', 'email')
+
+
+def _cache_key(user_id):
+    return f'users:lookup:{user_id}'
+
+
+def _email_key(email):
+    return f'users:lookup:email:{email}'
+
+
+def forget_lookup(user_id):
+    cache.delete(_cache_key(user_id))
+
+
+def lookup_users(ids=(), emails=(), fields=DEFAULT_LOOKUP_FIELDS):
+    """
+    ردیف‌های values() کاربران را برمی‌گرداند: ({id: row}, {email: row}).
+    شناسه یا ایمیلی که پیدا نشود در نتیجه نیست.
+    """
+    needed = set(fields) | set(KEY_FIELDS)
+    ids = {str(user_id) for user_id in ids}
+    emails = set(emails)
+
+    # ایمیل فقط به شناسه نگاشت می‌شود؛ اگر ایمیل کاربر عوض شده باشد، ورودی کش با آن نمی‌خواند
+    cached_email_ids = cache.get_many([_email_key(email) for email in emails])
+    email_ids = {
+        email: cached_email_ids[_email_key(email)]
+        for email in emails
+        if _email_key(email) in cached_email_ids
+    }
+    cached = cache.get_many([_cache_key(user_id) for user_id in ids | set(email_ids.values())])
+
+    def cached_row(user_id):
+        row = cached.get(_cache_key(user_id))
+        if row is not None and needed <= row.keys():
+            return row
+        return None
+
+    by_id = {user_id: row for user_id in ids if (row := cached_row(user_id)) is not None}
+    by_email = {}
+    for email, user_id in email_ids.items():
+        row = cached_row(user_id)
+        if row is not None and row['email'] == email:
+            by_email[email] = row
+
+    missing_ids = ids - by_id.keys()
+    missing_emails = emails - by_email.keys()
+    if missing_ids or missing_emails:
+        queryset = User.objects.filter(pk__in=missing_ids) | User.objects.filter(email__in=missing_emails)
+        rows = list(queryset.values(*(name for name in LOOKUP_FIELDS if name in needed)))
+
+        to_cache = {}
+        for row in rows:
+            user_id = str(row['id'])
+            previous = cached.get(_cache_key(user_id))
+            # ادغام با فیلدهایی که قبلاً در کش بوده‌اند
+            to_cache[_cache_key(user_id)] = {**previous, **row} if previous else row
+            if user_id in ids:
+                by_id[user_id] = row
+            if row['email'] in emails:
+                by_email[row['email']] = row
+                to_cache[_email_key(row['email'])] = user_id
+        cache.set_many(to_cache, settings.USER_LOOKUP_CACHE_TTL)
+
+    return by_id, by_email
@@ -0,0 +1,86 @@
+import copy
+import json
+import statistics
+import time
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+MODES = ('none', 'persistent', 'pool')
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure per-request database latency for each connection mode (DB_POOL_MODE): a new connection "
+        "per request, persistent connections (CONN_MAX_AGE) and the psycopg 3 pool. Each simulated request "
+        "gets a connection, runs a small query and releases it the way request_finished does."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--database', default='default')
+        parser.add_argument('--modes', nargs='+', choices=MODES, default=list(MODES))
+
+    def handle(self, *args, **options):
+        base = connections[options['database']]
+        results = []
+        for mode in options['modes']:
+            wrapper = self._wrapper(base, mode)
+            if wrapper is None:
+                results.append({'mode': mode, 'skipped': f"not supported on {base.vendor} with this driver"})
+                continue
+            try:
+                timings = self._run(wrapper, options['requests'])
+            finally:
+                wrapper.close()
+                if hasattr(wrapper, 'close_pool'):
+                    wrapper.close_pool()
+            results.append(self._result(mode, timings))
+
+        self.stdout.write(json.dumps({'vendor': base.vendor, 'results': results}, indent=2))
+
+    def _wrapper(self, base, mode):
+        settings_dict = copy.deepcopy(base.settings_dict)
+        settings_dict['OPTIONS'].pop('pool', None)
+        settings_dict['CONN_MAX_AGE'] = 600 if mode == 'persistent' else 0
+        settings_dict['CONN_HEALTH_CHECKS'] = mode != 'none'
+        if mode == 'pool':
+            if base.vendor != 'postgresql':
+                return None
+            settings_dict['OPTIONS']['pool'] = {'min_size': 1, 'max_size': 4}
+        wrapper = base.__class__(settings_dict, alias=f'bench_{mode}')
+        if mode == 'pool':
+            try:
+                wrapper.pool
+            except ImproperlyConfigured:
+                return None
+        return wrapper
+
+    def _run(self, wrapper, requests):
+        # یک درخواست گرم‌کننده تا اتصال/pool اولیه در نتایج حساب نشود
+        self._request(wrapper)
+        timings = []
+        for _ in range(requests):
+            start = time.perf_counter()
+            self._request(wrapper)
+            timings.append((time.perf_counter() - start) * 1000)
+        return timings
+
+    def _request(self, wrapper):
+        # مثل request_started و request_finished
+        wrapper.close_if_unusable_or_obsolete()
+        with wrapper.cursor() as cursor:
+            cursor.execute('SELECT 1')
+            cursor.fetchone()
+        wrapper.close_if_unusable_or_obsolete()
+
+    def _result(self, mode, timings):
+        timings.sort()
+        return {
+            'mode': mode,
+            'requests': len(timings),
+            'mean_ms': round(statistics.fmean(timings), 3),
+            'p50_ms': round(timings[len(timings) // 2], 3),
+            'p95_ms': round(timings[int(len(timings) * 0.95) - 1], 3),
+        }
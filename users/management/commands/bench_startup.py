@@ -0,0 +1,130 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# هر اجرا در یک پروسه‌ی تازه، مثل یک pod جدید
+CHILD = r'''
+import json, os, sys, time
+start = time.perf_counter()
+import django
+from django.conf import settings
+settings.INSTALLED_APPS
+settings_loaded = time.perf_counter()
+django.setup()
+setup_done = time.perf_counter()
+from django.core.wsgi import get_wsgi_application
+application = get_wsgi_application()
+application_ready = time.perf_counter()
+
+host = next((host for host in settings.ALLOWED_HOSTS if host and host[0] not in '.*'), 'localhost')
+environ = {
+    'REQUEST_METHOD': 'GET', 'PATH_INFO': sys.argv[1], 'QUERY_STRING': '', 'SERVER_NAME': host,
+    'SERVER_PORT': '80', 'HTTP_HOST': host, 'REMOTE_ADDR': '127.0.0.1', 'SERVER_PROTOCOL': 'HTTP/1.1',
+    'wsgi.input': __import__('io').BytesIO(), 'wsgi.errors': sys.stderr, 'wsgi.url_scheme': 'http',
+    'wsgi.version': (1, 0), 'wsgi.multithread': True, 'wsgi.multiprocess': True, 'wsgi.run_once': False,
+}
+statuses = []
+body = b''.join(application(environ, lambda status, headers, exc_info=None: statuses.append(status)))
+first_response = time.perf_counter()
+print(json.dumps({
+    'status': statuses[0],
+    'settings_ms': (settings_loaded - start) * 1000,
+    'setup_ms': (setup_done - settings_loaded) * 1000,
+    'application_ms': (application_ready - setup_done) * 1000,
+    'first_request_ms': (first_response - application_ready) * 1000,
+    'time_to_first_response_ms': (first_response - start) * 1000,
+    'modules': len(sys.modules),
+    'apps': len(settings.INSTALLED_APPS),
+    'middleware': len(settings.MIDDLEWARE),
+}))
+'''
+
+PROFILES = {
+    'full': {'API_ONLY': 'False'},
+    'api': {'API_ONLY': 'True'},
+}
+PHASES = ('settings_ms', 'setup_ms', 'application_ms', 'first_request_ms', 'time_to_first_response_ms', 'process_ms')
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure worker cold start for the full and API-only (API_ONLY=True) profiles: each run starts a fresh "
+        "interpreter, loads settings, runs django.setup(), builds the WSGI application and serves one request. "
+        "Reports the median of each phase and the slowest imports (python -X importtime) as JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profiles', nargs='+', choices=PROFILES, default=list(PROFILES))
+        parser.add_argument('--runs', type=int, default=5, help="Cold starts per profile; medians are reported.")
+        parser.add_argument('--path', default='/.well-known/jwks.json', help="Path of the first request.")
+        parser.add_argument('--top', type=int, default=15, help="Import groups listed per profile.")
+        parser.add_argument(
+            '--budget-ms', type=float, default=0,
+            help="Fail if the median time to first response of any profile exceeds this.",
+        )
+
+    def handle(self, *args, **options):
+        results = []
+        for profile in options['profiles']:
+            env = {**os.environ, **PROFILES[profile], 'DJANGO_SETTINGS_MODULE': os.environ.get(
+                'DJANGO_SETTINGS_MODULE', settings.SETTINGS_MODULE)}
+            runs = [self._run(env, options['path']) for _ in range(options['runs'])]
+            result = {'profile': profile, 'status': runs[0]['status']}
+            for name in ('modules', 'apps', 'middleware'):
+                result[name] = runs[0][name]
+            for phase in PHASES:
+                result[phase] = round(statistics.median(run[phase] for run in runs), 1)
+            result['imports'] = self._imports(env, options['path'], options['top'])
+            results.append(result)
+
+        self.stdout.write(json.dumps({'python': sys.version.split()[0], 'runs': options['runs'], 'results': results}, indent=2))
+
+        budget = options['budget_ms']
+        over = [result['profile'] for result in results if budget and result['time_to_first_response_ms'] > budget]
+        if over:
+            raise CommandError(f"Time to first response over the {budget:g} ms budget: {', '.join(over)}")
+
+    def _run(self, env, path, *flags):
+        start = time.perf_counter()
+        process = subprocess.run(
+            [sys.executable, *flags, '-c', CHILD, path],
+            env=env, cwd=settings.BASE_DIR, capture_output=True, text=True,
+        )
+        elapsed = (time.perf_counter() - start) * 1000
+        if process.returncode != 0:
+            raise CommandError(f"Cold start failed:\n{process.stderr}")
+        result = json.loads(process.stdout.strip().splitlines()[-1])
+        result['process_ms'] = elapsed
+        result['stderr'] = process.stderr
+        return result
+
+    def _imports(self, env, path, top):
+        """زمان import (self) به تفکیک پکیج، از خروجی -X importtime"""
+        stderr = self._run(env, path, '-X', 'importtime')['stderr']
+        groups = {}
+        total = 0
+        for line in stderr.splitlines():
+            if not line.startswith('import time:') or 'self [us]' in line:
+                continue
+            self_us, _, name = line[len('import time:'):].split('|')
+            self_us, name = int(self_us), name.strip()
+            group = self._group(name)
+            groups[group] = groups.get(group, 0) + self_us
+            total += self_us
+        slowest = sorted(groups.items(), key=lambda item: item[1], reverse=True)[:top]
+        return {
+            'total_ms': round(total / 1000, 1),
+            'slowest': [{'package': group, 'ms': round(us / 1000, 1)} for group, us in slowest],
+        }
+
+    def _group(self, name):
+        parts = name.split('.')
+        if parts[0] == 'django':
+            return '.'.join(parts[:3] if len(parts) > 2 and parts[1] == 'contrib' else parts[:2])
+        return parts[0]
@@ -0,0 +1,96 @@
+import json
+import time
+import uuid
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+from django.utils import timezone
+
+from users.fast_serializers import FastUserAdminSerializer, FastUserProfileSerializer
+from users.serializers import UserAdminSerializer, UserProfileSerializer
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the per-row cost of the DRF user serializers with the fast read-only path "
+        "in users.fast_serializers, and check that both produce identical output."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000, help="Users serialized per run.")
+        parser.add_argument('--repeat', type=int, default=5, help="Runs per serializer; the best one is reported.")
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        repeat = options['repeat']
+        request = self._request()
+        context = {'request': request}
+        users = self._users(rows)
+
+        results = []
+        for drf_class, fast_class in (
+            (UserAdminSerializer, FastUserAdminSerializer),
+            (UserProfileSerializer, FastUserProfileSerializer),
+        ):
+            fields = fast_class(context).fields
+            values = [{name: User._meta.get_field(name).value_from_object(user) for name in fields} for user in users]
+            for row in values:
+                row['avatar'] = row['avatar'].name or None
+
+            drf_data, drf = self._best(repeat, lambda: drf_class(users, many=True, context=context).data)
+            fast_data, fast = self._best(repeat, lambda: fast_class(context).many(values))
+            _, instances = self._best(repeat, lambda: [fast_class(context).from_instance(user) for user in users])
+            results.append({
+                'serializer': drf_class.__name__,
+                'rows': rows,
+                'identical': json.dumps(drf_data) == json.dumps(fast_data),
+                'drf_us_per_row': self._per_row(drf, rows),
+                'fast_values_us_per_row': self._per_row(fast, rows),
+                'fast_instance_us_per_row': self._per_row(instances, rows),
+                'speedup': round(drf / fast, 2),
+            })
+
+        self.stdout.write(json.dumps({'results': results}, indent=2))
+
+    def _request(self):
+        host = next((host for host in settings.ALLOWED_HOSTS if host and host[0] not in '.*'), 'localhost')
+        return RequestFactory().get('/', HTTP_HOST=host)
+
+    def _users(self, count):
+        now = timezone.now()
+        users = []
+        for i in range(count):
+            user = User(
+                id=uuid.uuid4(),
+                email=f'bench{i}@example.com',
+                username=f'bench{i}',
+                first_name='Bench',
+                last_name=f'User {i}',
+                phone_number='09120000000',
+                address='Tehran',
+                avatar=f'avatars/bench{i}.jpg' if i % 2 else None,
+                avatar_renditions={
+                    str(size): f'avatars/renditions/bench{i}_{size}.webp'
+                    for size in settings.AVATAR_RENDITION_SIZES
+                } if i % 2 else {},
+                last_login=now if i % 3 else None,
+            )
+            user.date_joined = now
+            users.append(user)
+        return users
+
+    def _best(self, repeat, fn):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            data = fn()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return data, best
+
+    def _per_row(self, elapsed, rows):
+        return round(elapsed / rows * 1e6, 2)
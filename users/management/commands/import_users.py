@@ -0,0 +1,66 @@
+import json
+import os
+import sys
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from authentication.hashing import create_process_pool
+from users.importer import UserImporter, read_rows
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream users from a CSV or NDJSON file into the database. Passwords are hashed in a "
+        "process pool and rows are inserted in batched transactions (COPY on Postgres). "
+        "Columns: email, username, first_name, last_name, password (or password_hash), "
+        "phone_number, address."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Input file, or - for stdin.")
+        parser.add_argument('--format', choices=['csv', 'ndjson'], help="Defaults to the file extension.")
+        parser.add_argument('--chunk-size', type=int, default=1000, help="Rows per validation/insert batch.")
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="Password hashing processes.")
+        parser.add_argument('--rejects', help="NDJSON file for rejected rows (default: <path>.rejects.ndjson).")
+        parser.add_argument(
+            '--skip-password-validation', action='store_true',
+            help="Do not run AUTH_PASSWORD_VALIDATORS on plain-text passwords.",
+        )
+        parser.add_argument('--dry-run', action='store_true', help="Validate and hash without inserting.")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format']
+        if fmt is None:
+            if path == '-':
+                raise CommandError("--format is required when reading from stdin.")
+            fmt = 'csv' if path.lower().endswith('.csv') else 'ndjson'
+
+        rejects_path = options['rejects'] or (
+            'import_users.rejects.ndjson' if path == '-' else f'{path}.rejects.ndjson'
+        )
+
+        stream = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8')
+        executor = create_process_pool(options['workers'])
+        try:
+            with open(rejects_path, 'w', encoding='utf-8') as rejects:
+                importer = UserImporter(
+                    executor,
+                    rejects,
+                    chunk_size=options['chunk_size'],
+                    validate_passwords=not options['skip_password_validation'],
+                    dry_run=options['dry_run'],
+                )
+                stats = importer.run(read_rows(stream, fmt))
+        finally:
+            executor.shutdown()
+            if stream is not sys.stdin:
+                stream.close()
+
+        summary = stats.as_dict()
+        if summary['rejected']:
+            summary['rejects_file'] = str(Path(rejects_path).resolve())
+        else:
+            os.remove(rejects_path)
+        self.stdout.write(json.dumps(summary, indent=2))
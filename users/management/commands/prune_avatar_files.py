@@ -0,0 +1,89 @@
+import json
+import os
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+
+from user_service.storage import ContentAddressedStorage, content_digest
+
+User = get_user_model()
+
+# فایل‌های موقت ContentAddressedStorage که پروسه‌ی نویسنده‌شان وسط کار مرده است
+TEMPORARY_PREFIXES = ('.upload-', '.purge-')
+
+
+def is_referenced(name):
+    # نام نسخه‌ها hash خودشان را دارد، پس جستجوی متنی در JSON فقط همان نام را پیدا می‌کند
+    return User.objects.filter(Q(avatar=name) | Q(avatar_renditions__icontains=content_digest(name))).exists()
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete content-addressed avatar files and renditions that no user references any more. "
+        "ContentAddressedStorage.delete() keeps shared files, so this is how replaced avatars are freed. "
+        "Files newer than --min-age are kept so uploads whose transaction has not committed yet survive. "
+        "Leftover .upload-*/.purge-* temporary files older than --min-age are deleted too."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--directory', default='avatars', help="Storage directory to scan.")
+        parser.add_argument('--min-age', type=int, default=86400, help="Only delete files older than this many seconds.")
+        parser.add_argument('--dry-run', action='store_true', help="Report without deleting.")
+
+    def handle(self, *args, **options):
+        if not isinstance(default_storage, ContentAddressedStorage):
+            raise CommandError("The default storage is not ContentAddressedStorage.")
+
+        referenced = set()
+        for avatar, renditions in User.objects.exclude(avatar='').exclude(avatar__isnull=True).values_list(
+            'avatar', 'avatar_renditions',
+        ).iterator(chunk_size=2000):
+            referenced.add(avatar)
+            referenced.update((renditions or {}).values())
+
+        root = default_storage.path(options['directory'])
+        cutoff = time.time() - options['min_age']
+        scanned = deleted = temporary_deleted = freed = 0
+        for directory, _, files in os.walk(root):
+            for filename in files:
+                path = os.path.join(directory, filename)
+                if filename.startswith(TEMPORARY_PREFIXES):
+                    try:
+                        info = os.stat(path)
+                        # rename در purge فقط ctime را جلو می‌برد؛ فایلی که همین حالا در حال نوشتن یا purge است می‌ماند
+                        if max(info.st_mtime, info.st_ctime) > cutoff:
+                            continue
+                        if not options['dry_run']:
+                            os.remove(path)
+                    except FileNotFoundError:
+                        continue
+                    temporary_deleted += 1
+                    freed += info.st_size
+                    continue
+                name = os.path.relpath(path, default_storage.location).replace(os.sep, '/')
+                # فقط نام‌های آدرس‌دار؛ آپلودهای قدیمی دست نمی‌خورند
+                if not content_digest(name):
+                    continue
+                scanned += 1
+                info = os.stat(path)
+                if name in referenced or info.st_mtime > cutoff:
+                    continue
+                # ارجاعی که بعد از ساختن referenced commit شده
+                if is_referenced(name):
+                    continue
+                if not options['dry_run'] and not default_storage.purge(name, older_than=cutoff):
+                    continue
+                deleted += 1
+                freed += info.st_size
+
+        self.stdout.write(json.dumps({
+            'scanned': scanned,
+            'referenced': len(referenced),
+            'deleted': deleted,
+            'temporary_deleted': temporary_deleted,
+            'bytes_freed': freed,
+            'dry_run': options['dry_run'],
+        }, indent=2))
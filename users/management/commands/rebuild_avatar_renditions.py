@@ -0,0 +1,25 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from users.avatars import process_avatar
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Build WebP avatar renditions for users that have an avatar (e.g. avatars uploaded before renditions existed)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help="Rebuild even if renditions already exist.")
+
+    def handle(self, *args, **options):
+        users = User.objects.exclude(avatar='').exclude(avatar__isnull=True)
+        if not options['all']:
+            users = users.filter(avatar_renditions={})
+
+        count = 0
+        for pk, avatar in users.values_list('pk', 'avatar').iterator():
+            process_avatar(pk, avatar)
+            count += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Processed {count} avatars."))
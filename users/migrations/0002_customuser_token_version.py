@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-18 17:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='token_version',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='token version'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-18 17:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_customuser_token_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='avatar_renditions',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='avatar renditions'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-18 17:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('users', '0003_customuser_avatar_renditions'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customuser',
+            index=models.Index(fields=['date_joined', 'id'], name='users_date_joined_id_idx'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# ایندکس‌های trigram برای users.search (فقط Postgres)؛
+# جدول FTS5 معادل در SQLite بعد از هر migrate توسط users.search.install_sqlite_fts ساخته می‌شود.
+
+from django.db import migrations
+
+TRIGRAM_INDEXES = [
+    ('users_email_trgm_idx', 'email'),
+    ('users_username_trgm_idx', 'username'),
+    ('users_first_name_trgm_idx', 'first_name'),
+    ('users_last_name_trgm_idx', 'last_name'),
+]
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, column in TRIGRAM_INDEXES:
+        # همان عبارتی که Django برای icontains می‌سازد: UPPER("column"::text)
+        schema_editor.execute(
+            f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} '
+            f'ON users_customuser USING gin (UPPER({column}::text) gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, column in TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY داخل تراکنش مجاز نیست
+    atomic = False
+
+    dependencies = [
+        ('users', '0004_customuser_date_joined_id_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-18 18:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0006_customuser_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='last_seen',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='last seen'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 6.0.1 on 2026-10-18 18:38
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0007_customuser_last_seen'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customuser',
+            index=models.Index(django.db.models.functions.text.Lower('email'), name='users_email_lower_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customuser',
+            index=models.Index(django.db.models.functions.text.Lower('username'), name='users_username_lower_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 6.0.1 on 2026-10-18 18:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0008_customuser_lower_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customuser',
+            index=models.Index(fields=['avatar'], name='users_avatar_idx'),
+        ),
+    ]
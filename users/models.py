@@ -1,9 +1,15 @@
 from django.db import models
+from django.db.models.functions import Lower
+from django.contrib.auth.hashers import acheck_password, check_password
 from django.contrib.auth.models import AbstractUser
 from django.utils.translation import gettext_lazy as _
-from PIL import Image
 import uuid
 
+from .avatars import schedule_avatar_processing
+
+# تغییر این فیلدها توکن‌های صادرشده را باطل می‌کند (CustomUser.save)
+PRIVILEGE_FIELDS = ('is_staff', 'is_superuser', 'is_active')
+
 
 class CustomUser(AbstractUser):
     """
@@ -22,8 +28,16 @@ class CustomUser(AbstractUser):
     last_name = models.CharField(_('last name'), max_length=150, blank=False)
     address = models.TextField(_('address'), blank=True, null=True)
     avatar = models.ImageField(_('avatar'), upload_to='avatars/', blank=True, null=True)
+    # {size: name} نسخه‌های WebP ساخته‌شده توسط users.avatars
+    avatar_renditions = models.JSONField(_('avatar renditions'), default=dict, blank=True, editable=False)
     date_joined = models.DateTimeField(_('date joined'), auto_now_add=True)
+    # برای خروجی افزایشی (users/export) ایندکس دارد
+    updated_at = models.DateTimeField(_('updated at'), auto_now=True, db_index=True)
     is_active = models.BooleanField(_('active'), default=True)
+    # آخرین درخواست احراز شده یا refresh؛ به صورت دسته‌ای نوشته می‌شود (authentication.activity)
+    last_seen = models.DateTimeField(_('last seen'), blank=True, null=True, editable=False)
+    # با هر تغییر رمز عبور بالا می‌رود تا توکن‌های قبلی باطل شوند
+    token_version = models.PositiveIntegerField(_('token version'), default=0, editable=False)
 
     # username رو نگه می‌داریم اما می‌تونیم بعداً اختیاری کنیم
     # اگر بخوای فقط با ایمیل لاگین کنی، این خط رو کامنت کن
@@ -34,6 +48,15 @@ class CustomUser(AbstractUser):
         verbose_name = _('user')
         verbose_name_plural = _('users')
         ordering = ['-date_joined']
+        indexes = [
+            # صفحه‌بندی keyset در UserListView (users.pagination)
+            models.Index(fields=['date_joined', 'id'], name='users_date_joined_id_idx'),
+            # جستجوی پیشوندی بدون حساسیت به حروف (users.search._prefix_q)
+            models.Index(Lower('email'), name='users_email_lower_idx'),
+            models.Index(Lower('username'), name='users_username_lower_idx'),
+            # نسخه‌های مشترک آواتار در هر آپلود (users.avatars.shared_renditions)
+            models.Index(fields=['avatar'], name='users_avatar_idx'),
+        ]
 
     def __str__(self):
         return self.email or self.username
@@ -44,12 +67,99 @@ class CustomUser(AbstractUser):
     def get_short_name(self):
         return self.first_name
 
-    # بهینه‌سازی سایز تصویر آواتار بعد از آپلود
+    def set_password(self, raw_password):
+        super().set_password(raw_password)
+        self.revoke_tokens()
+
+    def set_password_hash(self, encoded):
+        # برای رمزی که خارج از این پروسه هش شده (authentication.hashing)
+        self.password = encoded
+        self._password = None
+        self.revoke_tokens()
+
+    def revoke_tokens(self):
+        """توکن‌های صادرشده تا اینجا بعد از save بعدی رد می‌شوند؛ save(update_fields=...) هم token_version را می‌نویسد"""
+        self.token_version = (self.token_version or 0) + 1
+        self._token_version_changed = True
+
+    def _upgrade_password_hash(self, raw_password):
+        # ارتقای هش (الگوریتم یا iterations جدید) رمز را عوض نمی‌کند، پس توکن‌ها باطل نمی‌شوند؛ مثل AsyncLoginView
+        AbstractUser.set_password(self, raw_password)
+        self._password = None
+
+    def check_password(self, raw_password):
+        def setter(raw_password):
+            self._upgrade_password_hash(raw_password)
+            self.save(update_fields=['password'])
+
+        return check_password(raw_password, self.password, setter)
+
+    async def acheck_password(self, raw_password):
+        async def setter(raw_password):
+            self._upgrade_password_hash(raw_password)
+            await self.asave(update_fields=['password'])
+
+        return await acheck_password(raw_password, self.password, setter)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._saved_avatar_name = self._raw_avatar_name()
+        self._saved_privileges = self._raw_privileges()
+        self._token_version_changed = False
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self._saved_privileges = self._raw_privileges()
+
+    def _raw_privileges(self):
+        # فقط فیلدهای بارگذاری‌شده؛ فیلد deferred نه کوئری اضافه می‌دهد نه تغییر حساب می‌شود
+        return {name: self.__dict__[name] for name in PRIVILEGE_FIELDS if name in self.__dict__}
+
+    def privileges_changed(self, update_fields=None):
+        """is_staff، is_superuser یا is_active نسبت به مقدار خوانده‌شده از دیتابیس عوض شده است"""
+        if self._state.adding:
+            return False
+        return any(
+            self.__dict__[name] != value
+            for name, value in self._saved_privileges.items()
+            if update_fields is None or name in update_fields
+        )
+
+    def _raw_avatar_name(self):
+        # مستقیم از __dict__ تا فیلد deferred باعث کوئری اضافه نشود
+        value = self.__dict__.get('avatar')
+        return getattr(value, 'name', value) or None
+
+    def avatar_changed(self):
+        if 'avatar' not in self.__dict__:
+            return False
+        if self.avatar and not self.avatar._committed:
+            return True
+        return self._raw_avatar_name() != self._saved_avatar_name
+
+    # پردازش آواتار فقط وقتی فایل واقعاً عوض شده باشد و در پس‌زمینه
     def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if self.privileges_changed(update_fields):
+            # claim is_staff توکن‌های قبلی دیگر درست نیست و refresh آن را کپی می‌کند؛ با این نسخه هر دو رد می‌شوند
+            self.revoke_tokens()
+        avatar_changed = self.avatar_changed() and (update_fields is None or 'avatar' in update_fields)
+        stale_renditions = None
+        if avatar_changed:
+            stale_renditions, self.avatar_renditions = self.avatar_renditions, {}
+        if update_fields is not None:
+            # auto_now فقط وقتی نوشته می‌شود که در update_fields باشد و خروجی افزایشی (?updated_since=) به آن تکیه دارد
+            update_fields = {*update_fields, 'updated_at'}
+            if avatar_changed:
+                update_fields.add('avatar_renditions')
+            if self._token_version_changed:
+                update_fields.add('token_version')
+            kwargs['update_fields'] = update_fields
+
         super().save(*args, **kwargs)
-        if self.avatar and hasattr(self.avatar, 'path'):
-            img = Image.open(self.avatar.path)
-            if img.height > 300 or img.width > 300:
-                output_size = (300, 300)
-                img.thumbnail(output_size)
-                img.save(self.avatar.path, quality=95)
+        self._token_version_changed = False
+        self._saved_privileges = self._raw_privileges()
+
+        if avatar_changed:
+            self._saved_avatar_name = self._raw_avatar_name()
+            schedule_avatar_processing(self, stale_renditions)
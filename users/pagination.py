@@ -0,0 +1,150 @@
+import base64
+import json
+import uuid
+from collections import OrderedDict
+
+from django.db import connection
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    صفحه‌بندی keyset روی (date_joined, id) به ترتیب نزولی.
+
+    به جای OFFSET، هر صفحه از آخرین ردیف صفحه‌ی قبل با WHERE ادامه پیدا می‌کند و از ایندکس
+    users_date_joined_id_idx استفاده می‌کند، پس هزینه‌ی صفحه‌های عمیق با صفحه‌ی اول یکی است.
+    تعداد کل فقط با ?count=exact یا ?count=estimate (reltuples در Postgres) محاسبه می‌شود.
+    اختیاری است: فقط درخواست‌هایی که پارامتر cursor دارند (برای صفحه‌ی اول ?cursor=) از آن استفاده می‌کنند.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    count_query_param = 'count'
+    page_size = api_settings.PAGE_SIZE
+    max_page_size = 100
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.count = self.get_count(queryset, request)
+
+        cursor = self.decode_cursor(request)
+        self.reverse = bool(cursor and cursor['r'])
+
+        if cursor is not None:
+            date_joined, pk = cursor['d'], cursor['i']
+            if self.reverse:
+                position = Q(date_joined__gt=date_joined) | Q(date_joined=date_joined, pk__gt=pk)
+            else:
+                position = Q(date_joined__lt=date_joined) | Q(date_joined=date_joined, pk__lt=pk)
+            queryset = queryset.filter(position)
+
+        ordering = ('date_joined', 'pk') if self.reverse else ('-date_joined', '-pk')
+        results = list(queryset.order_by(*ordering)[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if self.reverse:
+            results.reverse()
+
+        self.page = results
+        if self.reverse:
+            self.has_next, self.has_previous = cursor is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, cursor is not None
+        return results
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def get_count(self, queryset, request):
+        mode = request.query_params.get(self.count_query_param)
+        if mode == 'exact':
+            return queryset.count()
+        if mode == 'estimate':
+            return self.estimate_count(queryset)
+        return None
+
+    def estimate_count(self, queryset):
+        # فقط برای جدول کامل و روی Postgres تخمین می‌زنیم؛ در بقیه‌ی حالت‌ها COUNT واقعی
+        if connection.vendor != 'postgresql' or queryset.query.where:
+            return queryset.count()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+        if row is None or row[0] < 0:
+            # جدولی که هنوز ANALYZE نشده
+            return queryset.count()
+        return row[0]
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            cursor['d'] = parse_datetime(cursor['d'])
+            if cursor['d'] is None:
+                raise ValueError
+            # شناسه‌ی نامعتبر در pk__lt به ValidationError (و 500) می‌رسید
+            cursor['i'] = uuid.UUID(cursor['i'])
+            cursor['r'] = bool(cursor.get('r'))
+        except (TypeError, ValueError, KeyError, AttributeError):
+            raise NotFound(self.invalid_cursor_message)
+        return cursor
+
+    def encode_cursor(self, instance, reverse):
+        # instance می‌تواند ردیف values() هم باشد (users.fast_serializers)
+        if isinstance(instance, dict):
+            date_joined, pk = instance['date_joined'], instance['id']
+        else:
+            date_joined, pk = instance.date_joined, instance.pk
+        data = {'d': date_joined.isoformat(), 'i': str(pk), 'r': int(reverse)}
+        encoded = base64.urlsafe_b64encode(json.dumps(data, separators=(',', ':')).encode()).decode()
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            # cursor خالی یعنی صفحه‌ی اول همین صفحه‌بندی (UserListView.paginator)
+            return replace_query_param(self.base_url, self.cursor_query_param, '')
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('count', self.count),
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'count': {'type': 'integer', 'nullable': True},
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
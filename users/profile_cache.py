@@ -0,0 +1,77 @@
+"""
+کش read-through پروفایل سریال‌شده برای GET در ProfileView.
+
+کلید هر پروفایل شامل شناسه‌ی کاربر، نسخه‌ی فعلی کاربر و scheme://host درخواست (به خاطر آدرس کامل آواتار) است.
+نسخه یک شمارنده در همان cache است که با هر post_save/post_delete کاربر بالا می‌رود (users.signals)،
+پس ورودی‌های قدیمی هیچ‌وقت دوباره خوانده نمی‌شوند و فقط با TTL از cache بیرون می‌روند.
+اگر کلید نسخه از cache حذف شود با یک مقدار زمانی جدید ساخته می‌شود تا با نسخه‌های قبلی برخورد نکند.
+timeout صفر (PROFILE_CACHE_TTL=0) کش را خاموش می‌کند؛ تنظیمات prod بدون cache مشترک (REDIS_URL) همین کار را می‌کند،
+چون bump در LocMem یک worker به بقیه نمی‌رسد و آن‌ها تا TTL پروفایل قدیمی برمی‌گردانند.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+def _version_key(user_id):
+    return f'users:profile_version:{user_id}'
+
+
+class ProfileCache:
+    def __init__(self, timeout):
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_version(self, user_id):
+        key = _version_key(user_id)
+        version = cache.get(key)
+        if version is None:
+            cache.add(key, time.time_ns(), None)
+            version = cache.get(key)
+        return version
+
+    def bump(self, user_id):
+        if not self.timeout:
+            return
+        key = _version_key(user_id)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), None)
+
+    def get(self, user_id, request, build):
+        """پروفایل کش‌شده را برمی‌گرداند؛ در غیر این صورت build() را صدا می‌زند و نتیجه را کش می‌کند."""
+        if not self.timeout:
+            return build()
+        key = f'users:profile:{user_id}:{self.get_version(user_id)}:{request.build_absolute_uri("/")}'
+        data = cache.get(key)
+        if data is not None:
+            self._count(hit=True)
+            return data
+        self._count(hit=False)
+        data = build()
+        cache.set(key, data, self.timeout)
+        return data
+
+    def _count(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def stats(self):
+        """شمارنده‌های همین پروسه"""
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / total, 4) if total else None,
+        }
+
+
+profile_cache = ProfileCache(timeout=settings.PROFILE_CACHE_TTL)
@@ -0,0 +1,168 @@
+"""
+جستجوی کاربران برای ?search= در UserListView و جستجوی پنل ادمین.
+
+- عبارتی که @ دارد (مثل bob.smith@example.com، smith@example.com یا @example.com): زیررشته‌ی بدون حساسیت
+  به حروف بزرگ و کوچک فقط در email.
+- Postgres: شرط icontains روی هر ستون، که با ایندکس‌های GIN trigram روی UPPER(ستون)
+  (مایگریشن 0005_user_search_indexes) بدون full scan اجرا می‌شود.
+- SQLite: جدول FTS5 سایه (users_customuser_fts) با tokenizer trigram که با trigger همگام می‌ماند و با جدول
+  users_customuser_fts_ids به کلید UUID کاربر می‌رسد. عبارت کوتاه‌تر از
+  ۳ حرف فقط با شروع username یا email مقایسه می‌شود، با بازه روی LOWER(ستون) تا ایندکس‌های
+  users_email_lower_idx و users_username_lower_idx استفاده شوند.
+
+مثل جستجوی ادمین جنگو، هر کلمه باید حداقل در یکی از ستون‌ها پیدا شود.
+"""
+from django.db import connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Lower
+from django.db.models.lookups import GreaterThanOrEqual, LessThan
+from django.utils.text import smart_split, unescape_string_literal
+
+SEARCH_FIELDS = ('email', 'username', 'first_name', 'last_name')
+# tokenizer trigram برای عبارت‌های کوتاه‌تر از ۳ حرف ایندکسی ندارد
+MIN_TRIGRAM_LENGTH = 3
+
+FTS_TABLE = 'users_customuser_fts'
+# rowid جدول کاربر (کلید UUID، بدون INTEGER PRIMARY KEY) با VACUUM یا کپی جدول عوض می‌شود؛ ردیف‌های FTS با
+# کلید عددی صریح این جدول به id کاربر وصل می‌شوند
+FTS_IDS_TABLE = 'users_customuser_fts_ids'
+
+
+def _split_terms(term):
+    terms = []
+    for bit in smart_split(term):
+        if bit.startswith(('"', "'")) and bit[0] == bit[-1]:
+            bit = unescape_string_literal(bit)
+        if bit:
+            terms.append(bit)
+    return terms
+
+
+def _prefix_q(field, prefix):
+    # بازه به جای LIKE تا ایندکس B-tree روی LOWER(ستون) (CustomUser.Meta.indexes) قابل استفاده باشد
+    column = Lower(field)
+    prefix = prefix.lower()
+    return Q(GreaterThanOrEqual(column, prefix), LessThan(column, prefix + '\U0010ffff'))
+
+
+def search_users(queryset, term):
+    term = (term or '').strip()
+    if not term:
+        return queryset
+
+    if '@' in term and ' ' not in term:
+        # بخش محلی email حروف بزرگ را نگه می‌دارد و عبارت ممکن است از وسط آدرس باشد
+        fields = ('email',)
+        terms = [term]
+    else:
+        fields = SEARCH_FIELDS
+        terms = _split_terms(term)
+
+    if connections[queryset.db].vendor == 'sqlite' and sqlite_fts_installed(queryset.db):
+        return _search_sqlite_fts(queryset, terms, fields)
+
+    for bit in terms:
+        or_queries = Q()
+        for field in fields:
+            or_queries |= Q(**{f'{field}__icontains': bit})
+        queryset = queryset.filter(or_queries)
+    return queryset
+
+
+def _search_sqlite_fts(queryset, terms, fields):
+    long_terms = [bit for bit in terms if len(bit) >= MIN_TRIGRAM_LENGTH]
+    if not long_terms:
+        # عبارت خیلی کوتاه: فقط شروع username یا email
+        or_queries = Q()
+        for field in ('username', 'email'):
+            if field in fields:
+                or_queries |= _prefix_q(field, terms[0])
+        return queryset.filter(or_queries)
+
+    match = ' AND '.join('"%s"' % bit.replace('"', '""') for bit in long_terms)
+    if fields != SEARCH_FIELDS:
+        match = '{%s} : (%s)' % (' '.join(fields), match)
+    return queryset.filter(pk__in=RawSQL(
+        f'SELECT user_id FROM {FTS_IDS_TABLE} WHERE id IN '
+        f'(SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s)',
+        [match],
+    ))
+
+
+# ---------- نگهداری جدول FTS5 در SQLite ----------
+
+_FTS_ROWID = f'(SELECT id FROM {FTS_IDS_TABLE} WHERE user_id = %s.id)'
+
+SQLITE_FTS_SQL = [
+    f"""CREATE TABLE IF NOT EXISTS {FTS_IDS_TABLE} (
+        id INTEGER PRIMARY KEY, user_id char(32) NOT NULL UNIQUE
+    )""",
+    # جدول FTS متن را خودش نگه می‌دارد (نه external content) تا به rowid جدول کاربر وابسته نباشد
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        email, username, first_name, last_name, tokenize='trigram'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON users_customuser BEGIN
+        INSERT INTO {FTS_IDS_TABLE}(user_id) VALUES (new.id);
+        INSERT INTO {FTS_TABLE}(rowid, email, username, first_name, last_name)
+        VALUES ({_FTS_ROWID % 'new'}, new.email, new.username, new.first_name, new.last_name);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON users_customuser BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = {_FTS_ROWID % 'old'};
+        DELETE FROM {FTS_IDS_TABLE} WHERE user_id = old.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au
+        AFTER UPDATE OF email, username, first_name, last_name ON users_customuser BEGIN
+        UPDATE {FTS_TABLE} SET email = new.email, username = new.username,
+            first_name = new.first_name, last_name = new.last_name
+        WHERE rowid = {_FTS_ROWID % 'new'};
+    END""",
+]
+
+SQLITE_FTS_REBUILD_SQL = [
+    f"DELETE FROM {FTS_TABLE}",
+    f"DELETE FROM {FTS_IDS_TABLE}",
+    f"INSERT INTO {FTS_IDS_TABLE}(user_id) SELECT id FROM users_customuser",
+    f"""INSERT INTO {FTS_TABLE}(rowid, email, username, first_name, last_name)
+        SELECT ids.id, users.email, users.username, users.first_name, users.last_name
+        FROM {FTS_IDS_TABLE} ids JOIN users_customuser users ON users.id = ids.user_id""",
+]
+
+_fts_installed = {}
+
+
+def sqlite_fts_installed(using='default'):
+    if using not in _fts_installed:
+        with connections[using].cursor() as cursor:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [FTS_IDS_TABLE])
+            _fts_installed[using] = cursor.fetchone() is not None
+    return _fts_installed[using]
+
+
+def install_sqlite_fts(using='default'):
+    """
+    جدول FTS، جدول کلیدها و triggerها را می‌سازد و در صورت نیاز دوباره پر می‌کند.
+    SQLite در بسیاری از تغییرات schema جدول را از نو می‌سازد و triggerها از بین می‌روند،
+    برای همین این تابع بعد از هر migrate اجرا می‌شود (users.apps). ساختار قدیمی (external content روی rowid
+    جدول کاربر، بدون users_customuser_fts_ids) حذف و از نو ساخته می‌شود.
+    """
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT count(*) FROM sqlite_master WHERE (type = 'trigger' AND name LIKE %s) OR (type = 'table' AND name = %s)",
+            [f'{FTS_TABLE}_a_', FTS_IDS_TABLE],
+        )
+        complete = cursor.fetchone()[0] == 4
+        if not complete:
+            for trigger in ('ai', 'ad', 'au'):
+                cursor.execute(f'DROP TRIGGER IF EXISTS {FTS_TABLE}_{trigger}')
+            cursor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+        for sql in SQLITE_FTS_SQL:
+            cursor.execute(sql)
+        if not complete:
+            for sql in SQLITE_FTS_REBUILD_SQL:
+                cursor.execute(sql)
+    _fts_installed[using] = True
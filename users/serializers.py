@@ -1,11 +1,32 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
 from django.contrib.auth.password_validation import validate_password
 from django.core import exceptions
+from django.core.files.storage import default_storage
+from django.conf import settings
+
+from .lookup import DEFAULT_LOOKUP_FIELDS, LOOKUP_FIELDS
 
 User = get_user_model()
 
 
+class AvatarRenditionsField(serializers.Field):
+    """آدرس نسخه‌های WebP آواتار به ازای هر اندازه؛ تا پایان پردازش پس‌زمینه خالی است"""
+
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        request = self.context.get('request')
+        urls = {}
+        for size, name in (value or {}).items():
+            url = default_storage.url(name)
+            urls[size] = request.build_absolute_uri(url) if request is not None else url
+        return urls
+
+
 class RegisterSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, validators=[validate_password])
     password_confirm = serializers.CharField(write_only=True)
@@ -24,32 +45,59 @@ class RegisterSerializer(serializers.ModelSerializer):
             'password',
             'password_confirm',
         ]
+        # یکتایی email/username با unique constraint دیتابیس بررسی می‌شود، نه UniqueValidator (authentication.registration)
+        extra_kwargs = {
+            'email': {'validators': []},
+            'username': {'validators': [User.username_validator]},
+        }
+
+    def validate_email(self, value):
+        # مثل create_user، تا مقایسه‌ی تکراری بودن روی همان مقداری باشد که ذخیره می‌شود
+        return User.objects.normalize_email(value)
+
+    def validate_username(self, value):
+        return User.normalize_username(value)
 
     def validate(self, attrs):
         if attrs['password'] != attrs['password_confirm']:
             raise serializers.ValidationError({"password": "Passwords do not match."})
         return attrs
 
-    def create(self, validated_data):
-        validated_data.pop('password_confirm')
-        avatar = validated_data.pop('avatar', None)
-        user = User.objects.create_user(
+    def build(self, validated_data, password_hash=None):
+        """کاربر ذخیره‌نشده با رمز هش‌شده؛ بدون هیچ کوئری (بدون password_hash، هش همین‌جا حساب می‌شود)"""
+        user = User(
             email=validated_data['email'],
             username=validated_data['username'],
             first_name=validated_data['first_name'],
             last_name=validated_data['last_name'],
             phone_number=validated_data.get('phone_number'),
             address=validated_data.get('address'),
-            password=validated_data['password'],
+            avatar=validated_data.get('avatar'),
         )
-        if avatar:
-            user.avatar = avatar
-        user.save()
+        user.set_password_hash(password_hash or make_password(validated_data['password']))
+        return user
+
+    def create(self, validated_data):
+        # رمز از قبل هش‌شده، مثلاً توسط AsyncRegisterView: save(password_hash=...)
+        user = self.build(validated_data, validated_data.pop('password_hash', None))
+        # فقط یک INSERT؛ ایمیل یا نام کاربری تکراری IntegrityError می‌دهد
+        user.save(force_insert=True)
         return user
 
 
+class BulkRegisterSerializer(serializers.Serializer):
+    """ورودی ثبت‌نام دسته‌ای (BulkRegisterView): {"users": [ورودی RegisterSerializer, ...]}"""
+    users = RegisterSerializer(many=True, allow_empty=False)
+
+    def validate_users(self, value):
+        if len(value) > settings.REGISTER_BULK_MAX_USERS:
+            raise serializers.ValidationError(f"At most {settings.REGISTER_BULK_MAX_USERS} users per request.")
+        return value
+
+
 class UserProfileSerializer(serializers.ModelSerializer):
     avatar = serializers.ImageField(allow_empty_file=True, required=False, use_url=True)
+    avatar_renditions = AvatarRenditionsField()
 
     class Meta:
         model = User
@@ -62,6 +110,7 @@ class UserProfileSerializer(serializers.ModelSerializer):
             'phone_number',
             'address',
             'avatar',
+            'avatar_renditions',
             'date_joined',
             'is_staff',
             'is_active',
@@ -82,6 +131,8 @@ class UserProfileSerializer(serializers.ModelSerializer):
 class UserAdminSerializer(serializers.ModelSerializer):
     """فقط برای ادمین - نمایش کامل‌تر"""
     avatar = serializers.ImageField(use_url=True)
+    avatar_renditions = AvatarRenditionsField()
+
     class Meta:
         model = User
         fields = [
@@ -93,8 +144,10 @@ class UserAdminSerializer(serializers.ModelSerializer):
             'phone_number',
             'address',
             'avatar',
+            'avatar_renditions',
             'date_joined',
             'last_login',
+            'last_seen',
             'is_staff',
             'is_active',
         ]
@@ -109,3 +162,20 @@ class ChangePasswordSerializer(serializers.Serializer):
         if attrs['new_password'] != attrs['new_password_confirm']:
             raise serializers.ValidationError({"new_password": "Passwords do not match."})
         return attrs
+
+
+class UserLookupSerializer(serializers.Serializer):
+    """ورودی جستجوی دسته‌ای کاربران با شناسه یا ایمیل (UserLookupView)"""
+    ids = serializers.ListField(child=serializers.UUIDField(), required=False, default=list)
+    emails = serializers.ListField(child=serializers.CharField(max_length=254), required=False, default=list)
+    fields = serializers.ListField(
+        child=serializers.ChoiceField(choices=LOOKUP_FIELDS), required=False, default=list(DEFAULT_LOOKUP_FIELDS),
+    )
+
+    def validate(self, attrs):
+        total = len(set(attrs['ids'])) + len(set(attrs['emails']))
+        if not total:
+            raise serializers.ValidationError("Provide at least one of ids or emails.")
+        if total > settings.USER_LOOKUP_MAX_KEYS:
+            raise serializers.ValidationError(f"At most {settings.USER_LOOKUP_MAX_KEYS} ids and emails per request.")
+        return attrs
@@ -0,0 +1,34 @@
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from user_service.db_router import pin_primary
+
+from .lookup import forget_lookup
+from .profile_cache import profile_cache
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def invalidate_lookup_cache(sender, instance, **kwargs):
+    # داده‌ی کش‌شده‌ی UserLookupView بعد از هر تغییر در ردیف کاربر
+    forget_lookup(instance.pk)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def bump_profile_version(sender, instance, using, **kwargs):
+    # ویرایش پروفایل، تغییر رمز، ویرایش ادمین یا حذف: نسخه‌ی پروفایل کش‌شده بالا می‌رود
+    profile_cache.bump(instance.pk)
+    # اگر داخل تراکنش باشیم، خواننده‌ای که تا commit داده‌ی قبلی را کش کرده با این bump کنار گذاشته می‌شود
+    if transaction.get_connection(using).in_atomic_block:
+        transaction.on_commit(partial(profile_cache.bump, instance.pk), using=using)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def pin_user_to_primary(sender, instance, **kwargs):
+    # ثبت‌نام، ویرایش پروفایل و تغییر رمز: خواندن‌های بعدی این کاربر تا چند ثانیه از primary (user_service.db_router)
+    pin_primary(instance.pk)
@@ -1,3 +1,647 @@
-from django.test import TestCase
+import base64
+import copy
+import io
+import json
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, connections
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.renderers import JSONRenderer
+from django.utils import timezone
+
+from authentication.serializers import CustomTokenObtainPairSerializer
+from authentication.tests import FAST_HASHERS, APITestMixin
+from user_service.db_router import PRIMARY, choose_read_database
+
+from . import search
+from .lookup import lookup_users
+from .profile_cache import ProfileCache
+from .serializers import UserAdminSerializer, UserProfileSerializer
+from .search import search_users
+
+User = get_user_model()
+
+
+class SearchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.bob = User.objects.create(
+            email='Bob.Smith@example.com', username='Bob', first_name='Robert', last_name='Smith',
+        )
+        cls.alice = User.objects.create(
+            email='alice@other.org', username='alice', first_name='Alice', last_name='Jones',
+        )
+
+    def search(self, term):
+        return set(search_users(User.objects.all(), term))
+
+    def assert_search(self, term, expected):
+        self.assertEqual(self.search(term), expected, term)
+        # مسیر Postgres (icontains) هم همان نتیجه را بدهد
+        with mock.patch.object(search, 'sqlite_fts_installed', return_value=False):
+            self.assertEqual(self.search(term), expected, term)
+
+    def test_email_terms_ignore_case_and_match_inside_the_address(self):
+        for term in ('Bob.Smith@example.com', 'bob.smith@EXAMPLE.com', 'smith@example.com', '@example.com'):
+            self.assert_search(term, {self.bob})
+        self.assert_search('@example.org', set())
+
+    def test_email_terms_only_search_email(self):
+        self.assert_search('alice@example.com', set())
+
+    def test_short_terms_match_username_prefix_ignoring_case(self):
+        self.assertEqual(self.search('bo'), {self.bob})
+        self.assertEqual(self.search('AL'), {self.alice})
+
+    def test_every_word_must_match(self):
+        self.assert_search('robert smith', {self.bob})
+        self.assert_search('alice smith', set())
+
+
+class SearchIndexTests(TestCase):
+
+    def test_index_survives_rowid_renumbering(self):
+        users = [
+            User.objects.create(email=f'user{i}@example.com', username=f'user{i}', first_name=name, last_name='Test')
+            for i, name in enumerate(('Robert', 'Alice', 'Carol'))
+        ]
+        # VACUUM و کپی جدول می‌توانند rowid جدول‌های بدون INTEGER PRIMARY KEY (مثل کلید UUID) را عوض کنند
+        table = User._meta.db_table
+        with connection.cursor() as cursor:
+            # ترتیب ردیف‌ها برعکس می‌شود
+            cursor.execute(f'SELECT min(rowid) + max(rowid) FROM {table}')
+            total = cursor.fetchone()[0]
+            cursor.execute(f'UPDATE {table} SET rowid = -rowid')
+            cursor.execute(f'UPDATE {table} SET rowid = %s + rowid', [total])
+        for user in users:
+            self.assertEqual(list(search_users(User.objects.all(), user.first_name)), [user])
+
+        User.objects.filter(pk=users[2].pk).update(first_name='Eve')
+        self.assertEqual(list(search_users(User.objects.all(), 'carol')), [])
+        self.assertEqual(list(search_users(User.objects.all(), 'eve')), [users[2]])
+        users[1].delete()
+        self.assertEqual(list(search_users(User.objects.all(), 'alice')), [])
+
+    def test_search_uses_the_queryset_database(self):
+        with mock.patch.object(search, 'sqlite_fts_installed', wraps=search.sqlite_fts_installed) as installed:
+            list(search_users(User.objects.using('default'), 'carol'))
+        installed.assert_called_once_with('default')
+
+
+class ProfileCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.request = mock.Mock(build_absolute_uri=lambda path: f'http://testserver{path}')
+        self.built = []
+
+    def build(self):
+        self.built.append(len(self.built))
+        return {'version': len(self.built)}
+
+    def test_bump_invalidates(self):
+        profile_cache = ProfileCache(timeout=60)
+        self.assertEqual(profile_cache.get(1, self.request, self.build), {'version': 1})
+        self.assertEqual(profile_cache.get(1, self.request, self.build), {'version': 1})
+        profile_cache.bump(1)
+        self.assertEqual(profile_cache.get(1, self.request, self.build), {'version': 2})
+
+    def test_zero_timeout_disables_the_cache(self):
+        # تنظیمات prod بدون REDIS_URL
+        profile_cache = ProfileCache(timeout=0)
+        profile_cache.get(1, self.request, self.build)
+        profile_cache.get(1, self.request, self.build)
+        self.assertEqual(len(self.built), 2)
+
+
+class UserListPaginationTests(APITestMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(email='admin@example.com', username='admin', is_staff=True)
+        start = timezone.now() - timedelta(days=1)
+        for index in range(5):
+            User.objects.create(email=f'user{index}@example.com', username=f'user{index}')
+        # date_joined با auto_now_add پر می‌شود؛ فاصله‌ی مشخص برای ترتیب قطعی
+        for index, user in enumerate(User.objects.exclude(pk=cls.admin.pk).order_by('username')):
+            User.objects.filter(pk=user.pk).update(date_joined=start + timedelta(minutes=index))
+        cls.url = reverse('users:user-list')
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.admin)
+
+    def test_page_number_is_the_default(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 6)
+        self.assertEqual(len(response.data['results']), 6)
+
+    def test_keyset_pages_cover_every_row_once(self):
+        response = self.client.get(self.url, {'cursor': '', 'page_size': 2})
+        self.assertIsNone(response.data['count'])
+        self.assertIsNone(response.data['previous'])
+        seen = []
+        while True:
+            seen += [row['username'] for row in response.data['results']]
+            if not response.data['next']:
+                break
+            response = self.client.get(response.data['next'])
+        self.assertEqual(seen, ['admin', 'user4', 'user3', 'user2', 'user1', 'user0'])
+
+        response = self.client.get(response.data['previous'])
+        self.assertEqual([row['username'] for row in response.data['results']], ['user3', 'user2'])
+
+    def test_invalid_cursor_is_not_found(self):
+        def encode(data):
+            return base64.urlsafe_b64encode(json.dumps(data).encode()).decode()
+
+        for cursor in (
+            'not-base64!',
+            encode({'d': timezone.now().isoformat(), 'i': 'not-a-uuid'}),
+            encode({'d': timezone.now().isoformat(), 'i': 42}),
+            encode({'d': 'yesterday', 'i': str(self.admin.pk)}),
+            encode(['d', 'i']),
+        ):
+            response = self.client.get(self.url, {'cursor': cursor})
+            self.assertEqual(response.status_code, 404, cursor)
+
+
+class FastSerializerTests(APITestMixin, TestCase):
+    """مسیر سریع (users.fast_serializers) همان JSON سریال‌سازهای DRF را برمی‌گرداند."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(email='admin@example.com', username='admin', is_staff=True)
+        cls.bob = User.objects.create(
+            email='bob@example.com', username='bob', first_name='Bob', last_name='Smith', phone_number='09120000000',
+            address='Tehran', avatar='avatars/ab/ab12.png', avatar_renditions={'64': 'avatars/cd/cd34.webp'},
+            last_login=timezone.now(), last_seen=timezone.now(),
+        )
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def drf_json(self, serializer_class, instance, response, **kwargs):
+        data = serializer_class(instance, context={'request': response.wsgi_request}, **kwargs).data
+        return json.loads(JSONRenderer().render(data))
+
+    def test_list_and_detail(self):
+        self.client.force_authenticate(self.admin)
+        response = self.client.get(reverse('users:user-list'))
+        self.assertEqual(
+            response.json()['results'],
+            self.drf_json(UserAdminSerializer, User.objects.order_by('-date_joined'), response, many=True),
+        )
+        response = self.client.get(reverse('users:user-detail', args=[self.bob.pk]))
+        self.assertEqual(response.json(), self.drf_json(UserAdminSerializer, User.objects.get(pk=self.bob.pk), response))
+
+    def test_profile(self):
+        from authentication.serializers import CustomTokenObtainPairSerializer
+
+        access = CustomTokenObtainPairSerializer.get_token(self.bob).access_token
+        response = self.client.get(reverse('auth:profile'), HTTP_AUTHORIZATION=f'Bearer {access}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json(), self.drf_json(UserProfileSerializer, User.objects.get(pk=self.bob.pk), response),
+        )
+
+
+class LookupTests(APITestMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(email='admin@example.com', username='admin', is_staff=True)
+        cls.bob = User.objects.create(email='bob@example.com', username='bob', first_name='Bob')
+        cls.alice = User.objects.create(email='alice@example.com', username='alice', first_name='Alice')
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_view_reports_results_and_missing_keys(self):
+        self.client.force_authenticate(self.admin)
+        unknown = str(uuid.uuid4())
+        response = self.client.post(reverse('users:user-lookup'), {
+            'ids': [str(self.bob.pk), unknown], 'emails': ['alice@example.com', 'nobody@example.com'],
+            'fields': ['id', 'username'],
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'], {
+            str(self.bob.pk): {'id': str(self.bob.pk), 'username': 'bob'},
+            'alice@example.com': {'id': str(self.alice.pk), 'username': 'alice'},
+        })
+        self.assertEqual(response.data['missing'], [unknown, 'nobody@example.com'])
+
+    def test_cached_rows_are_reused_until_more_fields_are_needed(self):
+        ids, emails = [self.bob.pk], ['alice@example.com']
+        with self.assertNumQueries(1):
+            lookup_users(ids, emails, fields=['username'])
+        with self.assertNumQueries(0):
+            by_id, by_email = lookup_users(ids, emails, fields=['username'])
+        self.assertEqual(by_id[str(self.bob.pk)]['username'], 'bob')
+        self.assertEqual(by_email['alice@example.com']['username'], 'alice')
+
+        with self.assertNumQueries(1):
+            by_id, _ = lookup_users(ids, fields=['username', 'first_name'])
+        self.assertEqual(by_id[str(self.bob.pk)]['first_name'], 'Bob')
+        with self.assertNumQueries(0):
+            lookup_users(ids, fields=['first_name'])
+
+    def test_misses_are_not_cached_as_rows(self):
+        unknown = str(uuid.uuid4())
+        for _ in range(2):
+            with self.assertNumQueries(1):
+                self.assertEqual(lookup_users([unknown], ['nobody@example.com']), ({}, {}))
+
+    def test_save_invalidates(self):
+        lookup_users([self.bob.pk], ['bob@example.com'], fields=['first_name'])
+        self.bob.first_name = 'Robert'
+        self.bob.email = 'robert@example.com'
+        self.bob.save()
+
+        by_id, by_email = lookup_users([self.bob.pk], ['bob@example.com'], fields=['first_name'])
+        self.assertEqual(by_id[str(self.bob.pk)]['first_name'], 'Robert')
+        # ایمیل قدیمی در کش هنوز به همین شناسه اشاره می‌کند، ولی ردیف تازه با آن نمی‌خواند
+        self.assertEqual(by_email, {})
+
+
+class MediaRootMixin:
+    """MEDIA_ROOT موقت برای هر تست"""
+
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def age(self, name, seconds):
+        when = time.time() - seconds
+        os.utime(default_storage.path(name), (when, when))
+
+
+class ContentAddressedStorageTests(MediaRootMixin, TestCase):
+
+    def test_identical_content_is_stored_once(self):
+        first = default_storage.save('avatars/a.png', ContentFile(b'same bytes'))
+        second = default_storage.save('avatars/b.PNG', ContentFile(b'same bytes'))
+        self.assertEqual(first, second)
+        self.assertRegex(first, r'^avatars/[0-9a-f]{2}/[0-9a-f]{64}\.png$')
+        self.assertEqual(os.listdir(os.path.dirname(default_storage.path(first))), [os.path.basename(first)])
+        # delete() نام‌های مشترک را پاک نمی‌کند
+        default_storage.delete(first)
+        self.assertTrue(default_storage.exists(first))
+
+    def test_duplicate_save_refreshes_mtime(self):
+        name = default_storage.save('avatars/a.png', ContentFile(b'same bytes'))
+        self.age(name, 7 * 86400)
+        default_storage.save('avatars/b.png', ContentFile(b'same bytes'))
+        self.assertGreater(os.stat(default_storage.path(name)).st_mtime, time.time() - 60)
+
+    def test_purge_keeps_files_saved_again_after_the_cutoff(self):
+        name = default_storage.save('avatars/a.png', ContentFile(b'same bytes'))
+        cutoff = time.time() - 86400
+        self.assertFalse(default_storage.purge(name, older_than=cutoff))
+        self.assertTrue(default_storage.exists(name))
+
+        self.age(name, 2 * 86400)
+        self.assertTrue(default_storage.purge(name, older_than=cutoff))
+        self.assertFalse(default_storage.exists(name))
+        self.assertEqual(os.listdir(os.path.dirname(default_storage.path(name))), [])
+
+
+class MediaViewTests(MediaRootMixin, TestCase):
+
+    def test_content_addressed_file_is_immutable(self):
+        name = default_storage.save('avatars/a.png', ContentFile(b'png bytes'))
+        url = reverse('media', args=[name])
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), b'png bytes')
+        self.assertIn('immutable', response['Cache-Control'])
+        etag = response['ETag']
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=f'W/{etag}')
+        self.assertEqual(response.status_code, 304)
+
+    def test_legacy_file_revalidates_with_size_and_mtime(self):
+        path = os.path.join(default_storage.location, 'avatars', 'legacy.png')
+        os.makedirs(os.path.dirname(path))
+        with open(path, 'wb') as file:
+            file.write(b'old upload')
+
+        response = self.client.get(reverse('media', args=['avatars/legacy.png']))
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('immutable', response['Cache-Control'])
+        response.close()
+        response = self.client.get(reverse('media', args=['avatars/legacy.png']), HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_missing_and_unsafe_names(self):
+        self.assertEqual(self.client.get(reverse('media', args=['avatars/missing.png'])).status_code, 404)
+        self.assertEqual(self.client.get('/media/../manage.py').status_code, 404)
+        name = default_storage.save('avatars/a.png', ContentFile(b'png bytes'))
+        self.assertEqual(self.client.post(reverse('media', args=[name])).status_code, 405)
+
+
+class PruneAvatarFilesTests(MediaRootMixin, TestCase):
+
+    def prune(self, *args):
+        out = io.StringIO()
+        call_command('prune_avatar_files', *args, stdout=out)
+        return json.loads(out.getvalue())
+
+    def test_only_old_unreferenced_files_are_deleted(self):
+        avatar = default_storage.save('avatars/a.png', ContentFile(b'avatar'))
+        rendition = default_storage.save('avatars/renditions/a_64.webp', ContentFile(b'rendition'))
+        orphan = default_storage.save('avatars/b.png', ContentFile(b'orphan'))
+        recent = default_storage.save('avatars/c.png', ContentFile(b'recent'))
+        User.objects.create(
+            email='bob@example.com', username='bob', avatar=avatar, avatar_renditions={'64': rendition},
+        )
+        for name in (avatar, rendition, orphan):
+            self.age(name, 2 * 86400)
+
+        self.assertEqual(self.prune('--dry-run')['deleted'], 1)
+        self.assertTrue(default_storage.exists(orphan))
+
+        result = self.prune()
+        self.assertEqual(result['deleted'], 1)
+        self.assertFalse(default_storage.exists(orphan))
+        for name in (avatar, rendition, recent):
+            self.assertTrue(default_storage.exists(name), name)
+
+    def test_reference_committed_during_the_scan_is_kept(self):
+        avatar = default_storage.save('avatars/a.png', ContentFile(b'avatar'))
+        self.age(avatar, 2 * 86400)
+
+        def walk(top):
+            # ردیفی که بین ساختن مجموعه‌ی ارجاع‌ها و پیمایش پوشه commit می‌شود
+            User.objects.create(email='bob@example.com', username='bob', avatar=avatar)
+            return real_walk(top)
+
+        real_walk = os.walk
+        with mock.patch('users.management.commands.prune_avatar_files.os.walk', walk):
+            self.assertEqual(self.prune()['deleted'], 0)
+        self.assertTrue(default_storage.exists(avatar))
+
+    def test_stale_temporary_files_are_deleted(self):
+        avatar = default_storage.save('avatars/a.png', ContentFile(b'avatar'))
+        User.objects.create(email='bob@example.com', username='bob', avatar=avatar)
+        directory = os.path.dirname(default_storage.path(avatar))
+        temporary = [os.path.join(directory, name) for name in ('.upload-1', '.purge-2')]
+        for path in temporary:
+            with open(path, 'wb') as file:
+                file.write(b'partial')
+
+        # ctime را نمی‌شود عقب برد؛ فایل تازه است تا ساعت دستور دو روز جلو برود
+        self.assertEqual(self.prune()['temporary_deleted'], 0)
+        later = time.time() + 2 * 86400
+        with mock.patch('users.management.commands.prune_avatar_files.time.time', return_value=later):
+            self.assertEqual(self.prune('--dry-run')['temporary_deleted'], 2)
+            self.assertTrue(all(os.path.exists(path) for path in temporary))
+            result = self.prune()
+        self.assertEqual((result['temporary_deleted'], result['deleted'], result['bytes_freed']), (2, 0, 14))
+        self.assertFalse(any(os.path.exists(path) for path in temporary))
+        self.assertTrue(default_storage.exists(avatar))
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class ImportUsersTests(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        # thread به جای پروسه‌های spawn، تا هشر تست در workerها هم اعمال شود
+        patcher = mock.patch(
+            'users.management.commands.import_users.create_process_pool',
+            lambda workers: ThreadPoolExecutor(max_workers=workers),
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        User.objects.create(email='carol@example.com', username='carol')
+
+    def import_users(self, name, content, *args):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(content)
+        out = io.StringIO()
+        call_command('import_users', path, '--workers', '2', '--chunk-size', '2', *args, stdout=out)
+        return json.loads(out.getvalue()), f'{path}.rejects.ndjson'
+
+    def test_csv_import_and_rejects(self):
+        content = '\n'.join([
+            'email,username,first_name,last_name,password,password_hash',
+            'alice@EXAMPLE.com,alice,Alice,Test,Str0ng-pass-phrase,',
+            f'bob@example.com,bob,Bob,Test,,{make_password("Str0ng-pass-phrase")}',
+            'carol2@example.com,carol,Carol,Test,Str0ng-pass-phrase,',
+            'alice@example.com,alice2,Alice,Again,Str0ng-pass-phrase,',
+            'not-an-email,dave,Dave,Test,Str0ng-pass-phrase,',
+            'erin@example.com,erin,Erin,Test,123,',
+            'frank@example.com,frank,,Test,Str0ng-pass-phrase,',
+        ]) + '\n'
+        summary, rejects_path = self.import_users('users.csv', content)
+        self.assertEqual((summary['rows'], summary['imported'], summary['rejected']), (7, 2, 5))
+        self.assertEqual(summary['rejects_file'], rejects_path)
+
+        self.assertTrue(User.objects.get(email='alice@example.com').check_password('Str0ng-pass-phrase'))
+        self.assertTrue(User.objects.get(username='bob').check_password('Str0ng-pass-phrase'))
+        self.assertFalse(User.objects.filter(username__in=['alice2', 'dave', 'erin', 'frank']).exists())
+
+        with open(rejects_path, encoding='utf-8') as file:
+            rejects = [json.loads(line) for line in file]
+        self.assertEqual(
+            [(reject['line'], sorted(reject['errors'])) for reject in rejects],
+            [(4, ['username']), (5, ['email']), (6, ['email']), (7, ['password']), (8, ['first_name'])],
+        )
+        # رمزها در فایل rejects نوشته نمی‌شوند
+        self.assertNotIn('password', {key for reject in rejects for key in reject['row']})
+
+    def test_ndjson_dry_run(self):
+        content = '\n'.join([
+            json.dumps({'email': 'alice@example.com', 'username': 'alice', 'first_name': 'Alice',
+                        'last_name': 'Test', 'password': 'Str0ng-pass-phrase'}),
+            '{not json',
+            json.dumps(['a', 'list']),
+        ]) + '\n'
+        summary, rejects_path = self.import_users('users.ndjson', content, '--dry-run')
+        self.assertEqual((summary['imported'], summary['rejected']), (1, 2))
+        self.assertFalse(User.objects.filter(username='alice').exists())
+
+    def test_no_rejects_file_when_everything_imports(self):
+        content = 'email,username,first_name,last_name,password\nalice@example.com,alice,Alice,Test,Str0ng-pass-phrase\n'
+        summary, rejects_path = self.import_users('users.csv', content)
+        self.assertEqual(summary['imported'], 1)
+        self.assertNotIn('rejects_file', summary)
+        self.assertFalse(os.path.exists(rejects_path))
+
+
+class IncrementalExportTests(APITestMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(email='admin@example.com', username='admin', is_staff=True)
+        cls.bob = User.objects.create(email='bob@example.com', username='bob')
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.admin)
+        User.objects.update(updated_at=timezone.now() - timedelta(days=1))
+        self.since = timezone.now() - timedelta(minutes=1)
+
+    def exported(self):
+        response = self.client.get(
+            reverse('users:user-export', args=['ndjson']), {'updated_since': self.since.isoformat()},
+        )
+        self.assertEqual(response.status_code, 200)
+        return [json.loads(line)['username'] for line in b''.join(response.streaming_content).splitlines()]
+
+    def test_save_with_update_fields_touches_updated_at(self):
+        self.assertEqual(self.exported(), [])
+        self.bob.avatar_renditions = {'64': 'avatars/renditions/ab/ab.webp'}
+        # مثل users.avatars.process_avatar
+        self.bob.save(update_fields=['avatar_renditions'])
+        self.assertEqual(self.exported(), ['bob'])
+
+    @override_settings(PASSWORD_HASHERS=[
+        'django.contrib.auth.hashers.MD5PasswordHasher', 'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    ])
+    def test_password_hash_upgrade_is_exported(self):
+        from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+        hasher = PBKDF2PasswordHasher()
+        User.objects.filter(pk=self.bob.pk).update(
+            password=hasher.encode('Str0ng-pass-phrase', hasher.salt(), iterations=1),
+            updated_at=timezone.now() - timedelta(days=1),
+        )
+        self.assertTrue(User.objects.get(pk=self.bob.pk).check_password('Str0ng-pass-phrase'))
+        self.assertEqual(self.exported(), ['bob'])
+
+
+# replica واقعی برای ReplicaRoutingTests: SQLite جدا (نه TEST MIRROR)، تا runner برایش دیتابیس تست جدا بسازد.
+# باید قبل از ساختن دیتابیس‌های تست در تنظیمات باشد؛ چون در REPLICA_DATABASES پیش‌فرض نیست، runner آن را migrate می‌کند.
+REPLICA = 'replica_test'
+connections.settings[REPLICA] = copy.deepcopy(connections.settings[PRIMARY])
+
+
+@override_settings(REPLICA_DATABASES=[REPLICA], PASSWORD_HASHERS=FAST_HASHERS)
+class ReplicaRoutingTests(APITestMixin, TestCase):
+    """bob در primary نام Primary و در replica نام Replica دارد؛ از داده‌ی پاسخ معلوم است کوئری کجا رفته."""
+    databases = {PRIMARY, REPLICA}
+
+    @classmethod
+    def setUpTestData(cls):
+        for using, first_name in ((PRIMARY, 'Primary'), (REPLICA, 'Replica')):
+            admin = User(email='admin@example.com', username='admin', is_staff=True, is_superuser=True)
+            bob = User(email='bob@example.com', username='bob', first_name=first_name)
+            if using == REPLICA:
+                admin.pk, bob.pk = cls.admin.pk, cls.bob.pk
+            bob.set_password('Str0ng-pass-phrase')
+            admin.save(using=using)
+            bob.save(using=using)
+            if using == PRIMARY:
+                cls.admin, cls.bob = admin, bob
+
+    def setUp(self):
+        super().setUp()
+        # سنجاق‌های ساختن ردیف‌ها در setUpTestData
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def bearer(self, user):
+        return f'Bearer {CustomTokenObtainPairSerializer.get_token(user).access_token}'
+
+    def profile_name(self, user):
+        response = self.client.get(reverse('auth:profile'), HTTP_AUTHORIZATION=self.bearer(user))
+        self.assertEqual(response.status_code, 200)
+        return response.data['first_name']
+
+    def test_safe_reads_use_the_replica(self):
+        self.client.force_authenticate(self.admin)
+        response = self.client.get(reverse('users:user-list'))
+        self.assertIn('Replica', [row['first_name'] for row in response.data['results']])
+        response = self.client.get(reverse('users:user-detail', args=[self.bob.pk]))
+        self.assertEqual(response.data['first_name'], 'Replica')
+        response = self.client.get(reverse('users:user-export', args=['ndjson']))
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertIn('Replica', [row['first_name'] for row in rows])
+        self.client.force_authenticate(None)
+
+        self.assertEqual(self.profile_name(self.bob), 'Replica')
+
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('admin:users_customuser_changelist'))
+        self.assertContains(response, 'Replica')
+        self.assertNotContains(response, 'Primary')
+
+    def test_writes_use_the_primary(self):
+        self.client.force_authenticate(self.admin)
+        response = self.client.patch(
+            reverse('users:user-detail', args=[self.bob.pk]), {'last_name': 'Edited'}, format='json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(User.objects.using(PRIMARY).get(pk=self.bob.pk).last_name, 'Edited')
+        self.assertEqual(User.objects.using(REPLICA).get(pk=self.bob.pk).last_name, '')
+
+    def test_registration_pins_the_new_user(self):
+        response = self.client.post(reverse('auth:register'), self.register_payload('carol'), format='json')
+        self.assertEqual(response.status_code, 201)
+        # carol هنوز به replica نرسیده است
+        response = self.client.get(reverse('auth:profile'), HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['username'], 'carol')
+
+    def test_profile_update_pins_the_user(self):
+        response = self.client.patch(
+            reverse('auth:profile'), {'last_name': 'Edited'}, format='json', HTTP_AUTHORIZATION=self.bearer(self.bob),
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(choose_read_database(self.bob), PRIMARY)
+        self.assertEqual(self.profile_name(self.bob), 'Primary')
+        # کاربر دیگر همچنان از replica می‌خواند
+        self.assertEqual(choose_read_database(self.admin), REPLICA)
+
+    def test_password_change_pins_the_user(self):
+        response = self.client.post(reverse('auth:change_password'), {
+            'old_password': 'Str0ng-pass-phrase',
+            'new_password': 'An0ther-pass-phrase',
+            'new_password_confirm': 'An0ther-pass-phrase',
+        }, format='json', HTTP_AUTHORIZATION=self.bearer(self.bob))
+        self.assertEqual(response.status_code, 200)
+        bob = User.objects.using(PRIMARY).get(pk=self.bob.pk)
+        self.assertEqual(self.profile_name(bob), 'Primary')
+
+    def test_pin_expires(self):
+        self.client.patch(
+            reverse('auth:profile'), {'last_name': 'Edited'}, format='json', HTTP_AUTHORIZATION=self.bearer(self.bob),
+        )
+        self.assertEqual(choose_read_database(self.bob), PRIMARY)
+        later = time.time() + settings.REPLICA_PIN_SECONDS + 1
+        with mock.patch('time.time', return_value=later):
+            self.assertEqual(choose_read_database(self.bob), REPLICA)
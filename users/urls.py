@@ -1,9 +1,11 @@
 from django.urls import path
-from .views import UserListView, UserDetailView
+from .views import UserListView, UserDetailView, UserExportView, UserLookupView
 
 app_name = 'users'
 
 urlpatterns = [
     path('', UserListView.as_view(), name='user-list'),
-    path('<int:pk>/', UserDetailView.as_view(), name='user-detail'),
+    path('export.<str:export_format>', UserExportView.as_view(), name='user-export'),
+    path('lookup/', UserLookupView.as_view(), name='user-lookup'),
+    path('<uuid:pk>/', UserDetailView.as_view(), name='user-detail'),
 ]
@@ -1,11 +1,24 @@
 from rest_framework import permissions, generics
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from .serializers import UserAdminSerializer
+from django.http import StreamingHttpResponse
+from django.utils.dateparse import parse_datetime
+from user_service.db_router import ReplicaReadMixin, choose_read_database
+from .export import export_rows, stream_csv, stream_ndjson
+from .fast_serializers import FastUserAdminSerializer
+from .lookup import lookup_users
+from .pagination import KeysetPagination
+from .search import search_users
+from .serializers import UserAdminSerializer, UserLookupSerializer
 
 User = get_user_model()
 
 
-class UserListView(generics.ListAPIView):
+class UserListView(ReplicaReadMixin, generics.ListAPIView):
     """
     لیست تمام کاربران - فقط برای ادمین
     """
@@ -13,8 +26,31 @@ class UserListView(generics.ListAPIView):
     serializer_class = UserAdminSerializer
     permission_classes = [permissions.IsAdminUser]
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        return search_users(queryset, self.request.query_params.get('search'))
 
-class UserDetailView(generics.RetrieveUpdateDestroyAPIView):
+    def list(self, request, *args, **kwargs):
+        # ردیف‌های values() با مسیر سریع، بدون ساختن نمونه‌ی مدل و ModelSerializer
+        serializer = FastUserAdminSerializer(context=self.get_serializer_context())
+        queryset = self.filter_queryset(self.get_queryset()).values(*serializer.fields)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(serializer.many(page))
+        return Response(serializer.many(queryset))
+
+    @property
+    def paginator(self):
+        # پیش‌فرض همان PageNumberPagination با count؛ با ?cursor= صفحه‌بندی keyset بدون COUNT و OFFSET
+        if not hasattr(self, '_paginator'):
+            if KeysetPagination.cursor_query_param in self.request.query_params:
+                self._paginator = KeysetPagination()
+            else:
+                self._paginator = PageNumberPagination()
+        return self._paginator
+
+
+class UserDetailView(ReplicaReadMixin, generics.RetrieveUpdateDestroyAPIView):
     """
     جزئیات، ویرایش و حذف یک کاربر - فقط برای ادمین
     """
@@ -22,3 +58,77 @@ class UserDetailView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = UserAdminSerializer
     permission_classes = [permissions.IsAdminUser]
     lookup_field = 'pk'
+
+    def retrieve(self, request, *args, **kwargs):
+        serializer = FastUserAdminSerializer(context=self.get_serializer_context())
+        return Response(serializer.from_instance(self.get_object()))
+
+
+class UserExportView(APIView):
+    """
+    خروجی کامل کاربران به صورت stream - فقط برای ادمین
+    GET export.ndjson یا export.csv، با ?updated_since= و ?joined_since= (ISO 8601) برای خروجی افزایشی
+    """
+    permission_classes = [permissions.IsAdminUser]
+    formats = {
+        'ndjson': (stream_ndjson, 'application/x-ndjson'),
+        'csv': (stream_csv, 'text/csv; charset=utf-8'),
+    }
+
+    def get(self, request, export_format):
+        if export_format not in self.formats:
+            raise NotFound()
+        stream, content_type = self.formats[export_format]
+
+        queryset = User.objects.all()
+        ordering = ('date_joined', 'id')
+        updated_since = self.get_datetime_param(request, 'updated_since')
+        if updated_since is not None:
+            queryset = queryset.filter(updated_at__gte=updated_since)
+            ordering = ('updated_at', 'id')
+        joined_since = self.get_datetime_param(request, 'joined_since')
+        if joined_since is not None:
+            queryset = queryset.filter(date_joined__gte=joined_since)
+        # generator بعد از بازگشت ویو اجرا می‌شود، پس replica مستقیم روی queryset انتخاب می‌شود
+        queryset = queryset.order_by(*ordering).using(choose_read_database(request.user))
+
+        rows = export_rows(queryset, request, settings.USER_EXPORT_CHUNK_SIZE)
+        response = StreamingHttpResponse(stream(rows), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="users.{export_format}"'
+        return response
+
+    def get_datetime_param(self, request, name):
+        value = request.query_params.get(name)
+        if not value:
+            return None
+        parsed = parse_datetime(value)
+        if parsed is None:
+            raise ValidationError({name: ["Enter a valid ISO 8601 datetime."]})
+        return parsed
+
+
+class UserLookupView(APIView):
+    """
+    جستجوی دسته‌ای کاربران برای سرویس‌های داخلی - فقط برای ادمین
+    POST {"ids": [...], "emails": [...], "fields": [...]} -> {"results": {کلید: کاربر}, "missing": [کلیدها]}
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def post(self, request):
+        serializer = UserLookupSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = [str(user_id) for user_id in serializer.validated_data['ids']]
+        emails = serializer.validated_data['emails']
+        fields = serializer.validated_data['fields']
+
+        by_id, by_email = lookup_users(ids, emails, fields)
+        representation = FastUserAdminSerializer(context={'request': request}, fields=fields)
+
+        results = {}
+        missing = []
+        for key, found in [(user_id, by_id) for user_id in ids] + [(email, by_email) for email in emails]:
+            if key in found:
+                results[key] = representation.to_representation(found[key])
+            elif key not in missing:
+                missing.append(key)
+        return Response({'results': results, 'missing': missing})